@@ -0,0 +1,301 @@
+"""
+End-to-end benchmarks of the CLI commands and the Lambda handler against local fake APIs.
+
+    python -m benchmarks.bench_offline --records 1 100 1000 --output results.json
+    python -m benchmarks.bench_offline --scenario workouts sleep --records 1000 --latency-ms 50 --error-rate 0.05
+    python -m benchmarks.bench_offline --records 10000 --client-rate 3 --concurrency 4
+
+Every scenario runs each dataset size in a fresh sync state, twice: a first pass that creates every
+row and a second pass over unchanged data. Each run reports wall time, API calls per endpoint
+(including the 429s the fakes sent back), retries and peak Python memory, and the results can be saved
+as JSON to compare before and after a change.
+
+Notion's client-side rate limiter is set by --client-rate, which defaults to unlimited so large
+datasets finish quickly. Use --client-rate 3 to see the real pacing.
+"""
+import argparse
+import importlib
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from benchmarks.fake_apis import FakeLingQ, FakeNotion, FakeWhoop, ServerProfile, installed
+from src.utils.metrics import metrics
+
+ROOT = Path(__file__).resolve().parent.parent
+
+NOTION_CONFIG = """
+notion:
+  integrations:
+    whoop-workout:
+      database_id: "bench-workouts"
+      snapshot: SNAPSHOT
+      field_mappings:
+        id: {label: "Whoop ID", key: "id", type: "number"}
+        title: {label: "Name", key: "title", type: "title"}
+        date: {label: "Date", key: "date", type: "date"}
+        duration: {label: "Duration", key: "duration", type: "number"}
+        distance: {label: "Distance (km)", key: "distance", type: "number"}
+        sport: {label: "Sport", key: "sport", type: "select"}
+        calories: {label: "Calories", key: "calories", type: "number"}
+        hr_avg: {label: "Average HR", key: "hr_avg", type: "number"}
+        hr_max: {label: "Max HR", key: "hr_max", type: "number"}
+    whoop-sleep-and-recovery:
+      database_id: "bench-sleep"
+      snapshot: SNAPSHOT
+      field_mappings:
+        id: {label: "Whoop ID", key: "id", type: "number"}
+        name: {label: "Name", key: "name", type: "title"}
+        date: {label: "Date", key: "date", type: "date"}
+        performance: {label: "Sleep Performance", key: "sleep_performance_percentage", type: "number"}
+        consistency: {label: "Sleep Consistency", key: "sleep_consistency_percentage", type: "number"}
+        efficiency: {label: "Sleep Efficiency", key: "sleep_efficiency_percentage", type: "number"}
+        recovery: {label: "Recovery", key: "recovery_score", type: "number"}
+        rhr: {label: "Resting HR", key: "resting_heart_rate", type: "number"}
+    lingq:
+      database_id: "bench-lingq"
+      snapshot: SNAPSHOT
+      field_mappings:
+        date: {label: "Date", key: "date", type: "date"}
+        language: {label: "Language", key: "language", type: "select"}
+        words: {label: "Known Words", key: "word-count", type: "number"}
+"""
+
+LINGQ_LANGUAGES = 3
+
+
+def dataset_days(scenario: str, records: int) -> int:
+    """Days of data needed for roughly `records` records in the scenario's main integration."""
+    if scenario in ("workouts", "lambda-workout", "sync-all"):
+        return max(1, math.ceil(records / 3))
+    return max(1, records)
+
+
+def run_cli(main, args) -> int:
+    try:
+        # In non-standalone mode click returns the code of a typer.Exit rather than raising it
+        return main.app(args=args, standalone_mode=False) or 0
+    except SystemExit as e:
+        return e.code or 0
+    except Exception as e:
+        return getattr(e, "exit_code", 1)
+
+
+def scenario_runner(scenario: str, start: date, end: date, concurrency: int):
+    """A callable running the scenario once, returning its exit code (0 for success)."""
+    dates = ["--start", start.isoformat(), "--end", end.isoformat(), "--concurrency", str(concurrency)]
+
+    def run():
+        if scenario.startswith("lambda-"):
+            lambda_module = importlib.import_module("lambda")
+            lambda_module.notion_write_concurrency = concurrency
+            mode = {"lambda-workout": "whoop-workout", "lambda-sleep": "whoop-sleep-and-recovery"}[scenario]
+            os.environ["MODE"] = mode
+            # Sleep is dated by when it ended, so the handler's range is a day later than the fetch
+            offset = timedelta(days=1) if mode == "whoop-sleep-and-recovery" else timedelta()
+            event = {"start": (start + offset).isoformat(), "end": (end + offset).isoformat()}
+            response = lambda_module.lambda_handler(event, None)
+            return 0 if response.get("status") == "success" else 1
+
+        main = importlib.import_module("main")
+        if scenario == "workouts":
+            return run_cli(main, ["whoop", "workouts", *dates])
+        if scenario == "sleep":
+            return run_cli(main, ["whoop", "sleep", "--start", (start + timedelta(days=1)).isoformat(),
+                                  "--end", (end + timedelta(days=1)).isoformat(), "--concurrency", str(concurrency)])
+        if scenario == "lingq":
+            # LingQ only reports today's counts, so the records are languages
+            return run_cli(main, ["lingq", "--concurrency", str(concurrency)])
+        if scenario == "sync-all":
+            return run_cli(main, ["sync", "all", *dates])
+        raise ValueError(f"Unknown scenario {scenario}")
+
+    return run
+
+
+SCENARIOS = ("workouts", "sleep", "lingq", "sync-all", "lambda-workout", "lambda-sleep")
+
+
+def reset_process_state(workdir: Path, config_path: Path, client_rate: float):
+    """Forget every process-wide cache so each run starts cold, as a new CLI process or Lambda container would."""
+    from src.integrations.whoop import cache as whoop_cache
+    from src.services import notion, notion_api, snapshot, sync_state
+    from src.utils.rate_limit import TokenBucket
+    from src.utils.retry import reset_retries
+
+    os.environ.update({
+        "NOTION_API_KEY": "bench-notion-key",
+        "WHOOP_USERNAME": "bench@example.com",
+        "WHOOP_PASSWORD": "bench",
+        "LINGQ_API_KEY": "bench-lingq-key",
+        "SYNC_STATE_PATH": str(workdir / "sync_state.db"),
+        "WHOOP_TOKEN_CACHE_PATH": "off",
+        "WHOOP_CACHE": "off",
+        "NOTION_SNAPSHOT_PATH": str(workdir / "notion_snapshot.db"),
+    })
+    os.environ.pop("RELATION_CACHE_PATH", None)
+
+    main = importlib.import_module("main")
+    lambda_module = importlib.import_module("lambda")
+    for module in (main, lambda_module):
+        module._services.clear()
+        module.notion_config_path = config_path
+
+    notion.load_notion_config.cache_clear()
+    notion_api._shared_clients.clear()
+    notion_api._shared_limiters.clear()
+    notion_api._shared_limiters["bench-notion-key"] = TokenBucket(client_rate, max(1.0, client_rate))
+    sync_state._default_store = None
+    snapshot._default_snapshot = None
+    whoop_cache._default_cache = None
+    reset_retries()
+
+
+def retry_totals() -> dict:
+    from src.utils.retry import RetryPolicy
+
+    return {
+        policy.name: {
+            "retries": sum(policy.retries.values()),
+            "backoff_seconds": round(sum(policy.backoff_seconds.values()), 3),
+            "gave_up": sum(policy.gave_up.values()),
+        }
+        for policy in RetryPolicy.instances if policy.calls
+    }
+
+
+def run_case(scenario: str, records: int, args) -> list:
+    days = dataset_days(scenario, records)
+    end = date.today() - timedelta(days=2)
+    start = end - timedelta(days=days - 1)
+
+    notion = FakeNotion(ServerProfile(args.latency_ms, args.notion_rate, args.notion_burst, args.error_rate), args.seed)
+    whoop = FakeWhoop(ServerProfile(args.latency_ms, 0, 10, args.error_rate), args.seed)
+    lingq = FakeLingQ(ServerProfile(args.latency_ms, 0, 10, args.error_rate), args.seed)
+    whoop.load(workouts=days * 3, sleeps=days, end=end)
+    lingq.load(languages=records if scenario == "lingq" else LINGQ_LANGUAGES)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir, installed(notion, whoop, lingq):
+        workdir = Path(workdir)
+        config_path = workdir / "notion.config.yml"
+        config_path.write_text(NOTION_CONFIG.replace("SNAPSHOT", "true" if args.snapshot else "false"))
+
+        for run_pass in range(1, args.passes + 1):
+            # The sync state survives between passes, as it does between scheduled runs
+            state = workdir / "sync_state.db"
+            reset_process_state(workdir, config_path, args.client_rate)
+            if run_pass == 1:
+                for path in (state, workdir / "notion_snapshot.db"):
+                    if path.exists():
+                        path.unlink()
+            for fake in (notion, whoop, lingq):
+                fake.reset_stats()
+
+            run = scenario_runner(scenario, start, end, args.concurrency)
+            if args.memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            exit_code = run()
+            wall = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if args.memory else None
+            if args.memory:
+                tracemalloc.stop()
+
+            result = {
+                "scenario": scenario,
+                "records": records,
+                "days": days,
+                "pass": run_pass,
+                "exit_code": exit_code,
+                "wall_seconds": round(wall, 4),
+                "peak_memory_bytes": peak,
+                "notion": notion.stats(),
+                "whoop": whoop.stats(),
+                "lingq": lingq.stats(),
+                "notion_pages": {db: notion.page_count(db) for db in notion.databases},
+                "retries": retry_totals(),
+                "metrics": metrics.summary()["metrics"],
+            }
+            results.append(result)
+            print(summarise(result), flush=True)
+    return results
+
+
+def summarise(result: dict) -> str:
+    calls = sum(sum(result[api]["calls"].values()) for api in ("notion", "whoop", "lingq"))
+    throttled = sum(sum(result[api]["throttled"].values()) for api in ("notion", "whoop", "lingq"))
+    memory = f"{result['peak_memory_bytes'] / 1e6:7.1f}MB" if result["peak_memory_bytes"] is not None else "      -"
+    status = "ok" if result["exit_code"] == 0 else f"exit {result['exit_code']}"
+    return (
+        f"{result['scenario']:<15} {result['records']:>6} records  pass {result['pass']}  {result['wall_seconds']:8.3f}s  "
+        f"{calls:>6} calls  {throttled:>4} 429s  {memory}  {status}"
+    )
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--records", nargs="+", type=int, default=[1, 100, 1000])
+    parser.add_argument("--passes", type=int, default=2, help="Runs per case, the first creating rows and the rest resyncing.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Notion write concurrency passed to the commands.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every fake API request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 429.")
+    parser.add_argument("--notion-rate", type=float, default=0.0, help="Fake Notion's rate limit in requests per second, 0 for none.")
+    parser.add_argument("--notion-burst", type=float, default=10.0)
+    parser.add_argument("--client-rate", type=float, default=1e6, help="Rate of the client-side Notion limiter.")
+    parser.add_argument("--snapshot", action="store_true", help="Match records against the local Notion snapshot.")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip tracemalloc, which slows runs down.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the application's INFO logs.")
+    args = parser.parse_args()
+
+    # Import everything up front so module import time isn't counted in the first run
+    importlib.import_module("main")
+    importlib.import_module("lambda")
+    importlib.import_module("src.services.orchestrator")
+    importlib.import_module("src.integrations.whoop.fetcher")
+    importlib.import_module("src.integrations.lingq.fetcher")
+    if not args.verbose:
+        for handler in logging.getLogger("src.utils.logger").handlers:
+            handler.setLevel(logging.WARNING)
+
+    results = []
+    for scenario in args.scenario:
+        for records in args.records:
+            results.extend(run_case(scenario, records, args))
+
+    if args.output:
+        report = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "arguments": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+    if any(result["exit_code"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
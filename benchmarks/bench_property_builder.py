@@ -0,0 +1,117 @@
+"""
+Compare the compiled PropertyBuilder with the original per-record walk of the field mappings.
+
+    python -m benchmarks.bench_property_builder --records 100000
+"""
+import argparse
+import timeit
+
+from src.services.property_builder import PropertyBuilder
+
+FIELD_MAPPINGS = {
+    "id": {"label": "Whoop ID", "key": "id", "type": "number"},
+    "title": {"label": "Name", "key": "title", "type": "title"},
+    "date": {"label": "Date", "key": "date", "type": "date"},
+    "duration": {"label": "Duration", "key": "duration", "type": "number"},
+    "distance": {"label": "Distance (km)", "key": "distance", "type": "number"},
+    "sport": {"label": "Sport", "key": "sport", "type": "select"},
+    "calories": {"label": "Calories", "key": "calories", "type": "number"},
+    "hr_avg": {"label": "Average HR", "key": "hr_avg", "type": "number"},
+    "hr_max": {"label": "Max HR", "key": "hr_max", "type": "number"},
+    "notes": {"label": "Notes", "key": "notes", "type": "text"},
+    "activity": {
+        "label": "Activity", "key": "sport", "type": "relation",
+        "relation": {"database_id": "activities", "field_name": "Name"},
+    },
+}
+
+
+def resolve_relation(database_id, field_name, value):
+    return f"{database_id}-{value}"
+
+
+def legacy_build_properties(field_mappings, data):
+    """NotionClient.build_properties as it was before the field mappings were compiled."""
+    properties = {}
+    for field, config in field_mappings.items():
+        try:
+            field_type = config.get("type")
+            label = config["label"]
+
+            if field_type == "date":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'date' field.")
+                properties[label] = {"date": {"start": data[config["key"]]}}
+            elif field_type == "number":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'number' field with field {field}.")
+                properties[label] = {"number": data[config["key"]]}
+            elif field_type == "relation":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'relation' field.")
+                related_database_id = config["relation"]["database_id"]
+                related_field_name = config["relation"]["field_name"]
+                properties[label] = {
+                    "relation": [{"id": resolve_relation(related_database_id, related_field_name, data[config["key"]])}]
+                }
+            elif field_type == "text":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'text' field.")
+                properties[label] = {"rich_text": [{"type": "text", "text": {"content": data[config["key"]]}}]}
+            elif field_type == "select":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'select' field.")
+                properties[label] = {"select": {"name": data[config["key"]]}}
+            elif field_type == "title":
+                if config["key"] not in data:
+                    raise KeyError(f"Missing key '{config['key']}' in data for 'title' field.")
+                properties[label] = {"title": [{"type": "text", "text": {"content": data[config["key"]]}}]}
+            else:
+                raise ValueError(f"Unsupported field type: {field_type}")
+        except KeyError as e:
+            raise ValueError(f"Error processing field '{field}': {e}") from e
+
+    return properties
+
+
+def make_records(count):
+    sports = ["Running", "Cycling", "Rowing", "Swimming", "Weightlifting"]
+    return [
+        {
+            "id": i,
+            "title": sports[i % len(sports)],
+            "date": f"2024-01-{i % 28 + 1:02d}T07:30:00+00:00",
+            "duration": 30 + i % 60,
+            "distance": round(i % 200 / 10, 1),
+            "sport": sports[i % len(sports)],
+            "calories": 200 + i % 500,
+            "hr_avg": 120 + i % 40,
+            "hr_max": 160 + i % 30,
+            "notes": f"Synthetic workout {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    builder = PropertyBuilder(FIELD_MAPPINGS, resolve_relation)
+
+    assert all(legacy_build_properties(FIELD_MAPPINGS, r) == builder.build(r) for r in records[:1000])
+
+    legacy = min(timeit.repeat(lambda: [legacy_build_properties(FIELD_MAPPINGS, r) for r in records], number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(lambda: [builder.build(r) for r in records], number=1, repeat=args.repeat))
+
+    print(f"records:  {args.records}")
+    print(f"legacy:   {legacy:.3f}s ({legacy / args.records * 1e6:.2f}us/record)")
+    print(f"compiled: {compiled:.3f}s ({compiled / args.records * 1e6:.2f}us/record)")
+    print(f"speedup:  {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
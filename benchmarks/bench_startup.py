@@ -0,0 +1,79 @@
+"""
+Measure CLI and Lambda start-up time with `python -X importtime`, failing if it exceeds a budget.
+
+    python -m benchmarks.bench_startup --budget-ms 150
+    python -m benchmarks.bench_startup --module lambda --top 15
+
+Each run is a fresh interpreter, so the numbers are cold imports. The median of --repeat runs is
+compared against the budget, and the slowest modules of the last run are listed to show what to
+defer next.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str) -> dict:
+    """Run a fresh interpreter importing module and return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"__import__({module!r})"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # The header line
+            continue
+    return times
+
+
+def help_time() -> float:
+    """Wall time in seconds to run `main.py --help`."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--help"], cwd=ROOT, capture_output=True, check=True, env={**os.environ, "COLUMNS": "100"})
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import, e.g. 'main' or 'lambda'.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list.")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Fail if the median import time is over this.")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    median_ms = statistics.median(run[args.module] for run in runs) / 1000
+
+    print(f"import {args.module}: {median_ms:.1f}ms median of {args.repeat} (budget {args.budget_ms:.0f}ms)")
+    if args.module == "main":
+        print(f"main.py --help: {statistics.median(help_time() for _ in range(args.repeat)) * 1000:.1f}ms wall")
+
+    print("slowest imports:")
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    for name, cumulative in [item for item in slowest if item[0] != args.module][:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import {args.module} is {median_ms - args.budget_ms:.1f}ms over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
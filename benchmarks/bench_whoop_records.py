@@ -0,0 +1,147 @@
+"""
+Compare the batched WhoopRecord transform with the original per-workout dicts, from Whoop's JSON to
+Notion properties, by time and by the memory held for the transformed records.
+
+    python -m benchmarks.bench_whoop_records --records 100000
+
+Both paths are warmed up first, then timed in alternating order for --repeat rounds, so drift in the
+machine's speed hits both alike. Times are the median and best of the rounds, and the per-round ratios
+show whether the difference is consistent: a range spanning 1.00x is noise, not a speedup.
+"""
+import argparse
+import statistics
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_property_builder import resolve_relation
+from src.integrations.whoop.fetcher import WhoopFetcher
+from src.integrations.whoop.sport_map import sport_map
+from src.services.property_builder import PropertyBuilder
+
+FIELD_MAPPINGS = {
+    "id": {"label": "Whoop ID", "key": "id", "type": "number"},
+    "title": {"label": "Name", "key": "title", "type": "title"},
+    "date": {"label": "Date", "key": "date", "type": "date"},
+    "duration": {"label": "Duration", "key": "duration", "type": "number"},
+    "distance": {"label": "Distance (km)", "key": "distance", "type": "number"},
+    "sport": {"label": "Sport", "key": "sport", "type": "select"},
+    "calories": {"label": "Calories", "key": "calories", "type": "number"},
+    "hr_avg": {"label": "Average HR", "key": "hr_avg", "type": "number"},
+    "hr_max": {"label": "Max HR", "key": "hr_max", "type": "number"},
+    "activity": {
+        "label": "Activity", "key": "sport", "type": "relation",
+        "relation": {"database_id": "activities", "field_name": "Name"},
+    },
+}
+
+
+def legacy_transform_workouts(workouts):
+    """WhoopFetcher.transform_workouts as it was before records were dataclasses."""
+    transformed_workouts = []
+
+    for entry in workouts:
+        start_time = datetime.fromisoformat(entry['start'].replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(entry['end'].replace('Z', '+00:00'))
+        duration = round((end_time - start_time).total_seconds() / 60)
+        distance = round(entry['score'].get('distance_meter', 0) / 1000, 1)
+        calories = round((entry['score'].get('kilojoule', 0) * 0.239006))
+        sport_type = sport_map.get(entry.get('sport_id', 0), "Unknown")
+
+        transformed_workouts.append({
+            "id": entry["id"],
+            "title": sport_type,
+            "date": start_time.isoformat(),
+            "duration": duration,
+            "distance": distance,
+            "sport": sport_type,
+            "calories": calories,
+            "hr_avg": entry['score'].get('average_heart_rate', 0),
+            "hr_max": entry['score'].get('max_heart_rate', 0),
+        })
+
+    return transformed_workouts
+
+
+def make_workouts(count):
+    sport_ids = list(sport_map)
+    start = datetime(2020, 1, 1, 7, 30, tzinfo=timezone.utc)
+    workouts = []
+    for i in range(count):
+        began = start + timedelta(hours=6 * i)
+        workouts.append({
+            "id": i,
+            "sport_id": sport_ids[i % len(sport_ids)],
+            "start": began.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "end": (began + timedelta(minutes=30 + i % 60)).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "score_state": "SCORED",
+            "score": {
+                "kilojoule": 800 + i % 1500,
+                "distance_meter": i % 20000,
+                "average_heart_rate": 120 + i % 40,
+                "max_heart_rate": 160 + i % 30,
+            },
+        })
+    return workouts
+
+
+def retained_bytes(transform, workouts) -> int:
+    """The memory still allocated for the transformed records once the transform returns."""
+    tracemalloc.start()
+    try:
+        records = transform(workouts)
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del records
+    return retained
+
+
+def time_interleaved(first, second, rounds: int) -> tuple:
+    """Time each callable once per round after a warm-up run, alternating which goes first."""
+    first(), second()
+    first_times, second_times = [], []
+    for round_ in range(rounds):
+        order = ((first, first_times), (second, second_times))
+        for fn, times in order if round_ % 2 == 0 else reversed(order):
+            times.append(timeit.timeit(fn, number=1))
+    return first_times, second_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=11)
+    args = parser.parse_args()
+
+    workouts = make_workouts(args.records)
+    fetcher = WhoopFetcher.__new__(WhoopFetcher)
+    builder = PropertyBuilder(FIELD_MAPPINGS, resolve_relation)
+
+    legacy_records = legacy_transform_workouts(workouts[:1000])
+    records = fetcher.transform_workouts(workouts[:1000])
+    assert [record.to_dict() for record in records] == legacy_records
+    assert all(builder.build(a) == builder.build(b) for a, b in zip(legacy_records, records))
+
+    def legacy():
+        return [builder.build(record) for record in legacy_transform_workouts(workouts)]
+
+    def batched():
+        return [builder.build(record) for record in fetcher.transform_workouts(workouts)]
+
+    legacy_times, batched_times = time_interleaved(legacy, batched, args.repeat)
+    legacy_bytes = retained_bytes(legacy_transform_workouts, workouts)
+    batched_bytes = retained_bytes(fetcher.transform_workouts, workouts)
+    ratios = sorted(a / b for a, b in zip(legacy_times, batched_times))
+
+    print(f"records:  {args.records}, {args.repeat} rounds")
+    for name, times, retained in (("legacy", legacy_times, legacy_bytes), ("batched", batched_times, batched_bytes)):
+        median = statistics.median(times)
+        print(f"{name + ':':<9} {median:.3f}s median, {min(times):.3f}s best "
+              f"({median / args.records * 1e6:.2f}us/record), {retained / args.records:.0f} bytes/record")
+    print(f"time:     {statistics.median(ratios):.2f}x median speedup, {ratios[0]:.2f}x to {ratios[-1]:.2f}x per round"
+          + ("" if ratios[0] > 1 or ratios[-1] < 1 else ", no consistent difference"))
+    print(f"memory:   {legacy_bytes / batched_bytes:.2f}x less")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+In-process stand-ins for the Notion, Whoop and LingQ APIs, used by the offline benchmarks.
+
+The fakes sit at the transport layer: Notion requests go through an httpx.MockTransport and Whoop and
+LingQ requests through a patched requests adapter, so everything above the socket (the API client
+libraries, retries, rate limiting, pagination and JSON handling) runs exactly as it does against the
+real services. Each fake can add latency, enforce a server-side rate limit and inject 429s.
+"""
+import asyncio
+import contextlib
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+WHOOP_AUTH_HOST = "api-7.whoop.com"
+WHOOP_API_HOST = "api.prod.whoop.com"
+LINGQ_HOST = "www.lingq.com"
+WHOOP_PAGE_SIZE = 25
+
+
+class ServerProfile(NamedTuple):
+    """How a fake API behaves: per-request latency, a server-side rate limit and random 429s."""
+    latency_ms: float = 0.0
+    rate: float = 0.0  # requests per second, 0 for unlimited
+    burst: float = 10.0
+    error_rate: float = 0.0  # fraction of requests answered with a 429
+    retry_after: float = 0.05  # seconds, sent with injected 429s
+
+
+class FakeAPI:
+    """Request counting, latency, rate limiting and 429 injection shared by the fakes."""
+
+    def __init__(self, profile: ServerProfile = ServerProfile(), seed: int = 0):
+        self.profile = profile
+        self.calls = Counter()
+        self.throttled = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = profile.burst
+        self._updated = time.monotonic()
+
+    def _throttle(self, endpoint: str):
+        """Return a Retry-After in seconds if the request should be rejected with a 429, otherwise None."""
+        with self._lock:
+            self.calls[endpoint] += 1
+            if self.profile.error_rate and self._random.random() < self.profile.error_rate:
+                self.throttled[endpoint] += 1
+                return self.profile.retry_after
+            if not self.profile.rate:
+                return None
+
+            now = time.monotonic()
+            self._tokens = min(self.profile.burst, self._tokens + (now - self._updated) * self.profile.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self.throttled[endpoint] += 1
+                return (1 - self._tokens) / self.profile.rate
+            self._tokens -= 1
+            return None
+
+    def respond(self, method: str, path: str, query: dict, body):
+        """Return (endpoint, status, payload, headers) for a request."""
+        endpoint = self.endpoint(method, path)
+        retry_after = self._throttle(endpoint)
+        if retry_after is not None:
+            return endpoint, 429, {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"}, {
+                "Retry-After": f"{retry_after:.3f}"
+            }
+        status, payload = self.handle(method, path, query, body)
+        return endpoint, status, payload, {}
+
+    def endpoint(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    def handle(self, method: str, path: str, query: dict, body):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": dict(self.calls), "throttled": dict(self.throttled)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+
+
+def _plain_text(items) -> str:
+    return "".join(item.get("plain_text") or item.get("text", {}).get("content", "") for item in items or [])
+
+
+def _property_id(label: str) -> str:
+    """A stable ID per property label, as a database's properties keep their IDs."""
+    return format(zlib.crc32(label.encode()), "x")[:4]
+
+
+def _as_response_property(label: str, prop: dict) -> dict:
+    """Give a written property the shape Notion returns it in."""
+    prop = json.loads(json.dumps(prop))
+    for key in ("title", "rich_text"):
+        for item in prop.get(key, []):
+            item["plain_text"] = item.get("text", {}).get("content", "")
+    kind = next((key for key in ("number", "date", "title", "rich_text", "select", "relation") if key in prop), None)
+    return {"id": _property_id(label), "type": kind, **prop}
+
+
+def _compare(value: str, operators: dict, length: int = None) -> bool:
+    def bound(operator):
+        return operators[operator][:length] if length else operators[operator]
+    return all((
+        "equals" not in operators or value == bound("equals"),
+        "on_or_after" not in operators or value >= bound("on_or_after"),
+        "after" not in operators or value > bound("after"),
+        "before" not in operators or value < bound("before"),
+        "on_or_before" not in operators or value <= bound("on_or_before"),
+    ))
+
+
+def _matches(page: dict, condition: dict) -> bool:
+    if "and" in condition:
+        return all(_matches(page, c) for c in condition["and"])
+    if "or" in condition:
+        return any(_matches(page, c) for c in condition["or"])
+    if "timestamp" in condition:
+        return _compare(page[condition["timestamp"]], condition[condition["timestamp"]])
+
+    prop = page["properties"].get(condition["property"], {})
+    if "date" in condition:
+        value = ((prop.get("date") or {}).get("start") or "")[:10]
+        if not value:
+            return False
+        return _compare(value, condition["date"], 10)
+    if "number" in condition:
+        return prop.get("number") == condition["number"].get("equals")
+    for key in ("rich_text", "title"):
+        if key in condition:
+            return _plain_text(prop.get("title") or prop.get("rich_text")) == condition[key].get("equals")
+    if "select" in condition:
+        return (prop.get("select") or {}).get("name") == condition["select"].get("equals")
+    raise ValueError(f"Unsupported filter condition {condition}")
+
+
+class FakeNotion(FakeAPI):
+    """
+    Databases of pages supporting retrieve, query (filters, cursors and filter_properties), create and
+    update, including archiving. A database's properties are those written to its pages.
+    """
+
+    def __init__(self, profile: ServerProfile = ServerProfile(), seed: int = 0):
+        super().__init__(profile, seed)
+        self.pages = {}
+        self.databases = {}
+
+    def endpoint(self, method: str, path: str) -> str:
+        parts = path.strip("/").split("/")
+        if parts[0] == "databases":
+            return f"{method} databases/query" if method == "POST" else f"{method} databases"
+        return f"{method} {parts[0]}"
+
+    def page_count(self, database_id: str) -> int:
+        return sum(1 for page_id in self.databases.get(database_id, []) if not self.pages[page_id]["archived"])
+
+    def handle(self, method: str, path: str, query: dict, body):
+        parts = path.strip("/").split("/")
+        if parts[0] == "databases" and method == "POST":
+            return self._query(parts[1], body or {}, query.get("filter_properties"))
+        if parts[0] == "databases" and method == "GET":
+            return self._retrieve(parts[1])
+        if parts == ["pages"] and method == "POST":
+            return self._create(body)
+        if parts[0] == "pages" and method == "PATCH":
+            return self._update(parts[1], body or {})
+        return 404, {"object": "error", "status": 404, "code": "object_not_found", "message": f"No route for {method} {path}"}
+
+    def _retrieve(self, database_id: str):
+        with self._lock:
+            pages = [self.pages[page_id] for page_id in self.databases.get(database_id, [])]
+        properties = {}
+        for page in pages:
+            for label, prop in page["properties"].items():
+                properties.setdefault(label, {"id": prop["id"], "name": label, "type": prop["type"]})
+        return 200, {"object": "database", "id": database_id, "properties": properties}
+
+    def _query(self, database_id: str, body: dict, filter_properties=None):
+        with self._lock:
+            page_ids = list(self.databases.get(database_id, []))
+        pages = [self.pages[page_id] for page_id in page_ids]
+        pages = [page for page in pages if not page["archived"]]
+        if body.get("filter"):
+            pages = [page for page in pages if _matches(page, body["filter"])]
+        for sort in reversed(body.get("sorts") or []):
+            if "timestamp" in sort:
+                pages.sort(key=lambda page: page[sort["timestamp"]], reverse=sort.get("direction") == "descending")
+
+        start = int(body.get("start_cursor") or 0)
+        page_size = min(int(body.get("page_size") or 100), 100)
+        batch = pages[start:start + page_size]
+        if filter_properties:
+            wanted = set([filter_properties] if isinstance(filter_properties, str) else filter_properties)
+            batch = [{**page, "properties": {label: prop for label, prop in page["properties"].items() if prop["id"] in wanted}}
+                     for page in batch]
+        has_more = start + page_size < len(pages)
+        return 200, {
+            "object": "list",
+            "results": batch,
+            "has_more": has_more,
+            "next_cursor": str(start + page_size) if has_more else None,
+        }
+
+    def _create(self, body: dict):
+        database_id = body["parent"]["database_id"]
+        page = {
+            "object": "page",
+            "id": str(uuid.uuid4()),
+            "archived": False,
+            "created_time": _notion_time(),
+            "last_edited_time": _notion_time(),
+            "properties": {label: _as_response_property(label, prop) for label, prop in body["properties"].items()},
+        }
+        with self._lock:
+            self.pages[page["id"]] = page
+            self.databases.setdefault(database_id, []).append(page["id"])
+        return 200, page
+
+    def _update(self, page_id: str, body: dict):
+        page = self.pages.get(page_id)
+        if page is None:
+            return 404, {"object": "error", "status": 404, "code": "object_not_found", "message": f"Could not find page {page_id}"}
+        if page["archived"] and not body.get("archived") is False:
+            return 400, {"object": "error", "status": 400, "code": "validation_error",
+                         "message": "Can't edit block that is archived. You must unarchive the block before editing."}
+        with self._lock:
+            for label, prop in (body.get("properties") or {}).items():
+                page["properties"][label] = _as_response_property(label, prop)
+            if "archived" in body:
+                page["archived"] = bool(body["archived"])
+            page["last_edited_time"] = _notion_time()
+        return 200, page
+
+
+def _notion_time() -> str:
+    """Now, rounded down to the minute as Notion reports edit times."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _whoop_time(moment: datetime) -> str:
+    return moment.isoformat(timespec="milliseconds") + "Z"
+
+
+class FakeWhoop(FakeAPI):
+    """Whoop's password login and its paginated workout, sleep and recovery collections."""
+
+    def __init__(self, profile: ServerProfile = ServerProfile(), seed: int = 0):
+        super().__init__(profile, seed)
+        self.workouts = []
+        self.sleeps = []
+        self.recoveries = []
+
+    def endpoint(self, method: str, path: str) -> str:
+        return f"{method} {path.replace('/developer/', '').strip('/')}"
+
+    def load(self, workouts: int = 0, sleeps: int = 0, end: date = None):
+        """Generate workouts (three a day) and nightly sleeps with recoveries, ending on end."""
+        end = end or date.today() - timedelta(days=1)
+        self.workouts, self.sleeps, self.recoveries = [], [], []
+        for i in range(workouts):
+            day = end - timedelta(days=i // 3)
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=7 + (i % 3) * 4)
+            self.workouts.append({
+                "id": 100000 + i, "user_id": 1, "created_at": _whoop_time(start + timedelta(hours=1)),
+                "updated_at": _whoop_time(start + timedelta(hours=2)), "start": _whoop_time(start),
+                "end": _whoop_time(start + timedelta(minutes=30 + i % 60)), "timezone_offset": "+00:00",
+                "sport_id": [0, 1, 33, 44, 63][i % 5], "score_state": "SCORED",
+                "score": {"strain": 10.5, "average_heart_rate": 120 + i % 40, "max_heart_rate": 160 + i % 30,
+                          "kilojoule": 800.0 + i % 900, "distance_meter": 1000.0 * (i % 15)},
+            })
+        for i in range(sleeps):
+            start = datetime.combine(end - timedelta(days=i), datetime.min.time()) + timedelta(hours=22, minutes=i % 60)
+            finish = start + timedelta(hours=8)
+            sleep_id = 500000 + i
+            self.sleeps.append({
+                "id": sleep_id, "user_id": 1, "created_at": _whoop_time(finish), "updated_at": _whoop_time(finish + timedelta(hours=1)),
+                "start": _whoop_time(start), "end": _whoop_time(finish), "timezone_offset": "+00:00", "nap": False,
+                "score_state": "SCORED",
+                "score": {"sleep_performance_percentage": 70 + i % 30, "sleep_consistency_percentage": 60 + i % 40,
+                          "sleep_efficiency_percentage": 85.0 + (i % 100) / 10},
+            })
+            self.recoveries.append({
+                "cycle_id": 900000 + i, "sleep_id": sleep_id, "user_id": 1, "created_at": _whoop_time(finish),
+                "updated_at": _whoop_time(finish + timedelta(hours=1)), "score_state": "SCORED", "start": _whoop_time(start),
+                "score": {"recovery_score": 30 + i % 70, "resting_heart_rate": 50 + i % 15, "hrv_rmssd_milli": 60.0},
+            })
+
+    def handle(self, method: str, path: str, query: dict, body):
+        if path.endswith("/oauth/token"):
+            return 200, {"access_token": uuid.uuid4().hex, "token_type": "bearer", "expires_in": 3600,
+                         "refresh_token": uuid.uuid4().hex, "user": {"id": 1}}
+
+        collections = {
+            "/developer/v1/activity/workout": self.workouts,
+            "/developer/v1/activity/sleep": self.sleeps,
+            "/developer/v1/recovery": self.recoveries,
+        }
+        if path not in collections:
+            return 404, {"message": f"No route for {method} {path}"}
+
+        start = query.get("start", "")[:19]
+        end = query.get("end", "9999")[:19]
+        records = [record for record in collections[path] if start <= record["start"][:19] <= end]
+        records.sort(key=lambda record: record["start"], reverse=True)
+
+        offset = int(query.get("nextToken") or 0)
+        limit = int(query.get("limit") or WHOOP_PAGE_SIZE)
+        page = records[offset:offset + limit]
+        return 200, {"records": page, "next_token": str(offset + limit) if offset + limit < len(records) else None}
+
+
+class FakeLingQ(FakeAPI):
+    """LingQ's languages endpoint, with today's known word count per language."""
+
+    def __init__(self, profile: ServerProfile = ServerProfile(), seed: int = 0):
+        super().__init__(profile, seed)
+        self.languages = []
+
+    def endpoint(self, method: str, path: str) -> str:
+        return f"{method} {path.strip('/').split('/')[-1]}"
+
+    def load(self, languages: int = 3):
+        codes = ["de", "fr", "es", "it", "ja", "pt", "ru", "zh", "ko", "nl"]
+        self.languages = [
+            {"id": i, "code": codes[i % len(codes)] + (str(i // len(codes)) if i >= len(codes) else ""),
+             "title": f"Language {i}", "knownWords": 1000 + 37 * i}
+            for i in range(languages)
+        ]
+
+    def handle(self, method: str, path: str, query: dict, body):
+        if path.endswith("/languages"):
+            return 200, self.languages
+        return 404, {"detail": "Not found."}
+
+
+def _httpx_response(fake: FakeAPI, request: httpx.Request) -> httpx.Response:
+    # Repeated parameters, such as Notion's filter_properties, are kept as lists
+    params = request.url.params
+    query = {key: params.get_list(key) if len(params.get_list(key)) > 1 else params[key] for key in params.keys()}
+    body = json.loads(request.content) if request.content else None
+    path = request.url.path.replace("/v1/", "/", 1)
+    _, status, payload, headers = fake.respond(request.method, path, query, body)
+    return httpx.Response(status, json=payload, headers=headers)
+
+
+@contextlib.contextmanager
+def installed(notion: FakeNotion = None, whoop: FakeWhoop = None, lingq: FakeLingQ = None):
+    """
+    Route Notion, Whoop and LingQ traffic to the fakes for the duration of the block. Latency is slept
+    per request, with asyncio.sleep for the async Notion client so concurrent writes overlap as they would.
+    """
+    from src.services import notion_api, notion_writer
+
+    def sync_handler(request):
+        if notion.profile.latency_ms:
+            time.sleep(notion.profile.latency_ms / 1000)
+        return _httpx_response(notion, request)
+
+    async def async_handler(request):
+        if notion.profile.latency_ms:
+            await asyncio.sleep(notion.profile.latency_ms / 1000)
+        return _httpx_response(notion, request)
+
+    hosts = {WHOOP_AUTH_HOST: whoop, WHOOP_API_HOST: whoop, LINGQ_HOST: lingq}
+
+    def send(adapter, request, **kwargs):
+        url = urlsplit(request.url)
+        fake = hosts.get(url.hostname)
+        if fake is None:
+            raise requests.ConnectionError(f"No fake API for {url.hostname}")
+        if fake.profile.latency_ms:
+            time.sleep(fake.profile.latency_ms / 1000)
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = request.body
+        if isinstance(body, bytes):
+            body = body.decode()
+        body = json.loads(body) if body and body.lstrip().startswith("{") else body
+        _, status, payload, headers = fake.respond(request.method, url.path, query, body)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update({"Content-Type": "application/json", **headers})
+        response._content = json.dumps(payload).encode()
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    original_client = notion_api.RetryingClient
+    original_async_client = notion_writer.RetryingAsyncClient
+    original_send = HTTPAdapter.send
+
+    def client_factory(*args, **kwargs):
+        return original_client(*args, client=httpx.Client(transport=httpx.MockTransport(sync_handler)), **kwargs)
+
+    def async_client_factory(*args, **kwargs):
+        return original_async_client(*args, client=httpx.AsyncClient(transport=httpx.MockTransport(async_handler)), **kwargs)
+
+    if notion is not None:
+        notion_api.RetryingClient = client_factory
+        notion_writer.RetryingAsyncClient = async_client_factory
+    HTTPAdapter.send = send
+    try:
+        yield
+    finally:
+        notion_api.RetryingClient = original_client
+        notion_writer.RetryingAsyncClient = original_async_client
+        HTTPAdapter.send = original_send
@@ -1,85 +1,276 @@
+import time
+
+_module_started = time.perf_counter()
+
 import os
+import threading
 from pathlib import Path
 from datetime import datetime
-from src.integrations.lingq.fetcher import LingQFetcher
-from src.integrations.whoop.fetcher import WhoopFetcher
-from src.services.notion import NotionClient
+from src.services.orchestrator import INTEGRATIONS, SyncPlan, format_report, integration_job, overall_status, run_integrations
+from src.services.sync import (
+    backfill_sleep_and_recovery,
+    backfill_workouts,
+    sync_lingq as run_lingq_sync,
+    sync_sleep_and_recovery_incremental,
+    sync_workouts_incremental,
+)
+from src.utils.datetime_utils import parse_date
+from src.utils.deadline import Deadline
 
-from src.utils.logger import get_logger
+from src.utils.logger import flush_logs, get_logger
+from src.utils.metrics import metrics, profiled
+from src.utils.retry import reset_retries
 
 logger = get_logger()
 
+_module_init_ms = (time.perf_counter() - _module_started) * 1000
+
 # Configuration
 notion_config_path = Path(__file__).resolve().parent / "src" / "config" / "notion.config.yml"
 
-# Initialize services
+# Number of concurrent Notion writers, see NotionClient.upsert_pages
+notion_write_concurrency = int(os.getenv('NOTION_WRITE_CONCURRENCY', '1'))
+
+# Scheduled runs only sync what changed since the last run when SYNC_STRATEGY is 'incremental'
+sync_strategy = os.getenv('SYNC_STRATEGY', 'range').lower()
+incremental_lookback_days = int(os.getenv('INCREMENTAL_LOOKBACK_DAYS', '2'))
+
+# Integrations run by MODE=all, comma separated
+all_mode_integrations = [name.strip() for name in os.getenv('SYNC_INTEGRATIONS', ','.join(INTEGRATIONS)).split(',') if name.strip()]
+
+# Whoop ranges are synced in windows of this many days, checkpointed after each one, and a run stops
+# before a window that wouldn't finish with BACKFILL_RESERVE_SECONDS of the invocation's time left.
+# The next invocation for the same range carries on from the checkpoint.
+backfill_window_days = int(os.getenv('BACKFILL_WINDOW_DAYS', '7'))
+backfill_reserve_seconds = float(os.getenv('BACKFILL_RESERVE_SECONDS', '2'))
+
+# Accounts synced at once by MODE=accounts, defaulting to all of them up to 8
+accounts_workers = int(os.getenv('ACCOUNTS_WORKERS', '0')) or None
+
+# Services are created on first use and kept for the life of the container, so warm invocations reuse
+# the authenticated Whoop session, the parsed Notion config and the Notion connection pool. The sync,
+# orchestration and retry modules above are imported by every cold start, but none of them loads an API
+# client or asyncio. The integration and Notion modules are imported by their getters, so the LingQ
+# function never imports authlib and the Whoop functions never import the LingQ fetcher.
+_services = {}
+_services_lock = threading.Lock()
+_invocations = 0
+
+def get_service(name, factory):
+    # MODE=all runs integrations on threads, so creation is locked to keep one Whoop login
+    with _services_lock:
+        if name not in _services:
+            _services[name] = factory()
+        return _services[name]
+
+def get_lingq_service():
+    from src.integrations.lingq.fetcher import LingQFetcher
+    return get_service("lingq", LingQFetcher)
 
-def sync_lingq(lingq_service, date_str):
+def get_whoop_service():
+    from src.integrations.whoop.fetcher import WhoopFetcher
+    return get_service("whoop", WhoopFetcher)
+
+def get_notion_client(integration_name):
+    from src.services.notion import NotionClient
+    from src.services.snapshot import get_default_snapshot
+    from src.services.sync_state import get_default_store
+
+    notion_client = get_service(
+        f"notion:{integration_name}",
+        lambda: NotionClient(str(notion_config_path), integration_name, state_store=get_default_store(), snapshot=get_default_snapshot())
+    )
+    # Stats are reported per invocation
+    notion_client.stats.clear()
+    return notion_client
+
+def sync_lingq(lingq_service):
     logger.info("Running LingQ sync...")
-    notion_client = NotionClient(str(notion_config_path), "lingq")
-    word_counts = lingq_service.get_daily_word_counts()
-    for word_count in word_counts:
-        notion_client.create_page(word_count)
-    logger.info("LingQ sync completed.")
-
-def sync_whoop_workout(whoop_service, date_str):
-    logger.info("Running Whoop workout sync...")
-    notion_client = NotionClient(str(notion_config_path), "whoop-workout")
-    
-    workouts = whoop_service.get_workouts_for_given_date(date_str)
-    transformed_workouts = whoop_service.transform_workouts(workouts)
-    for workout in transformed_workouts:
-        notion_client.update_or_create_page(date_str, workout, "id", "Whoop ID")
-    logger.info("Whoop workout sync completed.")
-
-def sync_whoop_sleep_and_recovery(whoop_service, date_str):
-    logger.info("Running Whoop sleep and recovery sync...")
-    notion_client = NotionClient(str(notion_config_path), "whoop-sleep-and-recovery")
-    sleep_and_recovery = whoop_service.get_sleep_and_recovery(date_str)
-    notion_client.update_or_create_page(date_str, sleep_and_recovery, "id", "Whoop ID", use_two_day_period=True)
-    logger.info("Whoop sleep and recovery sync completed.")
-
-def mode_handler(mode, date_str):
+    notion_client = get_notion_client("lingq")
+    count = run_lingq_sync(lingq_service, notion_client, concurrency=notion_write_concurrency)
+    logger.info("LingQ sync completed. Synced %d word counts.", count)
+
+def backfill_report(result, records):
+    """None once the backfill is complete, otherwise a response saying where the next invocation resumes."""
+    if result.complete:
+        logger.info("Synced %d %s.", result.synced, records)
+        return None
+    logger.info("Stopped before the timeout after syncing %d %s, the next invocation resumes from %s.", result.synced, records, result.next_end)
+    return {"status": "incomplete", "synced": result.synced, "resume_from": result.next_end.isoformat()}
+
+def sync_whoop_workout(whoop_service, start_str, end_str, deadline=None):
+    from src.services.sync_state import get_default_store
+
+    logger.info("Running Whoop workout sync for %s to %s...", start_str, end_str)
+    notion_client = get_notion_client("whoop-workout")
+    result = backfill_workouts(whoop_service, notion_client, parse_date(start_str), parse_date(end_str), backfill_window_days,
+                               notion_write_concurrency, get_default_store(), deadline)
+    return backfill_report(result, "workouts")
+
+def sync_whoop_sleep_and_recovery(whoop_service, start_str, end_str, deadline=None):
+    from src.services.sync_state import get_default_store
+
+    logger.info("Running Whoop sleep and recovery sync for %s to %s...", start_str or 'first record', end_str)
+    notion_client = get_notion_client("whoop-sleep-and-recovery")
+    start_date = parse_date(start_str) if start_str else None
+    result = backfill_sleep_and_recovery(whoop_service, notion_client, start_date, parse_date(end_str), backfill_window_days,
+                                         notion_write_concurrency, get_default_store(), deadline)
+    return backfill_report(result, "sleep and recovery records")
+
+def sync_whoop_incremental(whoop_service, integration_name):
+    from src.services.sync_state import get_default_store
+
+    store = get_default_store()
+    if store is None:
+        raise RuntimeError("Incremental sync needs the sync state store, which is disabled by SYNC_STATE_PATH.")
+
+    logger.info("Running incremental %s sync...", integration_name)
+    notion_client = get_notion_client(integration_name)
+    sync = sync_workouts_incremental if integration_name == "whoop-workout" else sync_sleep_and_recovery_incremental
+    count = sync(whoop_service, notion_client, store, incremental_lookback_days, notion_write_concurrency)
+    logger.info("Incremental %s sync completed. Synced %d changed records.", integration_name, count)
+
+def sync_all(date_str, end_str, incremental):
+    from src.services.sync_state import get_default_store
+
+    unknown = [name for name in all_mode_integrations if name not in INTEGRATIONS]
+    if unknown:
+        raise RuntimeError(f"Unknown integration in SYNC_INTEGRATIONS: {', '.join(unknown)}")
+
+    plan = SyncPlan(parse_date(date_str), parse_date(end_str), incremental, incremental_lookback_days, notion_write_concurrency)
+    get_integration_service = lambda kind: get_lingq_service() if kind == "lingq" else get_whoop_service()
+    jobs = {
+        name: integration_job(name, plan, get_integration_service, get_notion_client, get_default_store())
+        for name in all_mode_integrations
+    }
+
+    started = time.perf_counter()
+    results = run_integrations(jobs)
+    logger.info(format_report(results, time.perf_counter() - started))
+    return {
+        "status": overall_status(results),
+        "integrations": [
+            {"name": r.name, "status": r.status, "count": r.count, "seconds": round(r.seconds, 3), "error": r.error}
+            for r in results
+        ],
+    }
+
+def sync_accounts(date_str, end_str, incremental):
+    from src.services.accounts import (
+        AccountServices,
+        accounts_report,
+        default_accounts_path,
+        format_accounts_report,
+        load_accounts,
+        run_accounts,
+    )
+
+    try:
+        accounts = load_accounts(default_accounts_path())
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Could not load the accounts config: {e}")
+
+    plan = SyncPlan(parse_date(date_str), parse_date(end_str), incremental, incremental_lookback_days, notion_write_concurrency)
+    # Each account's services are kept for warm invocations, like the single account ones
+    services_for = lambda account: get_service(f"account:{account.name}", lambda: AccountServices(account, str(notion_config_path)))
+
+    started = time.perf_counter()
+    results = run_accounts(accounts, plan, str(notion_config_path), accounts_workers, services_for=services_for)
+    logger.info(format_accounts_report(results, time.perf_counter() - started))
+    return accounts_report(results)
+
+def mode_handler(mode, date_str, end_str=None, incremental=False, deadline=None):
+    if mode == 'all':
+        return sync_all(date_str, end_str or date_str, incremental)
+    if mode == 'accounts':
+        return sync_accounts(date_str, end_str or date_str, incremental)
+
+    if incremental and mode in ('whoop-workout', 'whoop-sleep-and-recovery'):
+        sync_whoop_incremental(get_whoop_service(), mode)
+        return
+
     match mode:
         case 'lingq':
-            lingq_service = LingQFetcher()
-            sync_lingq(lingq_service, date_str)
+            lingq_service = get_lingq_service()
+            sync_lingq(lingq_service)
         case 'whoop-workout':
-            whoop_service = WhoopFetcher()
-            sync_whoop_workout(whoop_service, date_str)
+            whoop_service = get_whoop_service()
+            return sync_whoop_workout(whoop_service, date_str, end_str or date_str, deadline)
         case 'whoop-sleep-and-recovery':
-            whoop_service = WhoopFetcher()
-            sync_whoop_sleep_and_recovery(whoop_service, date_str)
+            whoop_service = get_whoop_service()
+            # No start date means loop back to the first available record
+            return sync_whoop_sleep_and_recovery(whoop_service, date_str, end_str or date_str, deadline)
         case _:
             raise RuntimeError("Provided mode does not match a defined mode.")
 
+def emit_metrics(mode, source, status, cold, context):
+    # Reporting metrics must never fail the sync itself
+    try:
+        metrics.emit(dimensions={"mode": mode}, source=source, status=status, cold_start=cold,
+                     request_id=getattr(context, "aws_request_id", None))
+    except Exception as e:
+        logger.warning("Could not emit run metrics: %s", e)
+
 def lambda_handler(event, context):
-    mode = os.getenv('MODE').lower()
+    global _invocations
+    _invocations += 1
+    started = time.perf_counter()
+    cold = not _services
+    metrics.reset()
+    reset_retries()
+
+    mode = os.getenv('MODE')
     if mode is None:
         logger.error("Envrionment variable MODE is None.")
         return {"status": "error", "message": "Environment variable MODE is None."}
+    mode = mode.lower()
     
     default_date = datetime.now().strftime('%Y-%m-%d')
     
     if "queryStringParameters" in event:
-        query_params = event.get("queryStringParameters", {})
-        date_str = query_params.get("date", default_date)
+        query_params = event.get("queryStringParameters") or {}
+        date_str = query_params.get("start", query_params.get("date", default_date))
+        end_str = query_params.get("end", date_str)
         source = "API Gateway"
-    elif "source" in event and event["source"] == "aws.event":
-        date_str = default_date
+    elif event.get("source") in ("aws.events", "aws.event"):
+        date_str = end_str = default_date
         source = "EventBridge"
     else:
-        date_str = default_date
+        date_str = event.get("start", event.get("date", default_date))
+        end_str = event.get("end", date_str)
         source = "Manual Trigger"
+        if event.get("loop_until_first") and mode == "whoop-sleep-and-recovery":
+            date_str = None
 
-    logger.info(f"Sync triggered from {source} for date: {date_str} in mode: {mode}")
+    # Only scheduled runs are incremental, so explicit dates from API Gateway or a manual trigger are honoured
+    incremental = source == "EventBridge" and sync_strategy == "incremental"
+
+    if incremental:
+        logger.info("Incremental sync triggered from %s in mode: %s", source, mode)
+    else:
+        logger.info("Sync triggered from %s for %s to %s in mode: %s", source, date_str, end_str, mode)
+    status = "error"
     try:
-        mode_handler(mode, date_str)
+        deadline = Deadline.from_lambda_context(context, backfill_reserve_seconds)
+        with profiled():
+            report = mode_handler(mode, date_str, end_str, incremental, deadline)
+        status = report["status"] if report is not None else "success"
     except RuntimeError as e:
-        logger.error(f"Mode error: {e}")
+        logger.error("Mode error: %s", e)
         return {"status": "error", "message": str(e)}
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         return {"status": "error", "message": f"Unexpected error occurred: {str(e)}"}
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if cold:
+            logger.info("Cold invocation took %.0f ms after %.0f ms of module init.", elapsed_ms, _module_init_ms)
+        else:
+            logger.info("Warm invocation #%d took %.0f ms.", _invocations, elapsed_ms)
+        emit_metrics(mode, source, status, cold, context)
+        # The container is frozen once the handler returns, so don't leave records in the background queue
+        flush_logs()
 
+    if report is not None:
+        return report
     return {"status": "success"}
@@ -1,12 +1,13 @@
+import sys
+import threading
+import time
 import typer
-import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
-from src.integrations.lingq.fetcher import LingQFetcher
-from src.integrations.whoop.fetcher import WhoopFetcher
+from typing import List, Optional
+from src.utils.datetime_utils import parse_date
 from src.utils.logger import get_logger
-from src.services.notion import NotionClient
+from src.utils.metrics import FORMATS, metrics, profiled
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,28 +18,165 @@ logger = get_logger()
 # Configuration
 notion_config_path = Path(__file__).resolve().parent / "src" / "config" / "notion.config.yml"
 
-# Initialize services
-lingq_service = LingQFetcher()
-whoop_service = WhoopFetcher()
+# Services are created on first use by the commands that need them, and the modules behind them
+# (requests, authlib, notion_client, httpx, yaml) are only imported then. That keeps `--help` fast
+# and means a LingQ sync never logs in to Whoop.
+_services = {}
+# `sync all` runs integrations on threads, and the two Whoop integrations must share one login
+_services_lock = threading.Lock()
+
+def get_lingq_service():
+    with _services_lock:
+        if "lingq" not in _services:
+            from src.integrations.lingq.fetcher import LingQFetcher
+            _services["lingq"] = LingQFetcher()
+        return _services["lingq"]
+
+def get_whoop_service():
+    with _services_lock:
+        if "whoop" not in _services:
+            from src.integrations.whoop.fetcher import WhoopFetcher
+            _services["whoop"] = WhoopFetcher()
+        return _services["whoop"]
+
+def get_service(kind: str):
+    return get_lingq_service() if kind == "lingq" else get_whoop_service()
+
+def get_notion_client(integration_name: str, use_state_store: bool = True):
+    from src.services.notion import NotionClient
+    from src.services.snapshot import get_default_snapshot
+    from src.services.sync_state import get_default_store
+    return NotionClient(
+        str(notion_config_path), integration_name,
+        state_store=get_default_store() if use_state_store else None,
+        snapshot=get_default_snapshot(),
+    )
+
+def get_state_store():
+    from src.services.sync_state import get_default_store
+    return get_default_store()
+
+def record_subcommand(ctx: typer.Context):
+    # The contexts of a command and its groups share meta, so the run's metrics can name the full command
+    ctx.meta.setdefault("command", []).append(ctx.invoked_subcommand)
 
 app = typer.Typer(help="Notion dashboard CLI: Sync data from multiple sources with Notion database tables.")
-whoop_app = typer.Typer(help="Whoop-related commands")
+whoop_app = typer.Typer(help="Whoop-related commands", callback=record_subcommand)
 app.add_typer(whoop_app, name="whoop")
+state_app = typer.Typer(help="Local sync state commands", callback=record_subcommand)
+app.add_typer(state_app, name="state")
+sync_app = typer.Typer(help="Run several integrations together", callback=record_subcommand)
+app.add_typer(sync_app, name="sync")
+snapshot_app = typer.Typer(help="Local snapshots of the Notion databases", callback=record_subcommand)
+app.add_typer(snapshot_app, name="snapshot")
+
+def report_metrics(ctx: typer.Context, metrics_format: Optional[str]):
+    """
+    Report the run's metrics, if anything was recorded, to standard error, which keeps them out of
+    output a command writes to standard output, such as `snapshot export`'s CSV.
+    """
+    if metrics.recorded():
+        metrics.emit(metrics_format, stream=sys.stderr, command=" ".join(ctx.meta.get("command", [])))
+
+@app.callback()
+def instrument(
+    ctx: typer.Context,
+    metrics_format: Optional[str] = typer.Option(
+        None,
+        "--metrics",
+        help=f"How to report the run's API call metrics when the command finishes: {', '.join(FORMATS)}. Defaults to METRICS_FORMAT, or text."
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        "--profile",
+        help="Profile the command with 'cprofile' or 'pyinstrument'. Defaults to PROFILE."
+    ),
+    profile_output: Optional[str] = typer.Option(
+        None,
+        "--profile-output",
+        help="File to save the profile to, e.g. 'sync.prof' for cProfile. Defaults to PROFILE_OUTPUT."
+    )
+):
+    if metrics_format and metrics_format.lower() not in FORMATS:
+        raise typer.BadParameter(f"Unknown metrics format '{metrics_format}', expected one of {', '.join(FORMATS)}.")
+
+    from src.utils.retry import reset_retries
+
+    metrics.reset()
+    reset_retries()
+    record_subcommand(ctx)
+    ctx.call_on_close(lambda: report_metrics(ctx, metrics_format))
+    try:
+        ctx.with_resource(profiled(profile, profile_output))
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
 
-def sync_lingq():
+def sync_lingq(concurrency: int = 1):
     """
     Sync LingQ data with Notion.
     """
-    notion_client = NotionClient(str(notion_config_path), "lingq")
     logger.info("Running LingQ sync...")
     try:
-        word_counts = lingq_service.get_daily_word_counts()
-        for word_count in word_counts:
-            notion_client.create_page("lingq", word_count)
-        logger.info(f"[{datetime.now()}] LingQ sync completed.")
+        from src.services.sync import sync_lingq as run_lingq_sync
+
+        count = run_lingq_sync(get_lingq_service(), get_notion_client("lingq"), concurrency)
+        logger.info("[%s] LingQ sync completed. Synced %d word counts.", datetime.now(), count)
+    except Exception as e:
+        logger.error("Error during LingQ sync: %s", e)
+        raise typer.Exit(code=1)
+
+def resolve_date_range(date: Optional[str], start: Optional[str], end: Optional[str]):
+    """Resolve the --date or --start/--end options into an inclusive (start, end) pair of dates."""
+    if date and (start or end):
+        raise typer.BadParameter("Use either --date or --start/--end, not both.")
+
+    try:
+        if start or end:
+            end_date = parse_date(end) if end else datetime.now().date()
+            start_date = parse_date(start) if start else end_date
+            if start_date > end_date:
+                raise typer.BadParameter(f"--start {start_date} is after --end {end_date}.")
+            return start_date, end_date
+
+        day = parse_date(date) if date else datetime.now().date()
+        return day, day
+    except ValueError as e:
+        raise typer.BadParameter(f"Invalid date: {e}. Expected YYYY-MM-DD.")
+
+def backfill_checkpointing(time_budget: Optional[float]):
+    """The state store and deadline for a resumable backfill within time_budget seconds, or (None, None) without a budget."""
+    if time_budget is None:
+        return None, None
+    from src.utils.deadline import Deadline
+
+    store = get_state_store()
+    if store is None:
+        logger.warning("The sync state store is disabled by SYNC_STATE_PATH, so a backfill stopped by --time-budget can't be resumed.")
+    return store, Deadline(time_budget)
+
+def log_backfill_result(result, records: str):
+    if result.complete:
+        logger.info("Synced %d %s.", result.synced, records)
+    else:
+        logger.info("Stopped at the time budget after syncing %d %s. Run the same command again to resume from %s.", result.synced, records, result.next_end)
+
+def run_incremental_sync(integration: str, lookback_days: int, concurrency: int):
+    """Sync the Whoop records changed since the integration's stored watermark."""
+    store = get_state_store()
+    if store is None:
+        logger.error("Incremental sync needs the sync state store, which is disabled by SYNC_STATE_PATH.")
+        raise typer.Exit(code=1)
+
+    logger.info("Running incremental %s sync...", integration)
+    try:
+        from src.services.sync import sync_sleep_and_recovery_incremental, sync_workouts_incremental
+
+        sync = sync_workouts_incremental if integration == "whoop-workout" else sync_sleep_and_recovery_incremental
+        count = sync(get_whoop_service(), get_notion_client(integration), store, lookback_days, concurrency)
     except Exception as e:
-        logger.error(f"Error during LingQ sync: {e}")
+        logger.error("Error during incremental %s sync: %s", integration, e)
         raise typer.Exit(code=1)
+    logger.info("Incremental %s sync completed. Synced %d changed records.", integration, count)
 
 @whoop_app.command("workouts")
 def sync_whoop_workouts(
@@ -46,25 +184,69 @@ def sync_whoop_workouts(
         None,
         "--date", "-d",
         help="Date for syncing Whoop data (in ISO8601 format, e.g. '2024-03-20'). Defaults to today."
+    ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--start", "-s",
+        help="First date of a range to sync (in ISO8601 format, e.g. '2024-01-01')."
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end", "-e",
+        help="Last date of a range to sync (in ISO8601 format, e.g. '2024-03-31'). Defaults to today."
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers, rate limited to Notion's average of three requests per second."
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental", "-i",
+        help="Only sync records created or updated since the last incremental sync."
+    ),
+    lookback_days: int = typer.Option(
+        2,
+        "--lookback-days",
+        min=0,
+        help="With --incremental, days before the last sync to re-read for records scored or edited late."
+    ),
+    time_budget: Optional[float] = typer.Option(
+        None,
+        "--time-budget", "-t",
+        min=1,
+        help="Seconds to spend on a range before stopping cleanly. Progress is checkpointed per window, and running the same range again resumes it."
+    ),
+    window_days: int = typer.Option(
+        30,
+        "--window-days", "-w",
+        min=1,
+        help="With --time-budget, number of days synced and checkpointed at a time."
     )
 ):
     """Sync Whoop workout activity with Notion."""
-    notion_client = NotionClient(str(notion_config_path), "whoop-workout")
-    logger.info("Running Whoop workouts sync...")
+    if incremental:
+        if date or start or end:
+            raise typer.BadParameter("--incremental cannot be combined with --date or --start/--end.")
+        run_incremental_sync("whoop-workout", lookback_days, concurrency)
+        return
+
+    start_date, end_date = resolve_date_range(date, start, end)
+    logger.info("Running Whoop workouts sync for %s to %s...", start_date, end_date)
     try:
-        if date is None:
-            date = datetime.now().date()
+        from src.services.sync import backfill_workouts, sync_workouts
+
+        notion_client = get_notion_client("whoop-workout")
+        if time_budget is None:
+            count = sync_workouts(get_whoop_service(), notion_client, start_date, end_date, concurrency)
+            logger.info("Synced %d workouts.", count)
         else:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-
-        workouts = whoop_service.get_workouts_for_given_date(date)
-        transformed_workouts = whoop_service.transform_workouts(workouts)
-        for workout in transformed_workouts:
-            notion_client.update_or_create_page(date.isoformat(), workout, 'id', 'Whoop ID')
-            logger.info(f"Pushed {workout['sport']} activity to Notion")            
-        
+            store, deadline = backfill_checkpointing(time_budget)
+            result = backfill_workouts(get_whoop_service(), notion_client, start_date, end_date, window_days, concurrency, store, deadline)
+            log_backfill_result(result, "workouts")
     except Exception as e:
-        logger.error(f"Error during Whoop workout sync: {e}")
+        logger.error("Error during Whoop workout sync: %s", e)
         raise typer.Exit(code=1)
     logger.info("Whoop workout sync completed.")
 
@@ -75,47 +257,424 @@ def sync_whoop_sleep_and_recovery(
         "--date", "-d",
         help="Date for syncing Whoop data (in ISO8601 format, e.g. '2024-03-20'). Defaults to today."
     ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--start", "-s",
+        help="First date of a range to sync (in ISO8601 format, e.g. '2024-01-01')."
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end", "-e",
+        help="Last date of a range to sync (in ISO8601 format, e.g. '2024-03-31'). Defaults to today."
+    ),
     loop_until_first: bool = typer.Option(
         False,
         "--loop-until-first", "-l",
         help="Loop through days, syncing data until the first day of available data is reached."
+    ),
+    window_days: int = typer.Option(
+        30,
+        "--window-days", "-w",
+        min=1,
+        help="Number of days fetched from Whoop per request window when syncing a range."
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers, rate limited to Notion's average of three requests per second."
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental", "-i",
+        help="Only sync records created or updated since the last incremental sync."
+    ),
+    lookback_days: int = typer.Option(
+        2,
+        "--lookback-days",
+        min=0,
+        help="With --incremental, days before the last sync to re-read for records scored or edited late."
+    ),
+    time_budget: Optional[float] = typer.Option(
+        None,
+        "--time-budget", "-t",
+        min=1,
+        help="Seconds to spend before stopping cleanly. Progress is checkpointed per window, and running the same command again resumes it."
     )
 ):
     """Sync Whoop sleep and recovery data with Notion."""
-    notion_client = NotionClient(str(notion_config_path), "whoop-sleep-and-recovery")
-    logger.info("Running Whoop sleep and recovery sync...")
-    try:
-        if date is None:
-            date = datetime.now().date().isoformat()
+    if incremental:
+        if date or start or end or loop_until_first:
+            raise typer.BadParameter("--incremental cannot be combined with --date, --start/--end or --loop-until-first.")
+        run_incremental_sync("whoop-sleep-and-recovery", lookback_days, concurrency)
+        return
 
-        while True:
-            logger.info(f"Processing data for date: {date}")
+    start_date, end_date = resolve_date_range(date, start, end)
+    if loop_until_first:
+        if start:
+            raise typer.BadParameter("--loop-until-first cannot be combined with --start.")
+        start_date = None
 
-            sleep_and_recovery = whoop_service.get_sleep_and_recovery(date)
-            if sleep_and_recovery:
-                logger.info(f"Found sleep and recovery data for {date}")
-                logger.debug(f"Sleep and recovery data: {sleep_and_recovery}")
-                notion_client.update_or_create_page(date, sleep_and_recovery, "id", "Whoop ID", use_two_day_period=True)
-                logger.info(f"Data for {date} synced successfully.")
-            else:
-                logger.info(f"No sleep and recovery data found for {date}")
+    logger.info("Running Whoop sleep and recovery sync for %s to %s...", start_date or 'first record', end_date)
+    try:
+        from src.services.sync import backfill_sleep_and_recovery
 
-            if not loop_until_first or not sleep_and_recovery:
-                break
+        notion_client = get_notion_client("whoop-sleep-and-recovery")
+        store, deadline = backfill_checkpointing(time_budget)
+        result = backfill_sleep_and_recovery(get_whoop_service(), notion_client, start_date, end_date, window_days, concurrency, store, deadline)
+        log_backfill_result(result, "sleep and recovery records")
+        logger.info("Whoop sleep and recovery sync completed.")
+    except Exception as e:
+        logger.error("Error during Whoop sleep and recovery sync: %s", e)
+        raise typer.Exit(code=1)
 
-            date_obj = datetime.fromisoformat(date).date()
-            date_obj -= timedelta(days=1)
-            date = date_obj.isoformat()
+@state_app.command("rebuild")
+def rebuild_sync_state(
+    integration: str = typer.Argument(..., help="Integration name as configured in notion.config.yml, e.g. 'whoop-workout'."),
+    field: str = typer.Option(
+        "Whoop ID",
+        "--field", "-f",
+        help="Notion number property holding the source record ID."
+    )
+):
+    """Rebuild the local sync state for an integration from its Notion database."""
+    store = get_state_store()
+    if store is None:
+        logger.error("Sync state store is disabled by SYNC_STATE_PATH.")
+        raise typer.Exit(code=1)
 
-        logger.info("Whoop sleep and recovery sync completed.")
+    notion_client = get_notion_client(integration, use_state_store=False)
+    try:
+        count = store.rebuild(notion_client, field)
     except Exception as e:
-        logger.error(f"Error during Whoop sleep and recovery sync: {e}")
+        logger.error("Error rebuilding sync state for %s: %s", integration, e)
+        raise typer.Exit(code=1)
+    logger.info("Sync state for %s rebuilt with %d pages.", integration, count)
+
+@state_app.command("clear")
+def clear_sync_state(
+    integration: str = typer.Argument(..., help="Integration name as configured in notion.config.yml, e.g. 'whoop-workout'.")
+):
+    """Forget the local sync state for an integration."""
+    store = get_state_store()
+    if store is not None:
+        store.clear(integration)
+    logger.info("Sync state for %s cleared.", integration)
+
+@state_app.command("backfills")
+def list_backfills():
+    """List the backfills stopped by a time budget that the next run over the same range will resume."""
+    store = get_state_store()
+    checkpoints = store.list_backfills() if store is not None else []
+    if not checkpoints:
+        typer.echo("No unfinished backfills.")
+    for integration, backfill, checkpoint in checkpoints:
+        typer.echo(f"{integration} {backfill}: resumes from {checkpoint.next_end}, {checkpoint.synced} records synced, last run {checkpoint.updated_at}")
+
+def get_snapshot():
+    from src.services.snapshot import get_default_snapshot
+
+    snapshot = get_default_snapshot()
+    if snapshot is None:
+        logger.error("Notion snapshots are disabled by NOTION_SNAPSHOT_PATH.")
+        raise typer.Exit(code=1)
+    return snapshot
+
+def configured_integrations() -> list:
+    from src.services.notion import load_notion_config
+    return list(load_notion_config(str(notion_config_path)).get("integrations", {}))
+
+@snapshot_app.command("refresh")
+def refresh_snapshot(
+    integrations: Optional[List[str]] = typer.Argument(None, help="Integrations to snapshot, as configured in notion.config.yml. Defaults to all."),
+    full: bool = typer.Option(
+        False,
+        "--full", "-f",
+        help="Rescan the whole database rather than only pages edited since the last refresh, dropping deleted pages."
+    )
+):
+    """Snapshot integrations' Notion databases into a local SQLite file, reading only pages edited since the last refresh."""
+    snapshot = get_snapshot()
+    failed = False
+    for integration in integrations or configured_integrations():
+        try:
+            count = snapshot.refresh(get_notion_client(integration, use_state_store=False), full=full)
+        except Exception as e:
+            logger.error("Error refreshing the %s snapshot: %s", integration, e)
+            failed = True
+            continue
+        info = snapshot.info(integration)
+        logger.info("%s: read %d pages, %d pages in the snapshot, last edit %s.", integration, count, info.pages, info.watermark)
+    if failed:
+        raise typer.Exit(code=1)
+
+@snapshot_app.command("status")
+def snapshot_status():
+    """Show what each integration's snapshot holds and when it was last refreshed."""
+    snapshot = get_snapshot()
+    for integration in configured_integrations():
+        info = snapshot.info(integration)
+        if info is None:
+            typer.echo(f"{integration}: no snapshot")
+        else:
+            typer.echo(
+                f"{integration}: {info.pages} pages, last edit {info.watermark}, refreshed {info.refreshed_at}, "
+                f"full refresh {info.full_refreshed_at}"
+            )
+
+@snapshot_app.command("export")
+def export_snapshot(
+    integration: str = typer.Argument(..., help="Integration name as configured in notion.config.yml, e.g. 'whoop-workout'."),
+    start: Optional[str] = typer.Option(None, "--start", "-s", help="First date to export (in ISO8601 format, e.g. '2024-01-01')."),
+    end: Optional[str] = typer.Option(None, "--end", "-e", help="Last date to export (in ISO8601 format, e.g. '2024-03-31')."),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="CSV file to write. Defaults to standard output."),
+    refresh: bool = typer.Option(True, "--refresh/--no-refresh", help="Refresh the snapshot from Notion first.")
+):
+    """Export an integration's snapshot as CSV, one row per page, for reporting without scanning Notion."""
+    import csv
+    import sys
+    from src.services.notion_properties import normalise_properties
+
+    snapshot = get_snapshot()
+    try:
+        start_str = parse_date(start).isoformat() if start else None
+        end_str = parse_date(end).isoformat() if end else None
+    except ValueError as e:
+        raise typer.BadParameter(f"Invalid date: {e}. Expected YYYY-MM-DD.")
+    if refresh:
+        snapshot.refresh(get_notion_client(integration, use_state_store=False))
+
+    rows = [{"page_id": page["id"], **normalise_properties(page["properties"])} for page in snapshot.pages(integration, start_str, end_str)]
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    file = open(output, "w", newline="") if output else sys.stdout
+    try:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if output:
+            file.close()
+    logger.info("Exported %d %s pages.", len(rows), integration)
+
+@snapshot_app.command("clear")
+def clear_snapshot(
+    integration: str = typer.Argument(..., help="Integration name as configured in notion.config.yml, e.g. 'whoop-workout'.")
+):
+    """Delete an integration's snapshot, so the next refresh rescans its database."""
+    get_snapshot().clear(integration)
+    logger.info("Snapshot for %s cleared.", integration)
+
+@sync_app.command("all")
+def sync_all(
+    date: Optional[str] = typer.Option(
+        None,
+        "--date", "-d",
+        help="Date to sync (in ISO8601 format, e.g. '2024-03-20'). Defaults to today."
+    ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--start", "-s",
+        help="First date of a range to sync (in ISO8601 format, e.g. '2024-01-01')."
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end", "-e",
+        help="Last date of a range to sync (in ISO8601 format, e.g. '2024-03-31'). Defaults to today."
+    ),
+    only: Optional[List[str]] = typer.Option(
+        None,
+        "--only", "-o",
+        help="Integration to run, repeatable: lingq, whoop-workout or whoop-sleep-and-recovery. Defaults to all."
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental", "-i",
+        help="Sync Whoop records created or updated since the last incremental sync rather than a date range."
+    ),
+    lookback_days: int = typer.Option(
+        2,
+        "--lookback-days",
+        min=0,
+        help="With --incremental, days before the last sync to re-read for records scored or edited late."
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers per integration, all sharing one rate limiter."
+    )
+):
+    """Sync every integration concurrently in one process, sharing the Notion connection pool and rate limiter."""
+    from src.services.orchestrator import INTEGRATIONS, SyncPlan, format_report, integration_job, run_integrations
+
+    if incremental and (date or start or end):
+        raise typer.BadParameter("--incremental cannot be combined with --date or --start/--end.")
+    start_date, end_date = resolve_date_range(date, start, end)
+    names = list(dict.fromkeys(only)) if only else list(INTEGRATIONS)
+    unknown = [name for name in names if name not in INTEGRATIONS]
+    if unknown:
+        raise typer.BadParameter(f"Unknown integration {', '.join(unknown)}, expected one of {', '.join(INTEGRATIONS)}.")
+
+    plan = SyncPlan(start_date, end_date, incremental, lookback_days, concurrency)
+    store = get_state_store()
+    jobs = {name: integration_job(name, plan, get_service, get_notion_client, store) for name in names}
+
+    started = time.perf_counter()
+    results = run_integrations(jobs)
+    logger.info(format_report(results, time.perf_counter() - started))
+    if any(result.status != "success" for result in results):
+        raise typer.Exit(code=1)
+
+@sync_app.command("reconcile")
+def reconcile(
+    date: Optional[str] = typer.Option(
+        None,
+        "--date", "-d",
+        help="Date to reconcile (in ISO8601 format, e.g. '2024-03-20'). Defaults to today."
+    ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--start", "-s",
+        help="First date of a range to reconcile (in ISO8601 format, e.g. '2024-01-01')."
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end", "-e",
+        help="Last date of a range to reconcile (in ISO8601 format, e.g. '2024-03-31'). Defaults to today."
+    ),
+    only: Optional[List[str]] = typer.Option(
+        None,
+        "--only", "-o",
+        help="Integration to reconcile, repeatable: lingq, whoop-workout or whoop-sleep-and-recovery. Defaults to all."
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run", "-n",
+        help="Only report the pages that would be archived."
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers, rate limited to Notion's average of three requests per second."
+    )
+):
+    """Archive Notion rows whose Whoop record was deleted, and duplicate rows for the same record."""
+    from src.services.orchestrator import INTEGRATIONS
+    from src.services.reconcile import format_reconcile_report, reconcile_integration
+
+    start_date, end_date = resolve_date_range(date, start, end)
+    names = list(dict.fromkeys(only)) if only else list(INTEGRATIONS)
+    unknown = [name for name in names if name not in INTEGRATIONS]
+    if unknown:
+        raise typer.BadParameter(f"Unknown integration {', '.join(unknown)}, expected one of {', '.join(INTEGRATIONS)}.")
+
+    results = []
+    failed = False
+    for name in names:
+        try:
+            results.append(reconcile_integration(name, get_service, get_notion_client(name), start_date, end_date, dry_run, concurrency))
+        except Exception as e:
+            logger.error("Error reconciling %s: %s", name, e)
+            failed = True
+    logger.info(format_reconcile_report(results, dry_run))
+    if failed or any(result.failed for result in results):
+        raise typer.Exit(code=1)
+
+@sync_app.command("accounts")
+def sync_accounts(
+    accounts_path: Optional[Path] = typer.Option(
+        None,
+        "--accounts", "-a",
+        help="Accounts config listing each account's credentials and databases. Defaults to ACCOUNTS_CONFIG_PATH, or src/config/accounts.yml."
+    ),
+    names: Optional[List[str]] = typer.Option(
+        None,
+        "--account", "-n",
+        help="Account to sync, repeatable. Defaults to every account in the config."
+    ),
+    date: Optional[str] = typer.Option(
+        None,
+        "--date", "-d",
+        help="Date to sync (in ISO8601 format, e.g. '2024-03-20'). Defaults to today."
+    ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--start", "-s",
+        help="First date of a range to sync (in ISO8601 format, e.g. '2024-01-01')."
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--end", "-e",
+        help="Last date of a range to sync (in ISO8601 format, e.g. '2024-03-31'). Defaults to today."
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental", "-i",
+        help="Sync Whoop records created or updated since each account's last incremental sync rather than a date range."
+    ),
+    lookback_days: int = typer.Option(
+        2,
+        "--lookback-days",
+        min=0,
+        help="With --incremental, days before the last sync to re-read for records scored or edited late."
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers per integration."
+    ),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers", "-w",
+        min=1,
+        help="Accounts synced at once. Defaults to the number of accounts, up to 8."
+    ),
+    processes: bool = typer.Option(
+        False,
+        "--processes/--threads",
+        help="Run each account in its own process rather than on a thread."
+    )
+):
+    """Sync several people's accounts in one process, each with its own credentials, databases, state and rate limits."""
+    from src.services.accounts import default_accounts_path, format_accounts_report, load_accounts, run_accounts
+    from src.services.orchestrator import SyncPlan
+
+    if incremental and (date or start or end):
+        raise typer.BadParameter("--incremental cannot be combined with --date or --start/--end.")
+    start_date, end_date = resolve_date_range(date, start, end)
+
+    path = accounts_path or default_accounts_path()
+    try:
+        accounts = load_accounts(path)
+    except (OSError, ValueError) as e:
+        logger.error("Could not load the accounts config %s: %s", path, e)
+        raise typer.Exit(code=1)
+    if names:
+        unknown = [name for name in names if name not in {account.name for account in accounts}]
+        if unknown:
+            raise typer.BadParameter(f"Unknown account {', '.join(unknown)} in {path}.")
+        accounts = [account for account in accounts if account.name in names]
+
+    plan = SyncPlan(start_date, end_date, incremental, lookback_days, concurrency)
+    started = time.perf_counter()
+    results = run_accounts(accounts, plan, str(notion_config_path), workers, processes)
+    logger.info(format_accounts_report(results, time.perf_counter() - started))
+    if any(result.status != "success" for result in results):
         raise typer.Exit(code=1)
 
 @app.command()
-def lingq():
-    """Sync LingQ data with Notion."""
-    sync_lingq()
+def lingq(
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency", "-c",
+        min=1,
+        help="Number of concurrent Notion writers, rate limited to Notion's average of three requests per second."
+    )
+):
+    """Sync today's LingQ word counts with Notion."""
+    sync_lingq(concurrency)
 
 if __name__ == "__main__":
     app()
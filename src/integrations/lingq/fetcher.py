@@ -2,41 +2,65 @@ import os
 from datetime import datetime
 import requests
 
+from src.utils.logger import get_logger
+from src.utils.metrics import requests_response_hook
+from src.utils.retry import RetryPolicy, classify_requests_error, classify_requests_response
+
+logger = get_logger()
+
+lingq_retry_policy = RetryPolicy("lingq", classify_requests_error, classify_requests_response)
+
+REQUEST_TIMEOUT = 30
+
 
 class LingQFetcher:
-    def __init__(self):
+    def __init__(self, api_key: str = None, retry_policy: RetryPolicy = None):
         self.base_url = "https://www.lingq.com/api/v2/"
+        self.retry_policy = retry_policy or lingq_retry_policy
 
-        self.api_key = os.environ.get("LINGQ_API_KEY")
+        self.api_key = api_key or os.environ.get("LINGQ_API_KEY")
         if not self.api_key:
             raise ValueError("Please set the LINGQ_API_KEY in the .env file.")
 
-    def make_api_request(self, endpoint):
+    @property
+    def session(self) -> requests.Session:
+        """Lazily create a session so every request reuses pooled connections and the auth headers."""
+        if not hasattr(self, "_session"):
+            session = requests.Session()
+            session.hooks["response"].append(requests_response_hook("lingq", self.base_url))
+            session.headers.update({
+                'Authorization': 'Token ' + self.api_key,
+                'accept': 'application/json'
+            })
+            self._session = session
+        return self._session
+
+    def make_api_request(self, endpoint, params=None):
         url = self.base_url + endpoint
-        headers = {
-            'Authorization': 'Token ' + self.api_key,
-            'accept': 'application/json'
-        }
-        return requests.get(url, headers=headers)
+        return self.retry_policy.call(
+            self.session.get, url, params=params, timeout=REQUEST_TIMEOUT, endpoint=f"GET {endpoint}"
+        )
 
-    def fetch_languages(self, active=True):
+    def fetch_languages(self, active=False):
         response = self.make_api_request("languages")
 
         if response.status_code == 200:
             data = response.json()
+            if active:
+                return [language for language in data if language['knownWords'] > 0]
             return data
 
     def get_daily_word_counts(self):
-        response = self.make_api_request("languages")
-
-        if response.status_code == 200:
-            data = response.json()
-            active_languages = [language for language in data if language['knownWords'] > 0]
-            return [{'date': datetime.now().isoformat(), 'language': language['title'],
-                     'word-count': language['knownWords']} for language in active_languages]
+        """Today's known word count for every active language, dated today."""
+        languages = self.fetch_languages(active=True)
+        if languages is None:
+            return None
+        day = datetime.now().date().isoformat()
+        return [{'date': day, 'language': language['title'],
+                 'word-count': language['knownWords']} for language in languages]
 
 
 if __name__ == '__main__':
     fetcher = LingQFetcher()
     languages = fetcher.get_daily_word_counts()
-    logger.info(languages)
\ No newline at end of file
+    logger.info(languages)
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from src.services.sync_state import DISABLED_VALUES
+from src.utils.cache import ResponseCache, make_backend
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+# Seconds to keep a collection window, by how likely it is to still change
+FINAL_TTL = float(os.environ.get("WHOOP_CACHE_TTL", 24 * 3600))
+PENDING_TTL = float(os.environ.get("WHOOP_CACHE_PENDING_TTL", 15 * 60))
+RECENT_TTL = float(os.environ.get("WHOOP_CACHE_RECENT_TTL", 5 * 60))
+
+
+def collection_ttl(records: list, window_end: str, now: datetime = None) -> float:
+    """
+    How long to cache a collection response for a window ending at window_end.
+
+    A window that is over and whose records are all scored won't change, so it gets the long TTL.
+    A window that is still open, such as today, gets the short one. Anything in between, including an
+    empty past window that a strap may not have uploaded yet, gets the pending TTL.
+    """
+    now = now or datetime.now(timezone.utc)
+    if datetime.fromisoformat(window_end) >= now:
+        return RECENT_TTL
+    if records and all(record.get("score_state") == "SCORED" for record in records):
+        return FINAL_TTL
+    return PENDING_TTL
+
+
+def default_cache_path() -> Path:
+    """WHOOP_CACHE_PATH, or the same directory as the sync state, which is /tmp on Lambda."""
+    configured = os.environ.get("WHOOP_CACHE_PATH")
+    if configured:
+        return Path(configured)
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return Path("/tmp/notion-dashboard/whoop_cache.db")
+    return Path.home() / ".notion-dashboard" / "whoop_cache.db"
+
+
+_default_cache = None
+
+
+def get_default_whoop_cache() -> Optional[ResponseCache]:
+    """
+    The Whoop response cache configured by WHOOP_CACHE: 'disk' (the default), 'memory', or 'off' to
+    disable it. WHOOP_CACHE_MAXSIZE caps the number of cached windows.
+    """
+    global _default_cache
+    kind = os.environ.get("WHOOP_CACHE", "disk").strip().lower()
+    if kind in DISABLED_VALUES:
+        return None
+    if _default_cache is None:
+        maxsize = int(os.environ.get("WHOOP_CACHE_MAXSIZE", "1024"))
+        _default_cache = ResponseCache(make_backend(kind, default_cache_path(), maxsize), name="whoop")
+    return _default_cache
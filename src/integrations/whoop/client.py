@@ -0,0 +1,135 @@
+import requests
+from authlib.oauth2.rfc6749 import OAuth2Token
+from whoop import AUTH_URL, REQUEST_URL, WhoopClient
+
+from src.integrations.whoop.token_cache import TokenCache
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics, requests_response_hook
+from src.utils.rate_limit import TokenBucket
+from src.utils.retry import RetryPolicy, classify_requests_error
+
+logger = get_logger()
+
+whoop_retry_policy = RetryPolicy("whoop", classify_requests_error)
+
+COLLECTION_SLUGS = {
+    "workout": "v1/activity/workout",
+    "sleep": "v1/activity/sleep",
+    "recovery": "v1/recovery",
+}
+# The most records Whoop returns per page
+PAGE_LIMIT = 25
+
+
+class RetryingWhoopClient(WhoopClient):
+    """
+    Whoop client whose API requests and logins are retried according to a RetryPolicy, and with a
+    limiter, wait for a token before every API request attempt.
+
+    With a token_cache the access token is saved after each login and reused by later runs. A token
+    close to expiry is refreshed ahead of time with its refresh token where Whoop issued one, and
+    the password is only sent when there is no usable cached token or the refresh is rejected.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        authenticate: bool = True,
+        retry_policy: RetryPolicy = None,
+        token_cache: TokenCache = None,
+        limiter: TokenBucket = None,
+    ):
+        # Set before the parent constructor, which may authenticate straight away
+        self.retry_policy = retry_policy or whoop_retry_policy
+        self.token_cache = token_cache
+        self.limiter = limiter
+        super().__init__(username, password, authenticate=False)
+        self.session.hooks["response"].append(requests_response_hook("whoop", REQUEST_URL))
+        if authenticate:
+            self.ensure_authenticated()
+
+    def authenticate(self, **kwargs) -> None:
+        with metrics.timer("whoop.login"):
+            self.retry_policy.call(super().authenticate, endpoint="POST oauth/token", **kwargs)
+        self._save_token()
+
+    def _save_token(self):
+        if self.token_cache is not None:
+            self.token_cache.save(self._username, self.session.token)
+
+    def _use_token(self, token: dict):
+        self.session.token = OAuth2Token(token)
+        if not self.user_id:
+            self.user_id = str(token.get("user", {}).get("id", ""))
+
+    def _load_cached_token(self, leeway: int) -> bool:
+        """Adopt the cached token if there is one. Returns True if it is still valid for leeway seconds."""
+        token = self.token_cache.load(self._username) if self.token_cache is not None else None
+        if token is None:
+            return False
+        self._use_token(token)
+        return not self.session.token.is_expired(leeway=leeway)
+
+    def _refresh(self) -> bool:
+        """Refresh the access token with the refresh token. Returns False if there isn't one or Whoop rejects it."""
+        token = self.session.token
+        if not token or not token.get("refresh_token"):
+            return False
+        try:
+            refreshed = self.retry_policy.call(
+                self.session.refresh_token, f"{AUTH_URL}/oauth/token", refresh_token=token["refresh_token"], endpoint="POST oauth/token"
+            )
+        except Exception as e:
+            logger.info("Whoop token refresh failed, logging in with the password instead: %s", e)
+            return False
+
+        # The refresh response doesn't repeat the user, which the token cache keeps for user_id
+        refreshed.setdefault("user", token.get("user", {}))
+        self._save_token()
+        logger.info("Refreshed the Whoop access token.")
+        return True
+
+    def ensure_authenticated(self, leeway: int = 60):
+        """Make sure there is an access token valid for at least leeway seconds, logging in only as a last resort."""
+        token = self.session.token
+        if token and not token.is_expired(leeway=leeway):
+            return
+        if not token and self._load_cached_token(leeway):
+            logger.info("Using the cached Whoop access token.")
+            return
+        if self._refresh():
+            return
+        logger.info("Whoop access token missing or expiring, logging in.")
+        self.authenticate()
+
+    def iter_collection_pages(self, name: str, start_date: str = None, end_date: str = None):
+        """
+        Lazily yield a collection ('workout', 'sleep' or 'recovery') one page of records at a time,
+        following next_token, rather than building the whole list like get_*_collection does.
+        """
+        start, end = self._format_dates(start_date, end_date)
+        params = {"start": start, "end": end, "limit": PAGE_LIMIT}
+        while True:
+            response = self._make_request("GET", COLLECTION_SLUGS[name], params=dict(params))
+            yield response["records"]
+            if not response.get("next_token"):
+                return
+            params["nextToken"] = response["next_token"]
+
+    def _make_request(self, method: str, url_slug: str, **kwargs):
+        self.ensure_authenticated()
+
+        # Collection paths such as v1/activity/sleep are fixed, resource IDs only appear in by-ID lookups
+        endpoint = f"{method} {url_slug}"
+        throttle = self.limiter.acquire if self.limiter is not None else None
+        try:
+            return self.retry_policy.call(super()._make_request, method, url_slug, endpoint=endpoint, throttle=throttle, **kwargs)
+        except requests.HTTPError as e:
+            # The token can be revoked before it expires, so log in again once and retry
+            if e.response is None or e.response.status_code != 401:
+                raise
+            logger.info("Whoop rejected the access token, re-authenticating.")
+            if not self._refresh():
+                self.authenticate()
+            return self.retry_policy.call(super()._make_request, method, url_slug, endpoint=endpoint, throttle=throttle, **kwargs)
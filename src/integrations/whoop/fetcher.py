@@ -1,23 +1,47 @@
 import os
 from datetime import datetime, timedelta
-from whoop import WhoopClient
+from src.integrations.whoop.cache import collection_ttl, get_default_whoop_cache
+from src.integrations.whoop.client import RetryingWhoopClient
+from src.integrations.whoop.records import SleepRecoveryRecord, WorkoutRecord
+from src.integrations.whoop.token_cache import TokenCache, get_default_token_cache
 from src.integrations.whoop.sport_map import sport_map
 
-from src.utils.datetime_utils import get_datetimes_for_date
-from src.utils.logger import get_logger
+from src.utils.datetime_utils import get_datetimes_for_date, get_datetimes_for_date_range
+from src.utils.logger import SAMPLED, get_logger
+from src.utils.metrics import metrics
+from src.utils.rate_limit import TokenBucket
+from src.utils.retry import RetryPolicy
 
 # Set up logging
 logger = get_logger()
 
+KCAL_PER_KILOJOULE = 0.239006
+
+# Streamed collections up to this many records are still kept whole for the response cache
+STREAM_CACHE_MAX_RECORDS = 1000
+
 class WhoopFetcher:
-    def __init__(self):
-        username = os.environ.get('WHOOP_USERNAME')
-        password = os.environ.get('WHOOP_PASSWORD')
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        token_cache: TokenCache = None,
+        limiter: TokenBucket = None,
+        retry_policy: RetryPolicy = None,
+    ):
+        """Credentials default to WHOOP_USERNAME and WHOOP_PASSWORD, and the token cache to the default one."""
+        username = username or os.environ.get('WHOOP_USERNAME')
+        password = password or os.environ.get('WHOOP_PASSWORD')
 
         if not username or not password:
             raise ValueError("Please set WHOOP_USERNAME and WHOOP_PASSWORD in the .env file.")
 
-        self.client = WhoopClient(username, password)
+        self.username = username
+        self.client = RetryingWhoopClient(
+            username, password, token_cache=token_cache or get_default_token_cache(), limiter=limiter,
+            retry_policy=retry_policy,
+        )
+        self.cache = get_default_whoop_cache()
 
     def __enter__(self):
         self.client.__enter__()
@@ -26,18 +50,67 @@ class WhoopFetcher:
     def __exit__(self, exc_type, exc_value, traceback):
         self.client.__exit__(exc_type, exc_value, traceback)
 
+    def get_collection(self, name, start, end):
+        """
+        Get a Whoop collection ('sleep', 'recovery' or 'workout') between the start and end datetimes,
+        through the response cache. Past windows whose records are all scored are cached for longest.
+        """
+        fetch = getattr(self.client, f"get_{name}_collection")
+        with metrics.timer("whoop.fetch", collection=name):
+            if self.cache is None:
+                return fetch(start, end)
+
+            key = f"{self.username}:{name}:{start}:{end}"
+            return self.cache.get_or_fetch(key, lambda: fetch(start, end), lambda records: collection_ttl(records, end))
+
+    def iter_collection(self, name, start, end):
+        """
+        Yield a Whoop collection's records one page at a time, so a long range is never held in memory
+        at once. A range already in the response cache is served from it, and a range of at most
+        STREAM_CACHE_MAX_RECORDS records is cached once it has been read to the end.
+        """
+        key = f"{self.username}:{name}:{start}:{end}"
+        cached = self.cache.lookup(key) if self.cache is not None else None
+        if cached is not None:
+            yield from cached
+            return
+
+        kept = [] if self.cache is not None else None
+        for page in self.client.iter_collection_pages(name, start, end):
+            if kept is not None:
+                kept.extend(page)
+                if len(kept) > STREAM_CACHE_MAX_RECORDS:
+                    kept = None
+            yield from page
+
+        if kept is not None:
+            self.cache.store(key, kept, collection_ttl(kept, end))
+
+    def get_collection_ids(self, name, start_date, end_date) -> set:
+        """
+        The IDs of every record in a collection started between start_date and end_date (inclusive), read
+        page by page straight from Whoop. The response cache is bypassed, as it may still hold records
+        deleted since it was filled.
+        """
+        start, end = get_datetimes_for_date_range(start_date, end_date)
+        with metrics.timer("whoop.fetch", collection=name):
+            return {record["id"] for page in self.client.iter_collection_pages(name, start, end) for record in page}
+
+    def cache_summary(self):
+        return self.cache.summary() if self.cache is not None else "disabled"
+
     def get_profile(self):
         return self.client.get_profile()
     
     def get_sleep(self, date_str):
         start, end = get_datetimes_for_date(date_str)
-        logger.info(f"date_str: {date_str}, start: {start}, end: {end}")
-        sleep_collection = self.client.get_sleep_collection(start, end)
+        logger.debug("date_str: %s, start: %s, end: %s", date_str, start, end)
+        sleep_collection = self.get_collection("sleep", start, end)
         return sleep_collection[0]
     
     def get_recovery(self, date_str):
         start, end = get_datetimes_for_date(date_str)
-        recovery_data = self.client.get_recovery_collection(start, end)
+        recovery_data = self.get_collection("recovery", start, end)
         return recovery_data[0]
     
     def get_sleep_and_recovery(self, date_str):
@@ -47,82 +120,132 @@ class WhoopFetcher:
 
             sleep_data = self.get_sleep(prev_date_str)
             recovery_data = self.get_recovery(prev_date_str)
-            result = {}
+            return self.build_sleep_and_recovery(sleep_data, recovery_data, date_str)
 
-            try:
-                # Parse sleep end time to adjust the date
-                sleep_end_time = sleep_data["end"]
-                sleep_end_datetime = datetime.fromisoformat(sleep_end_time)
-
-                # Calculate the "effective date" based on sleep end time
-                effective_date = sleep_end_datetime.date()
-
-                result["id"] = sleep_data["id"]
-                result["name"] = effective_date.isoformat()
-                result["date"] = effective_date.isoformat()
-                result["sleep_start_time"] = sleep_data["start"]
-                result["sleep_end_time"] = sleep_end_time
-
-                if sleep_data.get("score_state") == "SCORED":
-                    result["sleep_performance_percentage"] = sleep_data["score"]["sleep_performance_percentage"]
-                    result["sleep_consistency_percentage"] = sleep_data["score"]["sleep_consistency_percentage"]
-                    result["sleep_efficiency_percentage"] = sleep_data["score"]["sleep_efficiency_percentage"]
-                else:
-                    result["sleep_performance_percentage"] = None
-                    result["sleep_consistency_percentage"] = None
-                    result["sleep_efficiency_percentage"] = None
-            except KeyError as e:
-                logger.error(f"Missing key in sleep data for date {date_str}: {e}")
-                raise ValueError(f"Incomplete sleep data for date {date_str}")
+        except Exception as e:
+            logger.error("Error in get_sleep_and_recovery for date %s: %s", date_str, e)
+            return None
 
-            try:
-                result["recovery_score"] = recovery_data["score"]["recovery_score"]
-                result["resting_heart_rate"] = recovery_data["score"]["resting_heart_rate"]
-            except KeyError as e:
-                logger.error(f"Missing key in recovery data for date {date_str}: {e}")
-                raise ValueError(f"Incomplete recovery data for date {date_str}")
+    def build_sleep_and_recovery(self, sleep_data, recovery_data, date_str):
+        """Combine a sleep and its recovery into a single record dated by when the sleep ended."""
+        try:
+            # The "effective date" of a sleep is the day it ended
+            sleep_end_time = sleep_data["end"]
+            effective_date = datetime.fromisoformat(sleep_end_time).date().isoformat()
+            sleep_id = sleep_data["id"]
+            sleep_start_time = sleep_data["start"]
 
-            return result
+            if sleep_data.get("score_state") == "SCORED":
+                sleep_score = sleep_data["score"]
+                performance = sleep_score["sleep_performance_percentage"]
+                consistency = sleep_score["sleep_consistency_percentage"]
+                efficiency = sleep_score["sleep_efficiency_percentage"]
+            else:
+                performance = consistency = efficiency = None
+        except KeyError as e:
+            logger.error("Missing key in sleep data for date %s: %s", date_str, e)
+            raise ValueError(f"Incomplete sleep data for date {date_str}")
 
-        except Exception as e:
-            logger.error(f"Error in get_sleep_and_recovery for date {date_str}: {e}")
-            return None
+        try:
+            recovery_score = recovery_data["score"]
+            score = recovery_score["recovery_score"]
+            resting_heart_rate = recovery_score["resting_heart_rate"]
+        except KeyError as e:
+            logger.error("Missing key in recovery data for date %s: %s", date_str, e)
+            raise ValueError(f"Incomplete recovery data for date {date_str}")
+
+        return SleepRecoveryRecord(
+            id=sleep_id,
+            name=effective_date,
+            date=effective_date,
+            sleep_start_time=sleep_start_time,
+            sleep_end_time=sleep_end_time,
+            # The later of the two, so an incremental sync picks the record up when either changes
+            updated_at=max(sleep_data.get("updated_at") or "", recovery_data.get("updated_at") or "") or None,
+            sleep_performance_percentage=performance,
+            sleep_consistency_percentage=consistency,
+            sleep_efficiency_percentage=efficiency,
+            recovery_score=score,
+            resting_heart_rate=resting_heart_rate,
+        )
+
+    def get_sleep_and_recovery_for_date_range(self, start_date, end_date):
+        """
+        Get the combined sleep and recovery records for sleeps started between start_date and end_date
+        (inclusive), using one sleep and one recovery collection call for the whole window.
+
+        Recoveries are joined to sleeps in memory on the sleep ID. Naps are skipped, as are sleeps
+        whose recovery is missing or not yet scored.
+        """
+        start, end = get_datetimes_for_date_range(start_date, end_date)
+        sleep_collection = self.get_collection("sleep", start, end)
+        recovery_collection = self.get_collection("recovery", start, end)
+        logger.info("Fetched %d sleeps and %d recoveries between %s and %s", len(sleep_collection), len(recovery_collection), start, end)
+
+        recoveries_by_sleep_id = {recovery["sleep_id"]: recovery for recovery in recovery_collection}
+
+        results = []
+        for sleep_data in sleep_collection:
+            if sleep_data.get("nap"):
+                continue
+
+            recovery_data = recoveries_by_sleep_id.get(sleep_data["id"])
+            if recovery_data is None or "score" not in recovery_data:
+                logger.info("No scored recovery found for sleep %s, skipping", sleep_data['id'], extra=SAMPLED)
+                continue
+
+            try:
+                results.append(self.build_sleep_and_recovery(sleep_data, recovery_data, sleep_data.get("end")))
+            except ValueError as e:
+                logger.info("Skipping sleep %s: %s", sleep_data['id'], e, extra=SAMPLED)
+
+        return results
 
     def get_workouts_for_given_date(self, date):
         start, end = get_datetimes_for_date(date)
-        workouts = self.client.get_workout_collection(start, end)
+        workouts = self.get_collection("workout", start, end)
+        return workouts
+
+    def get_workouts_for_date_range(self, start_date, end_date):
+        """Get every workout between start_date and end_date (inclusive) in a single collection call."""
+        start, end = get_datetimes_for_date_range(start_date, end_date)
+        workouts = self.get_collection("workout", start, end)
+        logger.info("Fetched %d workouts between %s and %s", len(workouts), start, end)
         return workouts
 
+    def iter_workouts_for_date_range(self, start_date, end_date):
+        """Like get_workouts_for_date_range, but yields the workouts as each page arrives."""
+        start, end = get_datetimes_for_date_range(start_date, end_date)
+        return self.iter_collection("workout", start, end)
+
     def transform_workouts(self, workouts):
-        transformed_workouts = []
+        """
+        Transform a collection of workouts into WorkoutRecords in a single pass, with the lookups that are
+        the same for every workout hoisted out of the loop and each workout's score read once.
+        """
+        parse = datetime.fromisoformat
+        sport_for = sport_map.get
+        records = []
+        append = records.append
 
         for entry in workouts:
-            # Parse start and end times to calculate duration in minutes
-            start_time = datetime.fromisoformat(entry['start'].replace('Z', '+00:00'))
-            end_time = datetime.fromisoformat(entry['end'].replace('Z', '+00:00'))
-            duration = round((end_time - start_time).total_seconds() / 60)
-            distance = round(entry['score'].get('distance_meter', 0) / 1000, 1)
-            calories = round((entry['score'].get('kilojoule', 0) * 0.239006))
-
+            score = entry['score']
+            start_time = parse(entry['start'])
             # Map sport_id to sport type
-            sport_type = sport_map.get(entry.get('sport_id', 0), "Unknown")
-
-            # Transform data
-            transformed_entry = {
-                "id": entry["id"],
-                "title": sport_type,
-                "date": start_time.isoformat(),
-                "duration": duration,
-                "distance": distance,
-                "sport": sport_type,
-                "calories": calories,
-                "hr_avg": entry['score'].get('average_heart_rate', 0),
-                "hr_max": entry['score'].get('max_heart_rate', 0),
-            }
-
-            transformed_workouts.append(transformed_entry)
-
-        return transformed_workouts
+            sport_type = sport_for(entry.get('sport_id', 0), "Unknown")
+            append(WorkoutRecord(
+                id=entry["id"],
+                title=sport_type,
+                date=start_time.isoformat(),
+                duration=round((parse(entry['end']) - start_time).total_seconds() / 60),
+                distance=round(score.get('distance_meter', 0) / 1000, 1),
+                sport=sport_type,
+                calories=round(score.get('kilojoule', 0) * KCAL_PER_KILOJOULE),
+                hr_avg=score.get('average_heart_rate', 0),
+                hr_max=score.get('max_heart_rate', 0),
+            ))
+
+        return records
 
 
 def main():
@@ -0,0 +1,58 @@
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+
+class Record:
+    """
+    Dict-style read access for the record dataclasses, so code that handles records generically, such
+    as matching on record[data_field] or record.get("updated_at"), works with them and with plain dicts.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__dataclass_fields__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+
+    def keys(self):
+        return self.__dataclass_fields__.keys()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class WorkoutRecord(Record):
+    id: int
+    title: str
+    date: str
+    duration: int
+    distance: float
+    sport: str
+    calories: int
+    hr_avg: int
+    hr_max: int
+
+
+@dataclass(slots=True)
+class SleepRecoveryRecord(Record):
+    """A sleep and its recovery, dated by the day the sleep ended."""
+
+    id: str
+    name: str
+    date: str
+    sleep_start_time: str
+    sleep_end_time: str
+    updated_at: Optional[str]
+    sleep_performance_percentage: Optional[float]
+    sleep_consistency_percentage: Optional[float]
+    sleep_efficiency_percentage: Optional[float]
+    recovery_score: float
+    resting_heart_rate: float
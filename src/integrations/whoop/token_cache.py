@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.services.sync_state import DISABLED_VALUES
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_FILE_MODE = 0o600
+
+
+def default_token_cache_path() -> Optional[Path]:
+    """
+    Resolve where Whoop tokens are cached.
+
+    WHOOP_TOKEN_CACHE_PATH overrides the location, or disables the cache when set to 'off'. On Lambda
+    the cache lives in /tmp, so it is shared by invocations for as long as the container stays warm.
+    """
+    configured = os.environ.get("WHOOP_TOKEN_CACHE_PATH")
+    if configured is not None:
+        if configured.strip().lower() in DISABLED_VALUES:
+            return None
+        return Path(configured)
+
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return Path("/tmp/notion-dashboard/whoop_token.json")
+    return Path.home() / ".notion-dashboard" / "whoop_token.json"
+
+
+def default_token_cache_mode() -> int:
+    """File permissions for the cache, from WHOOP_TOKEN_CACHE_MODE as octal (e.g. '600')."""
+    configured = os.environ.get("WHOOP_TOKEN_CACHE_MODE")
+    if not configured:
+        return DEFAULT_FILE_MODE
+    try:
+        return int(configured, 8)
+    except ValueError:
+        logger.warning("Ignoring invalid WHOOP_TOKEN_CACHE_MODE '%s', using %o", configured, DEFAULT_FILE_MODE)
+        return DEFAULT_FILE_MODE
+
+
+class TokenCache:
+    """
+    JSON file of OAuth tokens keyed by Whoop username, so a run can reuse the access token from an
+    earlier one instead of logging in with the password again.
+
+    The file holds credentials, so it is written with the given permissions (0600 by default) and
+    replaced atomically. An unreadable or malformed file is treated as empty.
+    """
+
+    def __init__(self, path, mode: int = DEFAULT_FILE_MODE):
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable Whoop token cache %s: %s", self.path, e)
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries: dict):
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self.mode)
+        with os.fdopen(fd, "w") as file:
+            # The umask may have narrowed the mode on creation, and an existing file keeps its old one
+            os.fchmod(file.fileno(), self.mode)
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+
+    def load(self, username: str) -> Optional[dict]:
+        """Return the cached token for username, or None if there isn't a usable one."""
+        with self._lock:
+            token = self._read().get(username)
+        if not isinstance(token, dict) or not token.get("access_token"):
+            return None
+        return token
+
+    def save(self, username: str, token: dict):
+        with self._lock:
+            entries = self._read()
+            entries[username] = dict(token)
+            try:
+                self._write(entries)
+            except OSError as e:
+                # Caching is an optimisation, so a read-only filesystem shouldn't fail the sync
+                logger.warning("Could not write Whoop token cache %s: %s", self.path, e)
+
+    def clear(self, username: str = None):
+        """Forget the token for username, or every cached token."""
+        with self._lock:
+            entries = self._read()
+            if username is None:
+                entries = {}
+            elif entries.pop(username, None) is None:
+                return
+            try:
+                self._write(entries)
+            except OSError as e:
+                logger.warning("Could not write Whoop token cache %s: %s", self.path, e)
+
+
+_default_cache = None
+
+
+def get_default_token_cache() -> Optional[TokenCache]:
+    """The token cache at the default path, or None if it is disabled."""
+    global _default_cache
+    path = default_token_cache_path()
+    if path is None:
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        _default_cache = TokenCache(path, default_token_cache_mode())
+    return _default_cache
@@ -0,0 +1,336 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from string import Template
+from typing import Callable, NamedTuple, Optional
+
+from src.services.orchestrator import (
+    INTEGRATIONS,
+    SyncPlan,
+    format_report,
+    integration_job,
+    overall_status,
+    run_integrations,
+)
+from src.utils.logger import flush_logs, get_logger
+from src.utils.metrics import metrics
+from src.utils.retry import reset_retries
+
+logger = get_logger()
+
+# Accounts synced at once unless a number of workers is given
+DEFAULT_WORKERS = 8
+# Burst allowed above an account's Whoop requests per minute
+WHOOP_BURST = 10
+
+ACCOUNT_KEYS = {
+    "notion_api_key", "whoop_username", "whoop_password", "lingq_api_key", "integrations", "databases",
+    "notion_config", "whoop_requests_per_minute",
+}
+WHOOP_INTEGRATIONS = ("whoop-workout", "whoop-sleep-and-recovery")
+
+
+def default_accounts_path() -> Path:
+    """ACCOUNTS_CONFIG_PATH, or accounts.yml next to the Notion config."""
+    configured = os.environ.get("ACCOUNTS_CONFIG_PATH")
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parent.parent / "config" / "accounts.yml"
+
+
+class Account(NamedTuple):
+    """One person's credentials and databases, as listed in the accounts config."""
+    name: str
+    notion_api_key: str
+    whoop_username: Optional[str] = None
+    whoop_password: Optional[str] = None
+    lingq_api_key: Optional[str] = None
+    integrations: tuple = INTEGRATIONS
+    # Integration name -> Notion database ID, overriding the one in the Notion config
+    databases: dict = {}
+    notion_config: Optional[str] = None
+    whoop_requests_per_minute: Optional[float] = None
+
+
+class AccountResult(NamedTuple):
+    name: str
+    status: str
+    results: list
+    seconds: float
+    error: Optional[str] = None
+
+
+def _expand(value, name: str, key: str):
+    """Substitute ${VAR} references to environment variables, so secrets needn't be written into the file."""
+    if isinstance(value, str):
+        try:
+            return Template(value).substitute(os.environ)
+        except KeyError as e:
+            raise ValueError(f"Account '{name}': environment variable {e.args[0]} used by '{key}' is not set")
+    if isinstance(value, dict):
+        return {k: _expand(v, name, key) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_expand(v, name, key) for v in value]
+    return value
+
+
+def parse_account(name: str, settings, base_dir: Path) -> tuple:
+    """Return (Account, errors) for one entry of the accounts config."""
+    if not isinstance(settings, dict):
+        return None, [f"Account '{name}' must be a mapping"]
+
+    errors = [f"Account '{name}' has unknown setting '{key}'" for key in settings if key not in ACCOUNT_KEYS]
+    try:
+        settings = {key: _expand(value, name, key) for key, value in settings.items() if key in ACCOUNT_KEYS}
+    except ValueError as e:
+        return None, errors + [str(e)]
+
+    if not settings.get("notion_api_key"):
+        errors.append(f"Account '{name}' is missing 'notion_api_key'")
+
+    has_whoop = bool(settings.get("whoop_username") and settings.get("whoop_password"))
+    has_lingq = bool(settings.get("lingq_api_key"))
+    default_integrations = [n for n in INTEGRATIONS if (has_lingq if n == "lingq" else has_whoop)]
+    integrations = settings.get("integrations") or default_integrations
+    for integration in integrations:
+        if integration not in INTEGRATIONS:
+            errors.append(f"Account '{name}' has unknown integration '{integration}', expected one of {', '.join(INTEGRATIONS)}")
+        elif integration == "lingq" and not has_lingq:
+            errors.append(f"Account '{name}' syncs lingq but has no 'lingq_api_key'")
+        elif integration in WHOOP_INTEGRATIONS and not has_whoop:
+            errors.append(f"Account '{name}' syncs {integration} but is missing 'whoop_username' or 'whoop_password'")
+    if not integrations:
+        errors.append(f"Account '{name}' has no credentials for any integration")
+
+    databases = settings.get("databases") or {}
+    if not isinstance(databases, dict):
+        errors.append(f"Account '{name}': 'databases' must map integration names to database IDs")
+        databases = {}
+
+    notion_config = settings.get("notion_config")
+    if notion_config:
+        notion_config = str((base_dir / notion_config).resolve())
+
+    if errors:
+        return None, errors
+    return Account(
+        name=str(name),
+        notion_api_key=settings["notion_api_key"],
+        whoop_username=settings.get("whoop_username"),
+        whoop_password=settings.get("whoop_password"),
+        lingq_api_key=settings.get("lingq_api_key"),
+        integrations=tuple(dict.fromkeys(integrations)),
+        databases=databases,
+        notion_config=notion_config,
+        whoop_requests_per_minute=settings.get("whoop_requests_per_minute"),
+    ), []
+
+
+def load_accounts(path) -> list:
+    """Parse and validate the accounts config, raising a ValueError that lists every problem."""
+    import yaml
+
+    path = Path(path)
+    with open(path, "r") as file:
+        config = yaml.safe_load(file) or {}
+
+    entries = config.get("accounts") if isinstance(config, dict) else None
+    if not isinstance(entries, dict) or not entries:
+        raise ValueError(f"{path} must have a non-empty 'accounts' mapping of account names to settings")
+
+    accounts, errors = [], []
+    for name, settings in entries.items():
+        account, account_errors = parse_account(name, settings, path.parent)
+        errors.extend(account_errors)
+        if account is not None:
+            accounts.append(account)
+    if errors:
+        raise ValueError("Invalid accounts config: " + "; ".join(errors))
+    return accounts
+
+
+def account_path(path: Optional[Path], account: str) -> Optional[Path]:
+    """The per-account version of a local file, e.g. ~/.notion-dashboard/accounts/<account>/sync_state.db."""
+    if path is None:
+        return None
+    path = Path(path)
+    return path.parent / "accounts" / account / path.name
+
+
+class AccountServices:
+    """
+    The clients for one account, created on first use and shared by its integrations. Each account has
+    its own sync state, snapshot, relation cache and Whoop token cache files, so accounts never see
+    each other's state, even when they run in separate processes. Notion clients and rate limiters are
+    shared per API key, so accounts using the same Notion integration token share its limit.
+    """
+
+    def __init__(self, account: Account, notion_config_path: str):
+        self.account = account
+        self.notion_config_path = account.notion_config or str(notion_config_path)
+        self._services = {}
+        self._lock = threading.Lock()
+
+    def get_service(self, kind: str):
+        with self._lock:
+            if kind not in self._services:
+                self._services[kind] = self._create_service(kind)
+            return self._services[kind]
+
+    def _create_service(self, kind: str):
+        # Each account's clients get their own retry budgets, so one account's failing endpoint doesn't
+        # use up the retries of every other account. Notion's are shared per API key, like its limit.
+        if kind == "lingq":
+            from src.integrations.lingq.fetcher import LingQFetcher, lingq_retry_policy
+            return LingQFetcher(api_key=self.account.lingq_api_key, retry_policy=lingq_retry_policy.copy())
+
+        from src.integrations.whoop.client import whoop_retry_policy
+        from src.integrations.whoop.fetcher import WhoopFetcher
+        from src.integrations.whoop.token_cache import TokenCache, default_token_cache_mode, default_token_cache_path
+        from src.utils.rate_limit import TokenBucket
+
+        token_cache_path = account_path(default_token_cache_path(), self.account.name)
+        token_cache = TokenCache(token_cache_path, default_token_cache_mode()) if token_cache_path else None
+        per_minute = self.account.whoop_requests_per_minute
+        limiter = TokenBucket(per_minute / 60, WHOOP_BURST) if per_minute else None
+        return WhoopFetcher(
+            self.account.whoop_username, self.account.whoop_password, token_cache=token_cache, limiter=limiter,
+            retry_policy=whoop_retry_policy.copy(),
+        )
+
+    @property
+    def state_store(self):
+        """The account's sync state store, or None if the store is disabled by SYNC_STATE_PATH."""
+        if not hasattr(self, "_state_store"):
+            from src.services.sync_state import SyncStateStore, default_state_path
+            path = account_path(default_state_path(), self.account.name)
+            self._state_store = SyncStateStore(path) if path else None
+        return self._state_store
+
+    @property
+    def snapshot(self):
+        """The account's Notion snapshot, or None if snapshots are disabled by NOTION_SNAPSHOT_PATH."""
+        if not hasattr(self, "_snapshot"):
+            from src.services.snapshot import DEFAULT_FULL_REFRESH_HOURS, NotionSnapshot, default_snapshot_path
+            path = account_path(default_snapshot_path(), self.account.name)
+            hours = float(os.environ.get("NOTION_SNAPSHOT_FULL_REFRESH_HOURS", DEFAULT_FULL_REFRESH_HOURS))
+            self._snapshot = NotionSnapshot(path, hours) if path else None
+        return self._snapshot
+
+    def get_notion_client(self, integration_name: str):
+        from src.services.notion import NotionClient
+
+        relation_cache_path = account_path(os.environ.get("RELATION_CACHE_PATH") or None, self.account.name)
+        return NotionClient(
+            self.notion_config_path, integration_name,
+            state_store=self.state_store,
+            snapshot=self.snapshot,
+            api_key=self.account.notion_api_key,
+            database_id=self.account.databases.get(integration_name),
+            relation_cache_path=str(relation_cache_path) if relation_cache_path else None,
+        )
+
+
+def run_account(account: Account, plan: SyncPlan, notion_config_path: str, services: AccountServices = None) -> AccountResult:
+    """Sync every integration of one account concurrently. A failure is reported rather than raised."""
+    started = time.perf_counter()
+    try:
+        services = services or AccountServices(account, notion_config_path)
+        jobs = {
+            name: integration_job(name, plan, services.get_service, services.get_notion_client, services.state_store)
+            for name in account.integrations
+        }
+        results = run_integrations(jobs, thread_name_prefix=account.name)
+    except Exception as e:
+        logger.exception("Account %s failed: %s", account.name, e)
+        return AccountResult(account.name, "error", [], time.perf_counter() - started, str(e))
+    return AccountResult(account.name, overall_status(results), results, time.perf_counter() - started)
+
+
+def _run_account_in_process(account: Account, plan: SyncPlan, notion_config_path: str) -> tuple:
+    metrics.reset()
+    reset_retries()
+    result = run_account(account, plan, notion_config_path)
+    flush_logs()
+    return result, metrics.export()
+
+
+def run_accounts(
+    accounts: list,
+    plan: SyncPlan,
+    notion_config_path: str,
+    workers: int = None,
+    processes: bool = False,
+    services_for: Callable = None,
+) -> list:
+    """
+    Sync the accounts, up to workers at a time, and return an AccountResult for each in the order given.
+    A failing account, or a worker process that dies, is reported without affecting the others.
+
+    Accounts run on threads by default, which suits syncs that mostly wait on the APIs; services_for,
+    if given, returns the AccountServices to use for an account, so a long-lived process can keep
+    them between runs. With processes, each account runs in a fresh process (spawned rather than
+    forked, so no locks or connections are inherited) and its metrics are merged into this one's.
+    """
+    if not accounts:
+        return []
+    workers = workers or min(len(accounts), DEFAULT_WORKERS)
+
+    if not processes:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="account") as executor:
+            futures = [
+                executor.submit(run_account, account, plan, notion_config_path, services_for(account) if services_for else None)
+                for account in accounts
+            ]
+        return [future.result() for future in futures]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_run_account_in_process, account, plan, str(notion_config_path)) for account in accounts]
+
+    results = []
+    for account, future in zip(accounts, futures):
+        try:
+            result, exported = future.result()
+        except Exception as e:
+            logger.error("Account %s worker process failed: %s", account.name, e)
+            results.append(AccountResult(account.name, "error", [], 0.0, str(e) or type(e).__name__))
+            continue
+        metrics.merge(exported)
+        results.append(result)
+    return results
+
+
+def format_accounts_report(results: list, seconds: float) -> str:
+    succeeded = sum(result.status == "success" for result in results)
+    lines = [f"Accounts report: {succeeded} of {len(results)} accounts succeeded in {seconds:.2f}s"]
+    for result in results:
+        line = f"{result.name}: {result.status} in {result.seconds:.2f}s"
+        if result.error:
+            line += f"  {result.error}"
+        lines.append(line)
+        if result.results:
+            lines.extend(format_report(result.results, result.seconds).splitlines()[1:])
+    return "\n".join(lines)
+
+
+def accounts_report(results: list) -> dict:
+    """The results as a JSON-serialisable report, e.g. for a Lambda response."""
+    return {
+        "status": overall_status(results),
+        "accounts": [
+            {
+                "name": account.name,
+                "status": account.status,
+                "seconds": round(account.seconds, 3),
+                "error": account.error,
+                "integrations": [
+                    {"name": r.name, "status": r.status, "count": r.count, "seconds": round(r.seconds, 3), "error": r.error}
+                    for r in account.results
+                ],
+            }
+            for account in results
+        ],
+    }
@@ -1,228 +1,480 @@
 import os
 import yaml
+from collections import Counter
 from datetime import datetime, timedelta
-from notion_client import Client
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from notion_client import APIErrorCode, APIResponseError, Client
 
-from src.utils.logger import get_logger
+from src.services.notion_api import shared_client, shared_rate_limiter
+from src.services.notion_properties import normalise_properties, normalise_property
+from src.services.notion_writer import AsyncNotionWriter, PageWrite
+from src.services.property_builder import PropertyBuilder
+from src.services.relations import RelationResolver
+from src.services.snapshot import NotionSnapshot
+from src.services.sync_state import SyncStateStore
+from src.utils.logger import SAMPLED, get_logger
+from src.utils.metrics import metrics
+from src.utils.rate_limit import TokenBucket
 
 logger = get_logger()
 
+
+@lru_cache(maxsize=None)
+def load_notion_config(config_path: str) -> dict:
+    """
+    Parse the `notion` section of the YAML config. The result is cached for the life of the process,
+    so every client, and every warm Lambda invocation, shares one parse of the file.
+    """
+    with open(config_path, 'r') as file:
+        config = yaml.safe_load(file).get("notion", {})
+    logger.info("Notion database config loaded.")
+    return config
+
+
+class IndexedPage(NamedTuple):
+    id: str
+    # Normalised properties, or None for a page known only from the sync state store
+    properties: Optional[dict]
+
+
+def is_unwritable_page_error(error: Exception) -> bool:
+    """Whether a page update failed because the page was deleted or archived in Notion."""
+    return isinstance(error, APIResponseError) and error.code in (APIErrorCode.ObjectNotFound, APIErrorCode.ValidationError)
+
+
 class NotionClient:
-    def __init__(self, config_path: str, integration_name: str):
+    def __init__(
+        self,
+        config_path: str,
+        integration_name: str,
+        state_store: SyncStateStore = None,
+        rate_limiter: TokenBucket = None,
+        snapshot: NotionSnapshot = None,
+        api_key: str = None,
+        database_id: str = None,
+        relation_cache_path: str = None,
+    ):
         self._config_path = config_path
         self.integration_name = integration_name
+        self.state_store = state_store
+        self._rate_limiter = rate_limiter
+        self.snapshot = snapshot
+        # Per-account overrides of NOTION_API_KEY, the configured database and RELATION_CACHE_PATH
+        self._api_key = api_key
+        self._database_id = database_id
+        self._relation_cache_path = relation_cache_path
+        self.stats = Counter()
+
+    @property
+    def rate_limiter(self) -> TokenBucket:
+        """The limiter passed in, or the one shared by every Notion client using the same API key."""
+        return self._rate_limiter or shared_rate_limiter(self.api_key)
 
     @property
     def api_key(self) -> str:
-        """Retrieve the Notion API key from environment variables."""
-        key = os.environ.get("NOTION_API_KEY")
+        """The API key passed in, or NOTION_API_KEY."""
+        key = self._api_key or os.environ.get("NOTION_API_KEY")
         if not key:
             raise ValueError("Notion API key not valid:", key)
         return key
     
     @property
     def client(self) -> Client:
-        """Lazy-load the Notion client with authentication."""
+        """Lazy-load the Notion client with authentication, sharing its connection pool with other clients."""
         if not hasattr(self, "_client"):
-            self._client = Client(auth=self.api_key)
+            self._client = shared_client(self.api_key)
         return self._client
     
+    @property
+    def relations(self) -> RelationResolver:
+        """Lazy-load the relation resolver, persisted to the relation cache path or RELATION_CACHE_PATH if either is set."""
+        if not hasattr(self, "_relations"):
+            self._relations = RelationResolver(
+                self.client,
+                ttl=self.config.get("relation_cache_ttl", 3600),
+                cache_path=self._relation_cache_path or os.environ.get("RELATION_CACHE_PATH") or None,
+            )
+        return self._relations
+
     @property
     def config(self) -> dict:
         """Load the Notion configuration from the YAML file for the given integration."""
         if not hasattr(self, "_config"):
-            with open(self._config_path, 'r') as file:
-                config = yaml.safe_load(file).get("notion", {})
-                integrations = config.get('integrations', {})
-
-                if self.integration_name not in integrations:
-                    err_msg = f"No configuration found for integration {self.integration_name}"
-                    logger.error(err_msg)
-                    raise ValueError(err_msg)
-                
-                logger.info("Notion database config loaded.")
-                self._config = integrations[self.integration_name]
+            integrations = load_notion_config(self._config_path).get('integrations', {})
+
+            if self.integration_name not in integrations:
+                err_msg = f"No configuration found for integration {self.integration_name}"
+                logger.error(err_msg)
+                raise ValueError(err_msg)
+
+            if "field_mappings" not in integrations[self.integration_name]:
+                err_msg = f"No field_mappings configured for integration {self.integration_name}"
+                logger.error(err_msg)
+                raise ValueError(err_msg)
+
+            self._config = integrations[self.integration_name]
+            if self._database_id:
+                self._config = {**self._config, "database_id": self._database_id}
+            self._property_builder = PropertyBuilder(self._config["field_mappings"], self.get_related_id)
 
         return self._config
 
+    @property
+    def property_builder(self) -> PropertyBuilder:
+        """The integration's field mappings, compiled and validated when the config is loaded."""
+        if not hasattr(self, "_property_builder"):
+            self._property_builder = PropertyBuilder(self.config["field_mappings"], self.get_related_id)
+        return self._property_builder
+
+    @property
+    def uses_snapshot(self) -> bool:
+        """Whether pages are matched against the local snapshot, enabled by `snapshot: true` in the integration's config."""
+        return self.snapshot is not None and bool(self.config.get("snapshot", False))
+
+    @property
+    def mapped_labels(self) -> list:
+        """The labels of the Notion properties the integration's field mappings write."""
+        return [label for _, _, label, _, _ in self.property_builder.fields]
+
+    def property_ids(self, labels) -> Optional[list]:
+        """
+        The IDs of the database properties with the given labels, for a query's filter_properties, or None,
+        meaning every property, if the database doesn't have them all or its schema can't be read. The
+        schema is read once per client.
+        """
+        if not hasattr(self, "_property_ids"):
+            try:
+                database = self.client.databases.retrieve(database_id=self.config["database_id"])
+                self._property_ids = {name: prop["id"] for name, prop in database["properties"].items()}
+            except APIResponseError as e:
+                logger.warning("Could not read the %s database's properties, querying all of them: %s", self.integration_name, e)
+                self._property_ids = {}
+
+        ids = [self._property_ids.get(label) for label in labels]
+        return ids if ids and all(ids) else None
+
+    def label_for(self, key: str) -> str:
+        """The Notion property label that the data key is mapped to."""
+        for _, _, label, field_key, _ in self.property_builder.fields:
+            if field_key == key:
+                return label
+        raise ValueError(f"No field mapping for key '{key}' in integration {self.integration_name}")
+
     def build_properties(self, field_mappings, data: dict):
         """
         Builds the Notion properties from data and field mappings.
         """
-        properties = {}
-        for field, config in field_mappings.items():
-            try:
-                field_type = config.get("type")
-                label = config["label"]
-
-                if field_type == "date":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'date' field.")
-                    properties[label] = {
-                        "date": {"start": data[config["key"]]}
-                    }
-                elif field_type == "number":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'number' field with field {field}.")
-                    properties[label] = {
-                        "number": data[config["key"]]
-                    }
-                elif field_type == "relation":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'relation' field.")
-                    related_database_id = config["relation"]["database_id"]
-                    related_field_name = config["relation"]["field_name"]
-                    properties[label] = {
-                        "relation": [
-                            {"id": self.get_related_id(related_database_id, related_field_name, data[config["key"]])}]
-                    }
-                elif field_type == "text":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'text' field.")
-                    properties[label] = {
-                        "rich_text": [{"type": "text", "text": {"content": data[config["key"]]}}]
-                    }
-                elif field_type == "select":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'select' field.")
-                    properties[label] = {
-                        "select": {"name": data[config["key"]]}
-                    }
-                elif field_type == "title":
-                    if config["key"] not in data:
-                        raise KeyError(f"Missing key '{config['key']}' in data for 'title' field.")
-                    properties[label] = {
-                        "title": [{"type": "text", "text": {"content": data[config["key"]]}}]
-                    }
-                else:
-                    err_msg = f"Unsupported field type: {field_type}"
-                    logger.error(err_msg)
-                    raise ValueError(err_msg)
-
-            except KeyError as e:
-                err_msg = f"Error processing field '{field}': {e}"
-                logger.error(err_msg)
-                raise ValueError(err_msg) from e
-            except Exception as e:
-                err_msg = f"Unexpected error processing field '{field}': {e}"
-                logger.error(err_msg)
-                raise ValueError(err_msg) from e
+        if field_mappings is self.config["field_mappings"]:
+            return self.property_builder.build(data)
+        return PropertyBuilder(field_mappings, self.get_related_id).build(data)
 
-        return properties
-    
     def get_related_id(self, related_database_id, key, value):
         """Get the id for the related page in a related database."""
-        response = self.client.databases.query(
-            database_id=related_database_id,
-            filter={
-                "property": key,
-                "rich_text": {
-                    "equals": value
-                }
-            }
-        )
-        results = response.get("results", [])
+        return self.relations.resolve(related_database_id, key, value)
 
-        if results:
-            return results[0]["id"]
-        return None
-    
-    def get_pages(self, date_str: str):
-        """Get pages from the Notion database for the given day."""
-        logger.info(f"Getting pages for the database id {self.config['database_id']} for date: {date_str}")
-        try:
-            database_id = self.config["database_id"]
+    def prefetch_relations(self, records):
+        """
+        Resolve every relation value used by the records up front, so building their properties needs no
+        further queries. Relations configured with `preload: true` load the whole related database instead.
+        """
+        for config in self.config["field_mappings"].values():
+            if config.get("type") != "relation":
+                continue
 
-            next_day = (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            related_database_id = config["relation"]["database_id"]
+            related_field_name = config["relation"]["field_name"]
+            if config["relation"].get("preload"):
+                self.relations.preload(related_database_id, related_field_name)
+            else:
+                values = [record[config["key"]] for record in records if config["key"] in record]
+                self.relations.resolve_many(related_database_id, related_field_name, values)
 
-            pages = self.client.databases.query(**{
-                "database_id": database_id,
-                "filter": {
-                    "and": [
-                        {"property": "Date", "date": {"on_or_after": date_str}},
-                        {"property": "Date", "date": {"before": next_day}}
-                    ]
-                }
-            })
+    def save_relation_cache(self):
+        """Persist the relation cache, if relations were resolved in this run."""
+        if hasattr(self, "_relations"):
+            self._relations.save()
 
-            pages = pages.get('results', [])
-            if not pages:
-                logger.info(f"No pages found for {date_str} in Notion database.")
+    @staticmethod
+    def date_range_conditions(start_str, end_str: str) -> list:
+        """
+        Build the Notion filter conditions matching the Date property between the start and end days
+        (inclusive). If start_str is None there is no lower bound. Raises ValueError for invalid dates.
+        """
+        day_after_end = (datetime.strptime(end_str, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        conditions = [{"property": "Date", "date": {"before": day_after_end}}]
+        if start_str is not None:
+            datetime.strptime(start_str, "%Y-%m-%d")
+            conditions.insert(0, {"property": "Date", "date": {"on_or_after": start_str}})
+        return conditions
 
-            return pages
-        except ValueError:
-            logger.error(f'Invalid date format: {date_str}. Expected YYYY-MM-DD')
+    def query_pages(self, filter: dict = None, sorts: list = None, page_size: int = None, filter_properties: list = None):
+        """
+        Lazily yield every page of the database matching the filter, following the result cursor
+        until Notion reports there are no more.
+
+        Args:
+            filter: A Notion database filter object, evaluated server side
+            sorts: Notion sort objects
+            page_size: Results per request, at most 100. Defaults to the integration's `page_size`
+                config value, or 100
+            filter_properties: Property IDs to return, limiting the size of each page's properties
+        """
+        page_size = page_size or self.config.get("page_size", 100)
+        if not 1 <= page_size <= 100:
+            raise ValueError(f"page_size must be between 1 and 100, got {page_size}")
+
+        query = {"database_id": self.config["database_id"], "page_size": page_size}
+        if filter:
+            query["filter"] = filter
+        if sorts:
+            query["sorts"] = sorts
+        if filter_properties:
+            query["filter_properties"] = filter_properties
+
+        start_cursor = None
+        while True:
+            response = self.client.databases.query(**query, start_cursor=start_cursor)
+            yield from response.get("results", [])
 
-    def get_pages_two_day_period(self, date_str: str):
-        """Get pages from the Notion database for the given day and previous day."""
-        logger.info(f"Getting pages for two day period ending on {date_str}")
+            start_cursor = response.get("next_cursor")
+            if not response.get("has_more") or not start_cursor:
+                break
+
+    def get_pages_for_range(self, start_str, end_str: str, page_size: int = None, properties: list = None):
+        """
+        Stream pages from the Notion database between the start and end days (inclusive).
+        If start_str is None every page up to and including the end day is returned. With properties,
+        a list of labels, Notion only returns those properties of each page, see property_ids.
+
+        With the snapshot enabled it is refreshed with the pages edited since its last refresh, usually a
+        single query, and the range is then read from the snapshot, with every property.
+        """
+        logger.info("Getting pages for period %s to %s", start_str or 'first record', end_str)
         try:
-            database_id = self.config["database_id"]
-            
-            # Get previous day
-            prev_day = (datetime.strptime(date_str, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-            next_day = (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
-
-            pages = self.client.databases.query(**{
-                "database_id": database_id,
-                "filter": {
-                    "and": [
-                        {"property": "Date", "date": {"on_or_after": prev_day}},
-                        {"property": "Date", "date": {"before": next_day}}
-                    ]
-                }
-            })
-
-            pages = pages.get('results', [])
-            if not pages:
-                logger.info(f"No pages found for period {prev_day} to {date_str} in Notion database.")
-
-            return pages
+            conditions = self.date_range_conditions(start_str, end_str)
         except ValueError:
-            logger.error(f'Invalid date format: {date_str}. Expected YYYY-MM-DD')
+            logger.error("Invalid date format: %s or %s. Expected YYYY-MM-DD", start_str, end_str)
+            return iter(())
+
+        if self.uses_snapshot:
+            self.snapshot.refresh(self)
+            return self.snapshot.pages(self.integration_name, start_str, end_str)
+
+        filter_properties = self.property_ids(properties) if properties else None
+        return self.query_pages(filter={"and": conditions}, page_size=page_size, filter_properties=filter_properties)
 
-    def create_page(self, data: dict):
+    @staticmethod
+    def index_pages(pages, notion_field: str) -> dict:
+        """
+        Index pages by the number value of the given Notion field, keeping the first page per value.
+        Each entry holds the page ID and its normalised properties. Pages may be any iterable, so a
+        streamed query is consumed without holding the raw pages themselves.
+        """
+        return NotionClient.index_pages_by(pages, lambda properties: properties[notion_field]['number'])
+
+    @staticmethod
+    def index_pages_by(pages, key) -> dict:
+        """Index pages by key(properties), for records matched on something other than a single number field."""
+        index = {}
+        for page in pages or []:
+            value = key(page['properties'])
+            if value is not None and value not in index:
+                index[value] = IndexedPage(page['id'], normalise_properties(page['properties']))
+        return index
+
+    def index_records(self, records, data_field: str, fetch_index) -> dict:
+        """
+        The index to upsert records against. Records the sync state store knows are indexed by the page
+        recorded for them, without reading Notion, and fetch_index(unknown_records) is only called for the
+        rest, e.g. to query the Notion rows for their days. With everything known no query is made.
+        """
+        if self.state_store is not None and not hasattr(self, "_state_bound"):
+            self._state_bound = self.state_store.bind_database(self.integration_name, self.config["database_id"])
+
+        index = {}
+        unknown = []
+        for record in records:
+            source_id = record[data_field]
+            state = self.state_store.get(self.integration_name, source_id) if self.state_store is not None else None
+            if state is None:
+                unknown.append(record)
+            else:
+                index[source_id] = IndexedPage(state.page_id, None)
+
+        if unknown:
+            for source_id, page in fetch_index(unknown).items():
+                # The stored page is the one syncs write to, so a duplicate found in Notion doesn't replace it
+                if source_id not in index or index[source_id].id == page.id:
+                    index[source_id] = page
+        logger.debug("Indexed %d of %d records from the sync state store", len(records) - len(unknown), len(records))
+        return index
+
+    @staticmethod
+    def changed_properties(properties: dict, existing: dict) -> dict:
+        """Return the built properties whose normalised value differs from the page's existing properties."""
+        missing = object()
+        return {
+            label: prop for label, prop in properties.items()
+            if normalise_property(prop) != existing.get(label, missing)
+        }
+
+    def summary(self) -> str:
+        """Describe the writes made by this client so far."""
+        summary = (
+            f"{self.integration_name}: {self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['partially_updated']} partially updated, {self.stats['skipped']} unchanged and skipped"
+        )
+        if self.stats["archived"]:
+            summary += f", {self.stats['archived']} archived"
+        if self.stats["failed"]:
+            summary += f", {self.stats['failed']} failed"
+        if hasattr(self, "_relations"):
+            summary += f", {self._relations.hits} relation cache hits, {self._relations.misses} relation lookups"
+        return summary
+
+    def create_page(self, data: dict, properties: dict = None):
         """Create a new page in Notion with a custom ID."""
         database_id = self.config["database_id"]
-        field_mappings = self.config["field_mappings"]
-        properties = self.build_properties(field_mappings, data)
+        if properties is None:
+            properties = self.property_builder.build(data)
 
         resp = self.client.pages.create(
             parent={"database_id": database_id},
             properties=properties
         )
-        logger.info(f"Page created in the database: {database_id}")
+        logger.debug("Page created in the database: %s", database_id, extra=SAMPLED)
         return resp
-    
-    def update_or_create_page(self, date_str: str, data: dict, data_field: str, notion_field: str, use_two_day_period: bool = False):
+
+    def _save_state(self, source_id, page_id: str, properties: dict):
+        if self.state_store is not None:
+            self.state_store.put(self.integration_name, source_id, page_id, SyncStateStore.hash_properties(properties))
+
+    def plan_upsert(self, data: dict, data_field: str, index: dict) -> Optional[PageWrite]:
         """
-        Check the pages from the database for the given day and update the record if present,
-        create if not.
+        Work out the write needed to bring Notion in line with the data, or None if the matched page
+        is already up to date, either per the sync state store or the page's own properties. Only
+        properties whose value differs from the matched page are included in an update.
+        """
+        source_id = data[data_field]
+        properties = self.property_builder.build(data)
+        match = index.get(source_id)
+
+        if not match:
+            return PageWrite(source_id, None, properties, properties)
+
+        state = self.state_store.get(self.integration_name, source_id) if self.state_store else None
+        if state and state.page_id == match.id and state.content_hash == SyncStateStore.hash_properties(properties):
+            changed = {}
+        elif match.properties is None:
+            # Known only from the store, so the page's current values are unknown and everything is sent
+            changed = properties
+        else:
+            changed = self.changed_properties(properties, match.properties)
+
+        if not changed:
+            logger.debug("Match found and unchanged. Skipping update.", extra=SAMPLED)
+            self.stats["skipped"] += 1
+            return None
+        return PageWrite(source_id, match.id, changed, properties)
+
+    def record_write(self, write: PageWrite, page_id: str, index: dict):
+        """Record a completed write in the index, the sync state store and the run stats."""
+        if write.page_id is None:
+            self.stats["created"] += 1
+        elif len(write.properties) == len(write.all_properties):
+            self.stats["updated"] += 1
+        else:
+            self.stats["partially_updated"] += 1
+
+        index[write.source_id] = IndexedPage(page_id, normalise_properties(write.all_properties))
+        self._save_state(write.source_id, page_id, write.all_properties)
+
+    def forget_unwritable_page(self, write: PageWrite, index: dict, error: Exception) -> PageWrite:
+        """
+        Drop a page that was deleted or archived in Notion since the sync state store recorded it, and
+        return the write that creates its replacement.
+        """
+        logger.info("Stored page %s for %s is no longer writable: %s", write.page_id, write.source_id, error)
+        index.pop(write.source_id, None)
+        if self.state_store is not None:
+            self.state_store.delete(self.integration_name, write.source_id)
+        return PageWrite(write.source_id, None, write.all_properties, write.all_properties)
+
+    def upsert_page(self, data: dict, data_field: str, index: dict):
+        """
+        Update the page matching the data in a prefetched index, or create one if there is no match.
+        Newly created pages are added to the index so repeated records in the same run update rather
+        than duplicate. Unchanged pages are skipped and only changed properties are sent, see `plan_upsert`.
 
         Args:
-            date_str: The date to check for records
             data: The data to update or create
             data_field: The field in the data dict to match against
-            notion_field: The field in Notion to match against
-            use_two_day_period: Whether to check both the current and previous day for matches
+            index: Pages keyed by the value of the matching Notion field, see `index_pages`
         """
-        logger.info("Running update or create sync...")
+        write = self.plan_upsert(data, data_field, index)
+        if write is None:
+            return
 
-        field_mappings = self.config["field_mappings"]
-        properties = self.build_properties(field_mappings, data)
+        if write.page_id:
+            logger.debug("Match found. Updating %d of %d properties", len(write.properties), len(write.all_properties), extra=SAMPLED)
+            try:
+                self.client.pages.update(page_id=write.page_id, properties=write.properties)
+                logger.debug("Page updated.", extra=SAMPLED)
+                page_id = write.page_id
+            except APIResponseError as e:
+                if index[write.source_id].properties is not None or not is_unwritable_page_error(e):
+                    raise
+                write = self.forget_unwritable_page(write, index, e)
+                page_id = self.create_page(data, write.properties)["id"]
+        else:
+            logger.debug("No matching pages found. Creating a new page.", extra=SAMPLED)
+            page_id = self.create_page(data, write.properties)["id"]
+
+        self.record_write(write, page_id, index)
+
+    def upsert_pages(self, records, data_field: str, index: dict, concurrency: int = 1):
+        """
+        Upsert a batch of records against a prefetched index. With a concurrency above one the writes go
+        through an AsyncNotionWriter, rate limited by the client's limiter, and a failed write doesn't stop
+        the others. Failures are logged per record and reported together once the batch is done.
+        """
+        if concurrency <= 1:
+            with metrics.timer("notion.writes"):
+                for record in records:
+                    self.upsert_page(record, data_field, index)
+            return
+
+        # Later records win if a source ID appears more than once, so it is only created once
+        latest = {record[data_field]: record for record in records}
+        writes = [write for write in (self.plan_upsert(record, data_field, index) for record in latest.values()) if write]
+        logger.info("Writing %d pages to Notion with %d concurrent workers.", len(writes), concurrency)
+
+        failures = []
+        writer = AsyncNotionWriter(self.api_key, self.config["database_id"], limiter=self.rate_limiter, concurrency=concurrency)
+        with writer, metrics.timer("notion.writes"):
+            results = writer.write(writes)
+            # Pages known only from the store that were archived in Notion since are created again
+            stale = [
+                position for position, result in enumerate(results)
+                if result.error is not None and result.write.page_id
+                and index[result.write.source_id].properties is None and is_unwritable_page_error(result.error)
+            ]
+            if stale:
+                retried = writer.write([self.forget_unwritable_page(results[p].write, index, results[p].error) for p in stale])
+                for position, result in zip(stale, retried):
+                    results[position] = result
+        for result in results:
+            if result.error is not None:
+                self.stats["failed"] += 1
+                failures.append(result)
+            else:
+                self.record_write(result.write, result.page_id, index)
+
+        if failures:
+            failed_ids = ", ".join(str(result.write.source_id) for result in failures)
+            raise RuntimeError(f"{len(failures)} of {len(writes)} Notion writes failed, for records: {failed_ids}")
 
-        # Get the pages for the specified period from the database
-        pages = self.get_pages_two_day_period(date_str) if use_two_day_period else self.get_pages(date_str)
-        matching = [page for page in pages if page['properties'][notion_field]['number'] == data[data_field]]
 
-        if matching:  # Ensures there is at least one match before accessing index 0
-            matching_id = matching[0]['id']
-            logger.info("Match found. Updating page")
-            self.client.pages.update(page_id=matching_id, properties=properties)
-            logger.info("Page updated.")
-        else:
-            logger.info("No matching pages found. Creating a new page.")
-            self.create_page(data)
-    
 if __name__ == "__main__":
     logger.info("Notion Client")
@@ -0,0 +1,122 @@
+import threading
+from typing import Optional
+
+import httpx
+from notion_client import AsyncClient, Client
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+from src.utils.metrics import metrics
+from src.utils.rate_limit import TokenBucket
+from src.utils.retry import RetryDecision, RetryPolicy, classify_status
+
+# Notion allows an average of three requests per second per integration, with some burst headroom
+NOTION_RATE_LIMIT = 3.0
+NOTION_BURST = 10
+
+
+def classify_notion_error(error: Exception) -> Optional[RetryDecision]:
+    """Retry decision for an exception raised by notion_client, or None if it shouldn't be retried."""
+    if isinstance(error, HTTPResponseError):
+        return classify_status(error.status, error.headers)
+    if isinstance(error, RequestTimeoutError):
+        return RetryDecision()
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return RetryDecision(maybe_applied=False)
+    if isinstance(error, httpx.TransportError):
+        return RetryDecision()
+    return None
+
+
+notion_retry_policy = RetryPolicy("notion", classify_notion_error)
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """Name a request by its endpoint rather than its resource ID, e.g. 'POST databases/query'."""
+    segments = path.strip("/").split("/")
+    name = segments[0] if len(segments) < 3 else f"{segments[0]}/{segments[-1]}"
+    return f"{method} {name}"
+
+
+def is_idempotent(method: str, path: str) -> bool:
+    # Creating a page is the only write that isn't safe to repeat
+    return not (method == "POST" and path.strip("/") == "pages")
+
+
+def record_response_size(response: httpx.Response):
+    """httpx response hook recording the size Notion reports for each response as Bytes."""
+    path = response.request.url.path.split("/v1/", 1)[-1]
+    size = int(response.headers.get("content-length", 0))
+    metrics.increment("Bytes", size, api="notion", endpoint=endpoint_name(response.request.method, path))
+
+
+async def record_response_size_async(response: httpx.Response):
+    record_response_size(response)
+
+
+class RetryingClient(Client):
+    """
+    Notion client whose requests are retried according to a RetryPolicy, and with a limiter, wait
+    for a token before every attempt.
+    """
+
+    def __init__(self, *args, retry_policy: RetryPolicy = None, limiter: TokenBucket = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_policy = retry_policy or notion_retry_policy
+        self.limiter = limiter
+        self.client.event_hooks["response"].append(record_response_size)
+
+    def request(self, path, method, query=None, body=None, auth=None):
+        return self.retry_policy.call(
+            super().request, path, method, query, body, auth,
+            endpoint=endpoint_name(method, path), idempotent=is_idempotent(method, path),
+            throttle=self.limiter.acquire if self.limiter is not None else None,
+        )
+
+
+class RetryingAsyncClient(AsyncClient):
+    """
+    Async Notion client whose requests are retried according to a RetryPolicy, and with a limiter, wait
+    for a token before every attempt.
+    """
+
+    def __init__(self, *args, retry_policy: RetryPolicy = None, limiter: TokenBucket = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_policy = retry_policy or notion_retry_policy
+        self.limiter = limiter
+        self.client.event_hooks["response"].append(record_response_size_async)
+
+    async def request(self, path, method, query=None, body=None, auth=None):
+        return await self.retry_policy.call_async(
+            super().request, path, method, query, body, auth,
+            endpoint=endpoint_name(method, path), idempotent=is_idempotent(method, path),
+            throttle=self.limiter.acquire_async if self.limiter is not None else None,
+        )
+
+
+_shared_clients = {}
+_shared_limiters = {}
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter(api_key: str) -> TokenBucket:
+    """
+    Return the process-wide rate limiter for the API key. Notion's limit applies per integration token,
+    so every client and writer using the key, in any thread, draws from the same bucket.
+    """
+    with _shared_lock:
+        if api_key not in _shared_limiters:
+            _shared_limiters[api_key] = TokenBucket(NOTION_RATE_LIMIT, NOTION_BURST)
+        return _shared_limiters[api_key]
+
+
+def shared_client(api_key: str) -> RetryingClient:
+    """
+    Return the process-wide Notion client for the API key, creating it on first use. Sharing it keeps
+    one HTTP connection pool alive across NotionClient instances, concurrently running integrations
+    and warm Lambda invocations.
+    """
+    limiter = shared_rate_limiter(api_key)
+    with _shared_lock:
+        if api_key not in _shared_clients:
+            _shared_clients[api_key] = RetryingClient(auth=api_key, limiter=limiter)
+        return _shared_clients[api_key]
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+
+def _normalise_date(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def plain_text(items) -> str:
+    """Concatenate the text of a title or rich_text array."""
+    return "".join(item.get("plain_text", item.get("text", {}).get("content")) or "" for item in items or [])
+
+
+def normalise_property(prop: dict):
+    """
+    Reduce a Notion property value to a plain comparable value. Works on both the properties built
+    for a write and the properties returned on a page, which carry extra keys such as `id` and `type`.
+    """
+    if "number" in prop:
+        return prop["number"]
+    if "date" in prop:
+        return _normalise_date((prop["date"] or {}).get("start"))
+    if "title" in prop:
+        return plain_text(prop["title"])
+    if "rich_text" in prop:
+        return plain_text(prop["rich_text"])
+    if "select" in prop:
+        return (prop["select"] or {}).get("name")
+    if "relation" in prop:
+        return sorted(item["id"].replace("-", "") for item in prop["relation"] or [] if item.get("id"))
+    return prop
+
+
+def normalise_properties(properties: dict) -> dict:
+    return {label: normalise_property(prop) for label, prop in properties.items()}
@@ -0,0 +1,115 @@
+import asyncio
+from typing import NamedTuple, Optional
+
+from src.services.notion_api import NOTION_BURST, NOTION_RATE_LIMIT, RetryingAsyncClient
+from src.utils.logger import get_logger
+from src.utils.rate_limit import TokenBucket
+
+logger = get_logger()
+
+
+def default_rate_limiter() -> TokenBucket:
+    return TokenBucket(NOTION_RATE_LIMIT, NOTION_BURST)
+
+
+class PageWrite(NamedTuple):
+    """A pending create (page_id is None), update or archive for a single source record."""
+    source_id: object
+    page_id: Optional[str]
+    properties: dict
+    all_properties: dict
+    archive: bool = False
+
+
+class WriteResult(NamedTuple):
+    write: PageWrite
+    page_id: Optional[str]
+    error: Optional[Exception]
+
+
+class AsyncNotionWriter:
+    """
+    Pushes page creates, updates and archives through a bounded pool of asyncio workers sharing one
+    AsyncClient connection pool, with every request attempt, retries included, gated by a token bucket
+    limiter.
+
+    The client and its event loop are created on the first write and reused by every later one, until
+    close, so use the writer as a context manager. A client passed in is used as is, with its own retries
+    and rate limiting, and is left open.
+
+    Results are returned in the same order as the writes, each carrying either the written page's
+    ID or the error for that record, so one failure doesn't stop the rest of the batch.
+    """
+
+    def __init__(self, api_key: str, database_id: str, limiter: TokenBucket = None, concurrency: int = 4, client=None):
+        self.api_key = api_key
+        self.database_id = database_id
+        self.limiter = limiter or default_rate_limiter()
+        self.concurrency = max(1, concurrency)
+        self._client = client
+        self._owns_client = client is None
+        self._loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def client(self):
+        """Lazily create the client, retrying and rate limiting each request attempt with the writer's limiter."""
+        if self._client is None:
+            self._client = RetryingAsyncClient(auth=self.api_key, limiter=self.limiter)
+        return self._client
+
+    def write(self, writes) -> list:
+        """Run every write to completion and return their results in order."""
+        writes = list(writes)
+        if not writes:
+            return []
+        # The client's connections belong to the loop they were opened on, so every write runs on the same one
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self._write_all(writes))
+
+    def close(self):
+        """Close the writer's own client and its event loop."""
+        if self._loop is None:
+            return
+        if self._owns_client and self._client is not None:
+            self._loop.run_until_complete(self._client.aclose())
+            self._client = None
+        self._loop.close()
+        self._loop = None
+
+    async def _write_one(self, client, write: PageWrite) -> WriteResult:
+        try:
+            if write.archive:
+                await client.pages.update(page_id=write.page_id, archived=True)
+                return WriteResult(write, write.page_id, None)
+
+            if write.page_id:
+                await client.pages.update(page_id=write.page_id, properties=write.properties)
+                return WriteResult(write, write.page_id, None)
+
+            response = await client.pages.create(parent={"database_id": self.database_id}, properties=write.properties)
+            return WriteResult(write, response["id"], None)
+        except Exception as e:
+            logger.error("Notion write failed for record %s: %s", write.source_id, e)
+            return WriteResult(write, None, e)
+
+    async def _write_all(self, writes) -> list:
+        queue = asyncio.Queue()
+        for position, write in enumerate(writes):
+            queue.put_nowait((position, write))
+        results = [None] * len(writes)
+        client = self.client
+
+        async def worker():
+            while not queue.empty():
+                position, write = queue.get_nowait()
+                results[position] = await self._write_one(client, write)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(writes)))))
+        return results
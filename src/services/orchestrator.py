@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, NamedTuple, Optional
+
+from src.services.sync import (
+    backfill_sleep_and_recovery,
+    sync_lingq,
+    sync_sleep_and_recovery_incremental,
+    sync_workouts,
+    sync_workouts_incremental,
+)
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+INTEGRATIONS = ("lingq", "whoop-workout", "whoop-sleep-and-recovery")
+
+
+class SyncPlan(NamedTuple):
+    """What every integration in a combined run syncs."""
+    start_date: date
+    end_date: date
+    incremental: bool = False
+    lookback_days: int = 2
+    concurrency: int = 1
+
+
+class IntegrationResult(NamedTuple):
+    name: str
+    status: str
+    count: Optional[int]
+    seconds: float
+    error: Optional[str] = None
+
+
+def integration_job(name: str, plan: SyncPlan, get_service: Callable, get_notion_client: Callable, state_store=None):
+    """
+    A callable that syncs one integration according to the plan and returns the number of records synced.
+    get_service is called with 'lingq' or 'whoop' and get_notion_client with the integration name.
+    """
+    if name not in INTEGRATIONS:
+        raise ValueError(f"Unknown integration '{name}', expected one of {', '.join(INTEGRATIONS)}")
+
+    def job():
+        notion_client = get_notion_client(name)
+        if name == "lingq":
+            return sync_lingq(get_service("lingq"), notion_client, plan.concurrency)
+
+        whoop_service = get_service("whoop")
+        if plan.incremental:
+            if state_store is None:
+                raise RuntimeError("Incremental sync needs the sync state store, which is disabled by SYNC_STATE_PATH.")
+            sync = sync_workouts_incremental if name == "whoop-workout" else sync_sleep_and_recovery_incremental
+            return sync(whoop_service, notion_client, state_store, plan.lookback_days, plan.concurrency)
+        if name == "whoop-workout":
+            return sync_workouts(whoop_service, notion_client, plan.start_date, plan.end_date, plan.concurrency)
+        return backfill_sleep_and_recovery(whoop_service, notion_client, plan.start_date, plan.end_date, concurrency=plan.concurrency).synced
+
+    return job
+
+
+def _run(name: str, job: Callable) -> IntegrationResult:
+    started = time.perf_counter()
+    try:
+        count = job()
+    except Exception as e:
+        logger.exception("%s sync failed: %s", name, e)
+        return IntegrationResult(name, "error", None, time.perf_counter() - started, str(e))
+    return IntegrationResult(name, "success", count, time.perf_counter() - started)
+
+
+def run_integrations(jobs: dict, max_workers: int = None, thread_name_prefix: str = "sync") -> list:
+    """
+    Run each job in jobs (integration name -> callable) on its own thread and return an
+    IntegrationResult for each, in the order given. A failing job is logged and reported without
+    affecting the others.
+
+    The jobs share whatever their services share: Notion clients for the same API key use one
+    connection pool and one rate limiter, so running integrations together doesn't exceed Notion's
+    limit, and the Whoop integrations share one authenticated session.
+    """
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(jobs), thread_name_prefix=thread_name_prefix) as executor:
+        futures = {name: executor.submit(_run, name, job) for name, job in jobs.items()}
+    return [future.result() for future in futures.values()]
+
+
+def overall_status(results: list) -> str:
+    """'success' if every integration succeeded, 'error' if all failed, otherwise 'partial'."""
+    failed = sum(result.status != "success" for result in results)
+    if not failed:
+        return "success"
+    return "error" if failed == len(results) else "partial"
+
+
+def format_report(results: list, seconds: float) -> str:
+    succeeded = sum(result.status == "success" for result in results)
+    lines = [f"Sync report: {succeeded} of {len(results)} integrations succeeded in {seconds:.2f}s"]
+    for result in results:
+        count = f"{result.count} records" if result.count is not None else "-"
+        line = f"  {result.name:<26} {result.status:<8} {count:>12} {result.seconds:8.2f}s"
+        if result.error:
+            line += f"  {result.error}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+from typing import Callable
+
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _date(value):
+    return {"date": {"start": value}}
+
+
+def _number(value):
+    return {"number": value}
+
+
+def _text(value):
+    return {"rich_text": [{"type": "text", "text": {"content": value}}]}
+
+
+def _select(value):
+    return {"select": {"name": value}}
+
+
+def _title(value):
+    return {"title": [{"type": "text", "text": {"content": value}}]}
+
+
+VALUE_BUILDERS = {
+    "date": _date,
+    "number": _number,
+    "text": _text,
+    "select": _select,
+    "title": _title,
+}
+
+FIELD_TYPES = set(VALUE_BUILDERS) | {"relation"}
+
+
+def validate_field_mappings(field_mappings) -> list:
+    """Return a description of every problem with an integration's field mappings, or an empty list."""
+    if not isinstance(field_mappings, dict) or not field_mappings:
+        return ["field_mappings must be a non-empty mapping of fields"]
+
+    errors = []
+    labels = set()
+    for field, config in field_mappings.items():
+        if not isinstance(config, dict):
+            errors.append(f"Field '{field}' must be a mapping")
+            continue
+
+        for required in ("label", "key", "type"):
+            if not config.get(required):
+                errors.append(f"Field '{field}' is missing '{required}'")
+
+        field_type = config.get("type")
+        if field_type and field_type not in FIELD_TYPES:
+            errors.append(f"Field '{field}' has unsupported type '{field_type}', expected one of {sorted(FIELD_TYPES)}")
+
+        if field_type == "relation":
+            relation = config.get("relation")
+            if not isinstance(relation, dict) or not relation.get("database_id") or not relation.get("field_name"):
+                errors.append(f"Relation field '{field}' needs 'relation.database_id' and 'relation.field_name'")
+
+        label = config.get("label")
+        if label in labels:
+            errors.append(f"Field '{field}' reuses the label '{label}'")
+        labels.add(label)
+
+    return errors
+
+
+class PropertyBuilder:
+    """
+    Field mappings compiled into a flat list of per-field builders, so converting a record to
+    Notion properties doesn't walk the mapping config again for every record.
+
+    Args:
+        field_mappings: The integration's `field_mappings` config, validated on compile
+        resolve_relation: Called as resolve_relation(database_id, field_name, value) to get the ID of
+            the related page for relation fields
+    """
+
+    def __init__(self, field_mappings: dict, resolve_relation: Callable = None):
+        errors = validate_field_mappings(field_mappings)
+        if errors:
+            err_msg = "Invalid field mappings: " + "; ".join(errors)
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+
+        self.fields = [
+            (field, config["type"], config["label"], config["key"], self._value_builder(config, resolve_relation))
+            for field, config in field_mappings.items()
+        ]
+        self._builders = [(label, key, build_value) for _, _, label, key, build_value in self.fields]
+
+    @staticmethod
+    def _value_builder(config: dict, resolve_relation: Callable):
+        if config["type"] != "relation":
+            return VALUE_BUILDERS[config["type"]]
+
+        related_database_id = config["relation"]["database_id"]
+        related_field_name = config["relation"]["field_name"]
+
+        def _relation(value):
+            return {"relation": [{"id": resolve_relation(related_database_id, related_field_name, value)}]}
+
+        return _relation
+
+    def build(self, data) -> dict:
+        """Builds the Notion properties for a record, either a dict or a record dataclass read by attribute."""
+        try:
+            if type(data) is dict:
+                return {label: build_value(data[key]) for label, key, build_value in self._builders}
+            return {label: build_value(getattr(data, key)) for label, key, build_value in self._builders}
+        except Exception:
+            # Rebuild field by field to report which one failed
+            self._raise_field_error(data)
+            raise
+
+    def _raise_field_error(self, data: dict):
+        for field, field_type, label, key, build_value in self.fields:
+            try:
+                value = data[key]
+            except KeyError as e:
+                err_msg = f"Error processing field '{field}': Missing key '{key}' in data for '{field_type}' field."
+                logger.error(err_msg)
+                raise ValueError(err_msg) from e
+
+            try:
+                build_value(value)
+            except Exception as e:
+                err_msg = f"Unexpected error processing field '{field}': {e}"
+                logger.error(err_msg)
+                raise ValueError(err_msg) from e
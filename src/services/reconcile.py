@@ -0,0 +1,173 @@
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional
+
+from src.services.notion_writer import AsyncNotionWriter, PageWrite
+from src.services.orchestrator import INTEGRATIONS
+from src.services.sync import lingq_page_key
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger()
+
+# Days either side of the range read from Whoop, so a record dated near either end of the range in
+# Notion is found at the source whichever way its timezone falls
+SOURCE_MARGIN_DAYS = 1
+
+
+class Archive(NamedTuple):
+    """A page to archive, the record key it was matched on, and whether it is 'orphaned' or a 'duplicate'."""
+    page_id: str
+    key: object
+    reason: str
+
+
+class ReconcileResult(NamedTuple):
+    integration: str
+    pages: int
+    # Records at the source, or None when orphans aren't looked for
+    source_records: Optional[int]
+    archives: list
+    archived: int = 0
+    failed: int = 0
+    # Pages without the properties a record is matched on, which are left alone
+    unkeyed: int = 0
+
+
+def find_archives(pages, page_key: Callable, source_keys: set = None, keep: Callable = None) -> tuple:
+    """
+    Walk the pages once and return (archives, pages seen, pages without a key).
+
+    Pages are keyed by page_key(properties). The first page seen for a key is kept, unless keep(key)
+    returns the ID of a later one, and every other page for the key is a duplicate. With source_keys,
+    the kept page for a key that isn't among them is orphaned. Only the kept page ID per key is held.
+    """
+    kept = {}
+    archives = []
+    count = unkeyed = 0
+    for page in pages:
+        count += 1
+        key = page_key(page["properties"])
+        if key is None:
+            unkeyed += 1
+            continue
+        if key not in kept:
+            kept[key] = page["id"]
+            continue
+
+        page_id = page["id"]
+        if keep is not None and keep(key) == page_id:
+            kept[key], page_id = page_id, kept[key]
+        archives.append(Archive(page_id, key, "duplicate"))
+
+    if source_keys is not None:
+        archives.extend(Archive(page_id, key, "orphaned") for key, page_id in kept.items() if key not in source_keys)
+    return archives, count, unkeyed
+
+
+def reconcile(notion_client, page_key: Callable, start_date, end_date, source_keys: set = None,
+              dry_run: bool = False, concurrency: int = 1, properties: list = None) -> ReconcileResult:
+    """
+    Archive the integration's Notion pages dated start_date to end_date (inclusive) that duplicate
+    another page for the same record or, given the set of record keys at the source, whose record no
+    longer exists there.
+
+    The range is read with one paginated query, oldest page first, and diffed in memory, see
+    find_archives. With properties, the labels page_key reads, only those properties are fetched, see
+    NotionClient.property_ids. Of several pages for a record, the one the sync state store writes to is kept, or
+    else the first created. Archives go through an AsyncNotionWriter sharing the client's rate limiter,
+    and the sync state and snapshot entries of archived pages are dropped. Notion keeps archived pages
+    in its trash, from where they can be restored.
+    """
+    integration = notion_client.integration_name
+    store = notion_client.state_store
+
+    def keep(key):
+        state = store.get(integration, key) if store is not None else None
+        return state.page_id if state else None
+
+    conditions = notion_client.date_range_conditions(start_date.isoformat(), end_date.isoformat())
+    filter_properties = notion_client.property_ids(properties) if properties else None
+    pages = notion_client.query_pages(filter={"and": conditions}, sorts=[{"timestamp": "created_time", "direction": "ascending"}],
+                                      filter_properties=filter_properties)
+    with metrics.timer("notion.scan", integration=integration):
+        archives, count, unkeyed = find_archives(pages, page_key, source_keys, keep)
+
+    if source_keys is not None and not source_keys and count:
+        # More likely a problem at the source than every record in the range having been deleted
+        logger.warning("No %s records at the source for %s to %s, so no pages are treated as orphaned", integration, start_date, end_date)
+        archives = [archive for archive in archives if archive.reason != "orphaned"]
+
+    for archive in archives:
+        logger.info("%s %s %s page %s for %s", "Would archive" if dry_run else "Archiving", archive.reason, integration, archive.page_id, archive.key)
+    result = ReconcileResult(integration, count, len(source_keys) if source_keys is not None else None, archives, unkeyed=unkeyed)
+    if dry_run or not archives:
+        return result
+
+    writes = [PageWrite(archive.key, archive.page_id, {}, {}, archive=True) for archive in archives]
+    writer = AsyncNotionWriter(notion_client.api_key, notion_client.config["database_id"], limiter=notion_client.rate_limiter, concurrency=concurrency)
+    with writer, metrics.timer("notion.writes"):
+        results = writer.write(writes)
+
+    archived = [archive for archive, write in zip(archives, results) if write.error is None]
+    failed = len(archives) - len(archived)
+    notion_client.stats["archived"] += len(archived)
+    notion_client.stats["failed"] += failed
+
+    for archive in archived:
+        if store is not None and keep(archive.key) == archive.page_id:
+            store.delete(integration, archive.key)
+    if notion_client.snapshot is not None:
+        notion_client.snapshot.remove(integration, [archive.page_id for archive in archived])
+
+    logger.info(notion_client.summary())
+    return result._replace(archived=len(archived), failed=failed)
+
+
+def whoop_page_key(notion_client) -> Callable:
+    """A function returning the Whoop ID of a Whoop row from its Notion properties."""
+    label = notion_client.label_for("id")
+    return lambda properties: (properties.get(label) or {}).get("number")
+
+
+def reconcile_integration(name: str, get_service: Callable, notion_client, start_date, end_date,
+                          dry_run: bool = False, concurrency: int = 1) -> ReconcileResult:
+    """
+    Reconcile one integration's Notion rows dated start_date to end_date (inclusive), see reconcile.
+    get_service is called with 'whoop' for the Whoop integrations.
+
+    Whoop rows are checked for duplicates and orphans against the IDs in one Whoop collection read,
+    with a margin of SOURCE_MARGIN_DAYS. LingQ rows are only checked for duplicates, as LingQ only reports
+    today's word counts.
+    """
+    if name not in INTEGRATIONS:
+        raise ValueError(f"Unknown integration '{name}', expected one of {', '.join(INTEGRATIONS)}")
+
+    if name == "lingq":
+        properties = [notion_client.label_for("date"), notion_client.label_for("language")]
+        return reconcile(notion_client, lingq_page_key(notion_client), start_date, end_date, None, dry_run, concurrency, properties)
+
+    margin = timedelta(days=SOURCE_MARGIN_DAYS)
+    if name == "whoop-workout":
+        source_keys = get_service("whoop").get_collection_ids("workout", start_date - margin, end_date + margin)
+    else:
+        # Sleeps are dated by the day they ended, so they start up to a day before
+        source_keys = get_service("whoop").get_collection_ids("sleep", start_date - timedelta(days=1) - margin, end_date + margin)
+    return reconcile(notion_client, whoop_page_key(notion_client), start_date, end_date, source_keys, dry_run, concurrency,
+                     [notion_client.label_for("id")])
+
+
+def format_reconcile_report(results: list, dry_run: bool = False) -> str:
+    lines = ["Reconcile report (dry run):" if dry_run else "Reconcile report:"]
+    for result in results:
+        orphaned = sum(archive.reason == "orphaned" for archive in result.archives)
+        duplicates = len(result.archives) - orphaned
+        source = f"{result.source_records} at source" if result.source_records is not None else "source not checked"
+        line = f"  {result.integration:<26} {result.pages} pages, {source}, {orphaned} orphaned, {duplicates} duplicates"
+        if not dry_run:
+            line += f", {result.archived} archived"
+        if result.failed:
+            line += f", {result.failed} failed"
+        if result.unkeyed:
+            line += f", {result.unkeyed} without a key left alone"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.services.notion_properties import plain_text
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger()
+
+# Notion doesn't document a hard limit on compound filter size, so keep OR queries modest
+MAX_OR_CONDITIONS = 100
+
+
+def _text_value(prop: dict):
+    """The plain text of a title or rich_text property, which is what relation fields are matched on."""
+    items = prop.get("title") if "title" in prop else prop.get("rich_text")
+    if items is None:
+        return None
+    return plain_text(items)
+
+
+class RelationResolver:
+    """
+    Resolves relation values to the IDs of pages in a related database.
+
+    Lookups are held in an LRU cache with a TTL, keyed by related database, field name and value.
+    A related database can be preloaded with a single paginated scan into a map of its own, which is
+    never evicted, and a batch of values can be resolved with one OR-filter query. If cache_path is set the cache is loaded from and
+    saved to that JSON file so lookups survive between runs.
+    """
+
+    def __init__(self, client, ttl: float = 3600, maxsize: int = 4096, cache_path=None):
+        self.client = client
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._cache = OrderedDict()
+        # (database_id, field_name) -> (expires_at, {value: page_id}) for each preloaded database
+        self._preloaded = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_path:
+            self.load()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False, None
+            page_id, expires_at = entry
+            if expires_at < time.time():
+                del self._cache[key]
+                return False, None
+            self._cache.move_to_end(key)
+            return True, page_id
+
+    def _set(self, key, page_id, expires_at=None):
+        with self._lock:
+            self._cache[key] = (page_id, expires_at or time.time() + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def _preloaded_pages(self, database_id, field_name):
+        """The page IDs of a fresh preload of the related database by value, or None."""
+        with self._lock:
+            entry = self._preloaded.get((database_id, field_name))
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def _query(self, database_id, filter=None):
+        start_cursor = None
+        while True:
+            kwargs = {"database_id": database_id, "page_size": 100, "start_cursor": start_cursor}
+            if filter:
+                kwargs["filter"] = filter
+            response = self.client.databases.query(**kwargs)
+            yield from response.get("results", [])
+
+            start_cursor = response.get("next_cursor")
+            if not response.get("has_more") or not start_cursor:
+                break
+
+    def preload(self, database_id: str, field_name: str) -> int:
+        """Load every page of the related database, keyed by field_name, for the TTL. Returns the page count."""
+        pages = {}
+        with metrics.timer("notion.relations"):
+            for page in self._query(database_id):
+                value = _text_value(page["properties"].get(field_name, {}))
+                if value is not None:
+                    pages.setdefault(value, page["id"])
+
+        with self._lock:
+            self._preloaded[(database_id, field_name)] = (time.time() + self.ttl, pages)
+        logger.info("Preloaded %d related pages from database %s", len(pages), database_id)
+        return len(pages)
+
+    def resolve_many(self, database_id: str, field_name: str, values) -> dict:
+        """Resolve values to related page IDs, querying Notion once per batch of uncached values."""
+        results = {}
+        pending = []
+        preloaded = self._preloaded_pages(database_id, field_name)
+        for value in dict.fromkeys(values):
+            if preloaded is not None:
+                # Anything not seen in a fresh preload doesn't exist in the related database
+                self.hits += 1
+                results[value] = preloaded.get(value)
+                continue
+            found, page_id = self._get((database_id, field_name, value))
+            if found:
+                self.hits += 1
+                results[value] = page_id
+            else:
+                pending.append(value)
+        if results:
+            metrics.increment("CacheHits", len(results), cache="relations")
+
+        for i in range(0, len(pending), MAX_OR_CONDITIONS):
+            batch = pending[i:i + MAX_OR_CONDITIONS]
+            self.misses += len(batch)
+            metrics.increment("CacheMisses", len(batch), cache="relations")
+            conditions = [{"property": field_name, "rich_text": {"equals": value}} for value in batch]
+            filter = conditions[0] if len(conditions) == 1 else {"or": conditions}
+
+            found = {}
+            with metrics.timer("notion.relations"):
+                for page in self._query(database_id, filter):
+                    found.setdefault(_text_value(page["properties"].get(field_name, {})), page["id"])
+
+            for value in batch:
+                # Misses are cached too, so a missing related page isn't looked up for every record
+                self._set((database_id, field_name, value), found.get(value))
+                results[value] = found.get(value)
+
+        return results
+
+    def resolve(self, database_id: str, field_name: str, value):
+        """Resolve a single value to the related page ID, or None if there is no such page."""
+        return self.resolve_many(database_id, field_name, [value])[value]
+
+    def load(self):
+        """Load unexpired entries from the cache file, if it exists."""
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "r") as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable relation cache %s: %s", self.cache_path, e)
+            return
+
+        now = time.time()
+        for database_id, field_name, value, page_id, expires_at in entries:
+            if expires_at >= now:
+                self._set((database_id, field_name, value), page_id, expires_at)
+
+    def save(self):
+        """Write the cache to the cache file, if one is configured."""
+        if not self.cache_path:
+            return
+        with self._lock:
+            entries = [[*key, page_id, expires_at] for key, (page_id, expires_at) in self._cache.items()]
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from src.services.sync_state import DISABLED_VALUES
+from src.utils.logger import get_logger
+from src.utils.sqlite import connect_private
+
+logger = get_logger()
+
+# Pages deleted or archived in Notion never show up in an incremental refresh, so the whole database is
+# rescanned when the last full scan is older than this
+DEFAULT_FULL_REFRESH_HOURS = 24
+
+
+def default_snapshot_path() -> Optional[Path]:
+    """NOTION_SNAPSHOT_PATH, 'off' to disable snapshots, or a file next to the sync state (in /tmp on Lambda)."""
+    configured = os.environ.get("NOTION_SNAPSHOT_PATH")
+    if configured is not None:
+        if configured.strip().lower() in DISABLED_VALUES:
+            return None
+        return Path(configured)
+
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return Path("/tmp/notion-dashboard/notion_snapshot.db")
+    return Path.home() / ".notion-dashboard" / "notion_snapshot.db"
+
+
+class SnapshotInfo(NamedTuple):
+    integration: str
+    database_id: str
+    pages: int
+    watermark: Optional[str]
+    refreshed_at: Optional[str]
+    full_refreshed_at: Optional[str]
+
+
+def page_date(properties: dict, label: str = "Date") -> Optional[str]:
+    """The day of the page's date property, which is what date range queries filter on."""
+    start = ((properties.get(label) or {}).get("date") or {}).get("start")
+    return start[:10] if start else None
+
+
+class NotionSnapshot:
+    """
+    Local SQLite mirror of the pages in each integration's Notion database, refreshed incrementally by
+    `last_edited_time`. Pages are kept as Notion returns them, so anything that indexes query results
+    can read the snapshot instead, and ranges of pages are read by date without any API calls.
+    """
+
+    def __init__(self, path, full_refresh_hours: float = DEFAULT_FULL_REFRESH_HOURS):
+        self.path = Path(path)
+        self.full_refresh_hours = full_refresh_hours
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Lazily open the database, creating it and its schema on first use."""
+        if not hasattr(self, "_connection"):
+            self._connection = connect_private(self.path)
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS snapshot_pages (
+                    integration TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    date TEXT,
+                    last_edited_time TEXT NOT NULL,
+                    properties TEXT NOT NULL,
+                    PRIMARY KEY (integration, page_id)
+                );
+                CREATE INDEX IF NOT EXISTS snapshot_pages_date ON snapshot_pages (integration, date);
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    integration TEXT PRIMARY KEY,
+                    database_id TEXT NOT NULL,
+                    watermark TEXT,
+                    refreshed_at TEXT,
+                    full_refreshed_at TEXT
+                );
+                """
+            )
+            self._connection.commit()
+            logger.info("Notion snapshot opened at %s", self.path)
+        return self._connection
+
+    def info(self, integration: str) -> Optional[SnapshotInfo]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT database_id, watermark, refreshed_at, full_refreshed_at FROM snapshots WHERE integration = ?",
+                (integration,),
+            ).fetchone()
+            if row is None:
+                return None
+            pages = self.connection.execute(
+                "SELECT COUNT(*) FROM snapshot_pages WHERE integration = ?", (integration,)
+            ).fetchone()[0]
+        return SnapshotInfo(integration, row[0], pages, *row[1:])
+
+    def _needs_full_refresh(self, info: Optional[SnapshotInfo], database_id: str) -> bool:
+        if info is None or info.database_id != database_id or not info.watermark or not info.full_refreshed_at:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(info.full_refreshed_at)
+        return age > timedelta(hours=self.full_refresh_hours)
+
+    def refresh(self, notion_client, full: bool = False) -> int:
+        """
+        Bring the integration's snapshot up to date and return the number of pages read from Notion.
+
+        Only pages edited at or after the newest `last_edited_time` already in the snapshot are read.
+        Notion rounds edit times to the minute, so the pages from the last minute are read again, which
+        is harmless. A full scan, which also drops deleted and archived pages, is made the first time,
+        when the database ID changes, when forced and when the last one is older than full_refresh_hours.
+        """
+        integration = notion_client.integration_name
+        database_id = notion_client.config["database_id"]
+        info = self.info(integration)
+        full = full or self._needs_full_refresh(info, database_id)
+
+        sorts = [{"timestamp": "last_edited_time", "direction": "ascending"}]
+        filter = None if full else {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": info.watermark}}
+        pages = notion_client.query_pages(filter=filter, sorts=sorts)
+
+        started_at = datetime.now(timezone.utc).isoformat()
+        watermark = None if full else info.watermark
+        rows = []
+        for page in pages:
+            rows.append((
+                integration, page["id"], page_date(page["properties"]), page["last_edited_time"],
+                json.dumps(page["properties"], separators=(",", ":")),
+            ))
+            watermark = max(watermark or page["last_edited_time"], page["last_edited_time"])
+
+        with self._lock:
+            if full:
+                self.connection.execute("DELETE FROM snapshot_pages WHERE integration = ?", (integration,))
+            self.connection.executemany(
+                """
+                INSERT INTO snapshot_pages (integration, page_id, date, last_edited_time, properties)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (integration, page_id) DO UPDATE SET
+                    date = excluded.date,
+                    last_edited_time = excluded.last_edited_time,
+                    properties = excluded.properties
+                """,
+                rows,
+            )
+            self.connection.execute(
+                """
+                INSERT INTO snapshots (integration, database_id, watermark, refreshed_at, full_refreshed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (integration) DO UPDATE SET
+                    database_id = excluded.database_id,
+                    watermark = excluded.watermark,
+                    refreshed_at = excluded.refreshed_at,
+                    full_refreshed_at = COALESCE(excluded.full_refreshed_at, snapshots.full_refreshed_at)
+                """,
+                (integration, database_id, watermark, started_at, started_at if full else None),
+            )
+            self.connection.commit()
+
+        logger.info("%s snapshot of %s: read %d pages", "Full" if full else "Incremental", integration, len(rows))
+        return len(rows)
+
+    def pages(self, integration: str, start_str: Optional[str] = None, end_str: Optional[str] = None):
+        """
+        Yield the integration's pages, as Notion returned them, dated between start_str and end_str
+        (inclusive, either may be None for no bound). Pages without a date are only included when neither is given.
+        """
+        query = "SELECT page_id, properties FROM snapshot_pages WHERE integration = ?"
+        params = [integration]
+        if start_str is not None:
+            query += " AND date >= ?"
+            params.append(start_str)
+        if end_str is not None:
+            query += " AND date <= ?"
+            params.append(end_str)
+
+        with self._lock:
+            rows = self.connection.execute(query + " ORDER BY date", params).fetchall()
+        for page_id, properties in rows:
+            yield {"id": page_id, "properties": json.loads(properties)}
+
+    def remove(self, integration: str, page_ids: list):
+        """Drop pages archived in Notion, which an incremental refresh wouldn't see."""
+        with self._lock:
+            self.connection.executemany(
+                "DELETE FROM snapshot_pages WHERE integration = ? AND page_id = ?",
+                [(integration, page_id) for page_id in page_ids],
+            )
+            self.connection.commit()
+
+    def clear(self, integration: str):
+        with self._lock:
+            self.connection.execute("DELETE FROM snapshot_pages WHERE integration = ?", (integration,))
+            self.connection.execute("DELETE FROM snapshots WHERE integration = ?", (integration,))
+            self.connection.commit()
+
+
+def get_default_snapshot() -> Optional[NotionSnapshot]:
+    """Return the shared snapshot at the default path, or None if snapshots are disabled."""
+    global _default_snapshot
+    path = default_snapshot_path()
+    if path is None:
+        return None
+    if _default_snapshot is None or _default_snapshot.path != path:
+        hours = float(os.environ.get("NOTION_SNAPSHOT_FULL_REFRESH_HOURS", DEFAULT_FULL_REFRESH_HOURS))
+        _default_snapshot = NotionSnapshot(path, hours)
+    return _default_snapshot
+
+
+_default_snapshot: Optional[NotionSnapshot] = None
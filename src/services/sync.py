@@ -0,0 +1,337 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from src.utils.datetime_utils import iter_date_windows
+from src.utils.logger import get_logger
+from src.utils.pipeline import batched, prefetch
+from src.utils.retry import retry_summary
+
+logger = get_logger()
+
+# Records written to Notion per batch by the streaming syncs
+PIPELINE_BATCH_SIZE = 100
+# Batches fetched and transformed ahead of the one being written
+PIPELINE_BUFFER = 2
+
+
+def sync_workouts(whoop_service, notion_client, start_date, end_date, concurrency=1):
+    """
+    Sync every Whoop workout between start_date and end_date (inclusive) with Notion.
+
+    Workouts are streamed: a background thread reads Whoop page by page and transforms each batch of
+    workouts in one pass, staying at most PIPELINE_BUFFER batches of PIPELINE_BATCH_SIZE ahead of the writer, so fetching
+    overlaps with writing and memory doesn't grow with the length of the range. Each batch is matched
+    against the pages the sync state store has for its workouts and, for workouts it doesn't know, the
+    Notion rows for their days, indexed by Whoop ID, so every workout resolves to an update or a create
+    without further reads. With a concurrency above one the writes are made by a
+    pool of rate limited async workers.
+    """
+    workouts = whoop_service.iter_workouts_for_date_range(start_date, end_date)
+    batches = map(whoop_service.transform_workouts, batched(workouts, PIPELINE_BATCH_SIZE))
+    synced = upsert_batches(notion_client, batches, concurrency, "workouts")
+    log_summary(whoop_service, notion_client)
+    return synced
+
+
+def upsert_batches(notion_client, batches, concurrency=1, name="pipeline"):
+    """
+    Upsert each batch of records, see upsert_records, producing the
+    batches on a background thread while the previous ones are written. A batch whose writes fail doesn't
+    stop the rest, and the failures are raised together at the end.
+    """
+    synced = 0
+    failures = []
+    for batch in prefetch(batches, PIPELINE_BUFFER, name):
+        try:
+            upsert_records(notion_client, batch, concurrency)
+        except RuntimeError as e:
+            failures.append(str(e))
+        else:
+            synced += len(batch)
+            logger.debug("Upserted a batch of %d %s, %d so far", len(batch), name, synced)
+
+    if failures:
+        raise RuntimeError("; ".join(failures))
+    return synced
+
+
+def upsert_records(notion_client, records, concurrency=1):
+    """
+    Upsert records against the pages the sync state store has for them and, for records it doesn't
+    know, an index of the Notion rows for their days. Once every record is known no rows are read.
+    """
+    def fetch_index(unknown):
+        first_day, last_day = record_date_span(unknown)
+        pages = notion_client.get_pages_for_range(first_day.isoformat(), last_day.isoformat(), properties=notion_client.mapped_labels)
+        return notion_client.index_pages(pages, "Whoop ID")
+
+    index = notion_client.index_records(records, "id", fetch_index)
+    notion_client.prefetch_relations(records)
+    notion_client.upsert_pages(records, "id", index, concurrency)
+
+
+def log_summary(whoop_service, notion_client):
+    notion_client.save_relation_cache()
+    logger.info(notion_client.summary())
+    logger.info("Retries: %s", retry_summary() or 'none')
+    logger.info("Whoop response cache: %s", whoop_service.cache_summary())
+
+
+def parse_updated_at(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def changed_since(records, watermark):
+    """The records created or updated after the watermark. Records without an updated_at are always kept."""
+    if watermark is None:
+        return list(records)
+    changed = []
+    for record in records:
+        updated_at = parse_updated_at(record.get("updated_at"))
+        if updated_at is None or updated_at > watermark:
+            changed.append(record)
+    return changed
+
+
+def latest_updated_at(records, watermark=None):
+    """The newest updated_at among records, or the existing watermark if that is later."""
+    times = [updated_at for updated_at in (parse_updated_at(record.get("updated_at")) for record in records) if updated_at]
+    if watermark is not None:
+        times.append(watermark)
+    return max(times, default=None)
+
+
+def record_date_span(records):
+    """The first and last day of the records' "date" fields."""
+    days = [datetime.fromisoformat(record["date"]).date() for record in records]
+    return min(days), max(days)
+
+
+def incremental_window(watermark, lookback_days, today=None):
+    """
+    The days to fetch from Whoop for an incremental sync. Whoop filters collections by when a record
+    started, not when it was updated, so the window reaches lookback_days before the watermark to catch
+    records that are scored or edited some time after they start.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    since = min(watermark.date(), today) if watermark else today
+    return since - timedelta(days=lookback_days), today
+
+
+def sync_workouts_incremental(whoop_service, notion_client, state_store, lookback_days=2, concurrency=1):
+    """
+    Sync only the Whoop workouts created or updated since the integration's watermark, then move the
+    watermark to the newest update seen. With no watermark yet, the lookback window is synced in full.
+
+    When nothing has changed this costs one Whoop collection call and no Notion calls.
+    """
+    integration = notion_client.integration_name
+    watermark = state_store.get_watermark(integration)
+    start_date, end_date = incremental_window(watermark, lookback_days)
+
+    workouts = whoop_service.get_workouts_for_date_range(start_date, end_date)
+    changed = changed_since(workouts, watermark)
+    logger.info("%d of %d workouts since %s changed after %s", len(changed), len(workouts), start_date, watermark or 'the first sync')
+
+    if changed:
+        transformed_workouts = whoop_service.transform_workouts(changed)
+        upsert_records(notion_client, transformed_workouts, concurrency)
+        log_summary(whoop_service, notion_client)
+
+    state_store.set_watermark(integration, latest_updated_at(workouts, watermark))
+    return len(changed)
+
+
+def sync_sleep_and_recovery_incremental(whoop_service, notion_client, state_store, lookback_days=2, concurrency=1):
+    """
+    Sync only the sleep and recovery records where either the sleep or its recovery was created or
+    updated since the integration's watermark, then move the watermark on. Sleeps still waiting for a
+    scored recovery aren't synced and don't move the watermark, so they're picked up once scored.
+    """
+    integration = notion_client.integration_name
+    watermark = state_store.get_watermark(integration)
+    start_date, end_date = incremental_window(watermark, lookback_days)
+
+    # Sleeps are dated by the day they ended, so they start up to a day before
+    records = whoop_service.get_sleep_and_recovery_for_date_range(start_date - timedelta(days=1), end_date)
+    changed = changed_since(records, watermark)
+    logger.info("%d of %d sleep and recovery records since %s changed after %s", len(changed), len(records), start_date, watermark or 'the first sync')
+
+    if changed:
+        upsert_records(notion_client, changed, concurrency)
+        log_summary(whoop_service, notion_client)
+
+    state_store.set_watermark(integration, latest_updated_at(records, watermark))
+    return len(changed)
+
+
+class BackfillResult(NamedTuple):
+    synced: int
+    complete: bool = True
+    # The newest day still to sync when the backfill stopped early
+    next_end: Optional[date] = None
+
+
+def backfill_key(start_date, end_date) -> str:
+    """Identifies a backfill by its range, so a later run over the same range resumes it."""
+    return f"{start_date or 'first'}..{end_date}"
+
+
+def run_backfill(integration, fetch_window, write_window, start_date, end_date, window_days=30,
+                 state_store=None, deadline=None, until_empty=False) -> BackfillResult:
+    """
+    Sync start_date to end_date (inclusive) in windows of window_days, newest first. fetch_window(start, end)
+    returns a window's records and runs on a background thread, one window ahead of write_window(records).
+    With until_empty, e.g. when start_date is None, the backfill ends at the first window without records.
+
+    With a state store the backfill is resumable. After each window the day before it is checkpointed,
+    and a later run over the same range carries on from there rather than redoing the days already
+    synced. The checkpoint is deleted once the backfill completes, so the range can be synced in full again.
+
+    With a deadline, a window is only written when the longest window so far, fetch plus write, fits in
+    the time left, or for the first window its fetch time. Otherwise the run stops cleanly and returns an
+    incomplete result saying where to resume, without waiting for the next window's fetch to finish.
+    """
+    key = backfill_key(start_date, end_date)
+    checkpoint = state_store.get_backfill(integration, key) if state_store is not None else None
+    resume_end, synced = (checkpoint.next_end, checkpoint.synced) if checkpoint else (end_date, 0)
+    if checkpoint:
+        logger.info("Resuming the %s backfill of %s from %s, %d records synced so far", integration, key, resume_end, synced)
+
+    def fetch_windows():
+        for window_start, window_end in iter_date_windows(start_date, resume_end, window_days):
+            started = time.perf_counter()
+            records = fetch_window(window_start, window_end)
+            yield window_start, window_end, records, time.perf_counter() - started
+            if not records and until_empty:
+                return
+
+    def stop(next_end):
+        logger.info("Out of time with %.1fs left, stopping the %s backfill of %s before %s", deadline.remaining(), integration, key, next_end)
+        if state_store is not None:
+            state_store.set_backfill(integration, key, next_end, synced)
+        return BackfillResult(synced, False, next_end)
+
+    slowest = 0.0
+    # Stopping early doesn't wait for the window being fetched, which could itself run past the deadline
+    windows = prefetch(fetch_windows(), PIPELINE_BUFFER - 1, integration, wait=deadline is None)
+    for window_start, window_end, records, fetch_seconds in windows:
+        if deadline is not None and not deadline.allows(max(slowest, fetch_seconds)):
+            return stop(window_end)
+
+        if records:
+            started = time.perf_counter()
+            write_window(records)
+            slowest = max(slowest, fetch_seconds + time.perf_counter() - started)
+            synced += len(records)
+            logger.info("Synced %d %s records for %s to %s", len(records), integration, window_start, window_end)
+        else:
+            logger.info("No %s data found for %s to %s", integration, window_start, window_end)
+            if until_empty:
+                break
+
+        next_end = window_start - timedelta(days=1)
+        if state_store is not None:
+            state_store.set_backfill(integration, key, next_end, synced)
+        # Check before waiting on the next window's fetch, not only once it has arrived
+        if deadline is not None and (start_date is None or next_end >= start_date) and not deadline.allows(slowest):
+            return stop(next_end)
+
+    if state_store is not None:
+        state_store.clear_backfill(integration, key)
+    return BackfillResult(synced)
+
+
+def backfill_workouts(whoop_service, notion_client, start_date, end_date, window_days=30, concurrency=1,
+                      state_store=None, deadline=None) -> BackfillResult:
+    """
+    Sync the Whoop workouts between start_date and end_date (inclusive) window by window, so the sync can
+    be checkpointed and stopped within a time budget, see run_backfill. Each window is streamed from
+    Whoop and written in batches, like sync_workouts.
+    """
+    def fetch_window(window_start, window_end):
+        return whoop_service.transform_workouts(whoop_service.iter_workouts_for_date_range(window_start, window_end))
+
+    def write_window(records):
+        for batch in batched(records, PIPELINE_BATCH_SIZE):
+            upsert_records(notion_client, batch, concurrency)
+
+    result = run_backfill(notion_client.integration_name, fetch_window, write_window, start_date, end_date,
+                          window_days, state_store, deadline)
+    log_summary(whoop_service, notion_client)
+    return result
+
+
+def backfill_sleep_and_recovery(whoop_service, notion_client, start_date, end_date, window_days=30, concurrency=1,
+                                state_store=None, deadline=None) -> BackfillResult:
+    """
+    Sync Whoop sleep and recovery for every day between start_date and end_date (inclusive) with Notion.
+
+    Sleep is dated by the day it ended, so the sleeps for a given day started the day before. Whoop is
+    read in windows of window_days, newest first, with one sleep and one recovery collection call per
+    window. The next window is fetched on a background thread while the current one is written, and each
+    window is upserted on its own, see upsert_records, so memory is bounded by the
+    window rather than the whole range. With a state store and a deadline the backfill is checkpointed
+    and stops within the time budget, see run_backfill.
+
+    If start_date is None the windows continue backwards until one contains no data, which replaces
+    the old day-by-day walk to the first available record.
+    """
+    fetch_start = start_date - timedelta(days=1) if start_date else None
+    fetch_end = end_date - timedelta(days=1)
+
+    def write_window(records):
+        upsert_records(notion_client, records, concurrency)
+
+    result = run_backfill(notion_client.integration_name, whoop_service.get_sleep_and_recovery_for_date_range,
+                          write_window, fetch_start, fetch_end, window_days, state_store, deadline,
+                          until_empty=start_date is None)
+    log_summary(whoop_service, notion_client)
+    # Report where to resume by the day the sleeps are dated, like the range given
+    return result._replace(next_end=result.next_end + timedelta(days=1)) if result.next_end else result
+
+
+def lingq_key(day, language):
+    """The identity of a LingQ word count row: one per language per day."""
+    if not day or not language:
+        return None
+    return f"{str(day)[:10]}:{language}"
+
+
+def lingq_page_key(notion_client):
+    """A function returning the lingq_key of a LingQ row from its Notion properties."""
+    date_label = notion_client.label_for("date")
+    language_label = notion_client.label_for("language")
+
+    def page_key(properties):
+        day = (properties.get(date_label, {}).get("date") or {}).get("start")
+        language = (properties.get(language_label, {}).get("select") or {}).get("name")
+        return lingq_key(day, language)
+    return page_key
+
+
+def sync_lingq(lingq_service, notion_client, concurrency=1):
+    """
+    Upsert today's known word count for each active LingQ language, one row per language per day. Rows
+    are matched on their date and language, through the sync state store or else an index of today's
+    Notion rows, so repeated runs on the same day update rather than duplicate them.
+    """
+    word_counts = lingq_service.get_daily_word_counts() or []
+
+    records = [dict(word_count, key=lingq_key(word_count['date'], word_count['language'])) for word_count in word_counts]
+    if not records:
+        logger.info("No LingQ word counts to sync.")
+        return 0
+
+    def fetch_index(unknown):
+        first_day, last_day = record_date_span(unknown)
+        pages = notion_client.get_pages_for_range(first_day.isoformat(), last_day.isoformat(), properties=notion_client.mapped_labels)
+        return notion_client.index_pages_by(pages, lingq_page_key(notion_client))
+
+    index = notion_client.index_records(records, "key", fetch_index)
+    notion_client.upsert_pages(records, "key", index, concurrency)
+
+    logger.info(notion_client.summary())
+    logger.info("Retries: %s", retry_summary() or 'none')
+    return len(records)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from src.utils.logger import get_logger
+from src.utils.sqlite import connect_private
+
+logger = get_logger()
+
+DISABLED_VALUES = {"", "0", "off", "none", "false"}
+
+
+class SyncState(NamedTuple):
+    page_id: str
+    content_hash: Optional[str]
+
+
+class BackfillCheckpoint(NamedTuple):
+    """How far an unfinished backfill got: every day after next_end has been synced."""
+    next_end: date
+    synced: int
+    updated_at: str
+
+
+def default_state_path() -> Optional[Path]:
+    """
+    Resolve where the sync state database lives.
+
+    SYNC_STATE_PATH overrides the location, or disables the store when set to 'off'. On Lambda
+    the only writable location is /tmp, which survives for as long as the container stays warm.
+    """
+    configured = os.environ.get("SYNC_STATE_PATH")
+    if configured is not None:
+        if configured.strip().lower() in DISABLED_VALUES:
+            return None
+        return Path(configured)
+
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return Path("/tmp/notion-dashboard/sync_state.db")
+    return Path.home() / ".notion-dashboard" / "sync_state.db"
+
+
+class SyncStateStore:
+    """
+    SQLite index of which Notion page each source record was written to, per integration, along with
+    a hash of the properties last written to it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Lazily open the database, creating it and its schema on first use."""
+        if not hasattr(self, "_connection"):
+            self._connection = connect_private(self.path)
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    integration TEXT NOT NULL,
+                    source_id TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (integration, source_id)
+                )
+                """
+            )
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    integration TEXT PRIMARY KEY,
+                    watermark TEXT NOT NULL,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS backfills (
+                    integration TEXT NOT NULL,
+                    backfill TEXT NOT NULL,
+                    next_end TEXT NOT NULL,
+                    synced INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (integration, backfill)
+                )
+                """
+            )
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS databases (
+                    integration TEXT PRIMARY KEY,
+                    database_id TEXT NOT NULL
+                )
+                """
+            )
+            self._connection.commit()
+            logger.info("Sync state store opened at %s", self.path)
+        return self._connection
+
+    @staticmethod
+    def hash_properties(properties: dict) -> str:
+        """Stable hash of a built Notion properties dict."""
+        encoded = json.dumps(properties, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, integration: str, source_id) -> Optional[SyncState]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT page_id, content_hash FROM sync_state WHERE integration = ? AND source_id = ?",
+                (integration, str(source_id)),
+            ).fetchone()
+        return SyncState(*row) if row else None
+
+    def put(self, integration: str, source_id, page_id: str, content_hash: Optional[str]):
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO sync_state (integration, source_id, page_id, content_hash)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (integration, source_id) DO UPDATE SET
+                    page_id = excluded.page_id,
+                    content_hash = excluded.content_hash,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (integration, str(source_id), page_id, content_hash),
+            )
+            self.connection.commit()
+
+    def delete(self, integration: str, source_id):
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM sync_state WHERE integration = ? AND source_id = ?",
+                (integration, str(source_id)),
+            )
+            self.connection.commit()
+
+    def clear(self, integration: str):
+        with self._lock:
+            self.connection.execute("DELETE FROM sync_state WHERE integration = ?", (integration,))
+            self.connection.execute("DELETE FROM watermarks WHERE integration = ?", (integration,))
+            self.connection.execute("DELETE FROM backfills WHERE integration = ?", (integration,))
+            self.connection.execute("DELETE FROM databases WHERE integration = ?", (integration,))
+            self.connection.commit()
+
+    def bind_database(self, integration: str, database_id: str) -> bool:
+        """
+        Record the Notion database the integration writes to. If a different one was recorded, the stored
+        pages are in that database, so they are forgotten and True is returned.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT database_id FROM databases WHERE integration = ?", (integration,)
+            ).fetchone()
+            changed = row is not None and row[0] != database_id
+            if changed:
+                self.connection.execute("DELETE FROM sync_state WHERE integration = ?", (integration,))
+                self.connection.execute("DELETE FROM backfills WHERE integration = ?", (integration,))
+            self.connection.execute(
+                """
+                INSERT INTO databases (integration, database_id) VALUES (?, ?)
+                ON CONFLICT (integration) DO UPDATE SET database_id = excluded.database_id
+                """,
+                (integration, database_id),
+            )
+            self.connection.commit()
+        if changed:
+            logger.info("The %s database changed from %s to %s, forgetting its stored pages", integration, row[0], database_id)
+        return changed
+
+    def get_watermark(self, integration: str) -> Optional[datetime]:
+        """The latest source update time that the integration has been synced up to, if any."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT watermark FROM watermarks WHERE integration = ?", (integration,)
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_watermark(self, integration: str, watermark: Optional[datetime]):
+        if watermark is None:
+            return
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO watermarks (integration, watermark) VALUES (?, ?)
+                ON CONFLICT (integration) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (integration, watermark.isoformat()),
+            )
+            self.connection.commit()
+
+    def get_backfill(self, integration: str, backfill: str) -> Optional[BackfillCheckpoint]:
+        """The checkpoint of the integration's unfinished backfill identified by backfill, if any."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT next_end, synced, updated_at FROM backfills WHERE integration = ? AND backfill = ?",
+                (integration, backfill),
+            ).fetchone()
+        return BackfillCheckpoint(date.fromisoformat(row[0]), row[1], row[2]) if row else None
+
+    def set_backfill(self, integration: str, backfill: str, next_end: date, synced: int):
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO backfills (integration, backfill, next_end, synced) VALUES (?, ?, ?, ?)
+                ON CONFLICT (integration, backfill) DO UPDATE SET
+                    next_end = excluded.next_end,
+                    synced = excluded.synced,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (integration, backfill, next_end.isoformat(), synced),
+            )
+            self.connection.commit()
+
+    def clear_backfill(self, integration: str, backfill: str):
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM backfills WHERE integration = ? AND backfill = ?", (integration, backfill)
+            )
+            self.connection.commit()
+
+    def list_backfills(self, integration: str = None) -> list:
+        """(integration, backfill, checkpoint) for every unfinished backfill, or only the integration's."""
+        query = "SELECT integration, backfill, next_end, synced, updated_at FROM backfills"
+        params = ()
+        if integration is not None:
+            query += " WHERE integration = ?"
+            params = (integration,)
+        with self._lock:
+            rows = self.connection.execute(query + " ORDER BY integration, backfill", params).fetchall()
+        return [(row[0], row[1], BackfillCheckpoint(date.fromisoformat(row[2]), row[3], row[4])) for row in rows]
+
+    def count(self, integration: str) -> int:
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM sync_state WHERE integration = ?", (integration,)
+            ).fetchone()[0]
+
+    def rebuild(self, notion_client, notion_field: str) -> int:
+        """
+        Replace the integration's entries with the pages currently in its Notion database, matched on the
+        number value of notion_field. Content hashes are unknown after a rebuild, so each record is written
+        once more on its next sync and hashed from then on.
+        """
+        integration = notion_client.integration_name
+        self.clear(integration)
+        self.bind_database(integration, notion_client.config["database_id"])
+
+        count = 0
+        for source_id, page in notion_client.index_pages(notion_client.query_pages(), notion_field).items():
+            self.put(integration, source_id, page.id, None)
+            count += 1
+
+        logger.info("Rebuilt sync state for %s with %d pages.", integration, count)
+        return count
+
+
+def get_default_store() -> Optional[SyncStateStore]:
+    """Return the shared store at the default path, or None if the store is disabled."""
+    global _default_store
+    path = default_state_path()
+    if path is None:
+        return None
+    if _default_store is None or _default_store.path != path:
+        _default_store = SyncStateStore(path)
+    return _default_store
+
+
+_default_store: Optional[SyncStateStore] = None
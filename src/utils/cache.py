@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+from src.utils.sqlite import connect_private
+
+logger = get_logger()
+
+
+class MemoryBackend:
+    """In-process LRU store of (value, expires_at) entries."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """SQLite store of JSON-encoded (value, expires_at) entries, evicting the least recently used beyond maxsize."""
+
+    def __init__(self, path, maxsize: int = 1024):
+        self.path = Path(path)
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Lazily open the database, creating it and its schema on first use."""
+        if not hasattr(self, "_connection"):
+            self._connection = connect_private(self.path)
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE response_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError:
+            self.delete(key)
+            return None
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO response_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, expires_at = excluded.expires_at, last_used = excluded.last_used
+                """,
+                (key, json.dumps(value), expires_at, time.time()),
+            )
+            self.connection.execute(
+                """
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.maxsize,),
+            )
+            self.connection.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self.connection.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self.connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM response_cache")
+            self.connection.commit()
+
+
+class ResponseCache:
+    """
+    TTL cache of API responses in front of a memory or disk backend.
+
+    The TTL is decided per response by the caller, so a response known to be final can be kept far
+    longer than one that may still change. A TTL of zero or less means the response isn't cached.
+    """
+
+    def __init__(self, backend, name: str = "response"):
+        self.backend = backend
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Return the cached value for key, or None if it is missing or expired."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            self.backend.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        if ttl > 0:
+            self.backend.set(key, value, time.time() + ttl)
+
+    def lookup(self, key: str):
+        """Like get, but counted as a hit or a miss."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            metrics.increment("CacheHits", cache=self.name)
+            logger.debug("Response cache hit for %s", key)
+        else:
+            self.misses += 1
+            metrics.increment("CacheMisses", cache=self.name)
+        return value
+
+    def store(self, key: str, value, ttl: float):
+        """Like set, but a failing backend is logged rather than raised."""
+        try:
+            self.set(key, value, ttl)
+        except (OSError, sqlite3.Error) as e:
+            # Caching is an optimisation, so a failing backend shouldn't fail the sync
+            logger.warning("Could not cache the response for %s: %s", key, e)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], object], ttl_for: Callable[[object], float]):
+        """Return the cached value for key, otherwise fetch it and cache it for ttl_for(value) seconds."""
+        value = self.lookup(key)
+        if value is not None:
+            return value
+
+        value = fetch()
+        self.store(key, value, ttl_for(value))
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+def make_backend(kind: str, path: Optional[Path] = None, maxsize: int = 1024):
+    """Build a backend by name: 'disk' (needs path) or 'memory'."""
+    if kind == "disk":
+        return DiskBackend(path, maxsize)
+    if kind == "memory":
+        return MemoryBackend(maxsize)
+    raise ValueError(f"Unknown cache backend '{kind}', expected 'disk' or 'memory'")
@@ -11,4 +11,35 @@ def get_datetimes_for_date(date_input):
     start = datetime.datetime.combine(day.date(), datetime.time.min, tzinfo=datetime.timezone.utc).isoformat()
     end = datetime.datetime.combine(day.date(), datetime.time.max, tzinfo=datetime.timezone.utc).isoformat()
 
-    return start, end
\ No newline at end of file
+    return start, end
+
+def get_datetimes_for_date_range(start_input, end_input):
+    start, _ = get_datetimes_for_date(start_input)
+    _, end = get_datetimes_for_date(end_input)
+
+    if start > end:
+        raise ValueError(f"Start date {start_input} is after end date {end_input}")
+
+    return start, end
+
+
+def parse_date(date_str):
+    """Parse a YYYY-MM-DD string into a date object."""
+    return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def iter_date_windows(start_date, end_date, window_days):
+    """
+    Yield inclusive (window_start, window_end) date pairs covering start_date to end_date,
+    newest window first. If start_date is None the windows continue backwards indefinitely.
+    """
+    if window_days < 1:
+        raise ValueError("window_days must be at least 1")
+
+    window_end = end_date
+    while start_date is None or window_end >= start_date:
+        window_start = window_end - datetime.timedelta(days=window_days - 1)
+        if start_date is not None and window_start < start_date:
+            window_start = start_date
+        yield window_start, window_end
+        window_end = window_start - datetime.timedelta(days=1)
@@ -0,0 +1,28 @@
+import math
+import time
+
+
+class Deadline:
+    """
+    A time budget for a run, less a reserve kept back for wrapping up (saving a checkpoint, reporting
+    metrics) before the hard limit. Without a budget the deadline never arrives.
+    """
+
+    def __init__(self, seconds: float = None, reserve: float = 0.0):
+        self.expires = time.monotonic() + seconds if seconds is not None else math.inf
+        self.reserve = reserve
+
+    @classmethod
+    def from_lambda_context(cls, context, reserve: float = 0.0) -> "Deadline":
+        """The time the Lambda runtime has left for this invocation, or no budget without a context."""
+        if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+            return cls(reserve=reserve)
+        return cls(context.get_remaining_time_in_millis() / 1000, reserve)
+
+    def remaining(self) -> float:
+        """Seconds left before the reserve, possibly negative."""
+        return self.expires - time.monotonic() - self.reserve
+
+    def allows(self, seconds: float) -> bool:
+        """Whether work expected to take this many seconds fits in what is left."""
+        return self.remaining() >= seconds
@@ -1,26 +1,132 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
-def get_logger(name=__name__, level=logging.INFO):
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
+
+# Pass as `extra` on per-record messages so LOG_SAMPLE_EVERY can thin them out on large runs
+SAMPLED = {"sampled": True}
+
+# Attributes every LogRecord has. Anything else on a record was passed in `extra` and is added to JSON logs.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName", "sampled"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra` fields alongside the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through the first of every `every` records logged with SAMPLED, counted per message template.
+    Other records always pass. With lazy %-style messages the template is the same for every record,
+    so each kind of per-record message is sampled on its own.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or not getattr(record, "sampled", False):
+            return True
+        with self._lock:
+            self.counts[record.msg] += 1
+            return self.counts[record.msg] % self.every == 1
+
+
+def env_level(default=logging.INFO) -> int:
+    """LOG_LEVEL as a level name such as DEBUG, or a number."""
+    value = os.environ.get("LOG_LEVEL", "").strip()
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else default
+
+
+_handler = None
+_listener = None
+_handler_lock = threading.Lock()
+
+
+def _build_handler() -> logging.Handler:
+    """
+    The handler shared by every logger, configured from the environment: LOG_FORMAT ('text' or 'json'),
+    LOG_SAMPLE_EVERY (keep one in N per-record messages, default 1 for all of them) and LOG_ASYNC, which
+    hands records to a background thread so formatting and writing them stays off the sync's threads.
+    """
+    global _listener
+    stream_handler = logging.StreamHandler()
+    if os.environ.get("LOG_FORMAT", "text").strip().lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = stream_handler
+    if os.environ.get("LOG_ASYNC", "").strip().lower() in ("1", "true", "yes", "on"):
+        handler = QueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(handler.queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    sample_every = int(os.environ.get("LOG_SAMPLE_EVERY", "1") or 1)
+    if sample_every > 1:
+        handler.addFilter(SamplingFilter(sample_every))
+    return handler
+
+
+def flush_logs():
+    """Write out every record queued for the background writer, e.g. before a Lambda invocation returns."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def get_logger(name=__name__, level=None):
     """
     Configure and return a logger instance.
 
     Args:
         name (str): Name of the logger.
-        level (int): Logging level.
+        level (int): Logging level. Defaults to LOG_LEVEL, or INFO.
 
     Returns:
         logging.Logger: Configured logger instance.
     """
+    global _handler
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    logger.setLevel(level if level is not None else env_level())
 
     # Check if the logger already has handlers to avoid duplicate logs
     if not logger.handlers:
-        console_handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
-        )
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        with _handler_lock:
+            if _handler is None:
+                _handler = _build_handler()
+        logger.addHandler(_handler)
 
     return logger
@@ -0,0 +1,318 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+NAMESPACE = "NotionDashboard"
+FORMATS = ("text", "json", "emf", "off")
+
+# CloudWatch units for the metrics recorded by the app, anything else is reported as a plain count
+UNITS = {
+    "Latency": "Milliseconds",
+    "Duration": "Milliseconds",
+    "RateLimitWait": "Milliseconds",
+    "PipelineWait": "Milliseconds",
+    "Bytes": "Bytes",
+}
+
+# CloudWatch accepts at most 100 values per metric in one EMF document
+EMF_MAX_VALUES = 100
+
+
+def percentile(values: list, fraction: float) -> float:
+    """The value at the fraction (0 to 1) of the sorted values, by nearest rank."""
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def summarise_values(values: list) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "sum": round(sum(ordered), 3),
+        "min": round(ordered[0], 3),
+        "p50": round(percentile(ordered, 0.5), 3),
+        "p90": round(percentile(ordered, 0.9), 3),
+        "p99": round(percentile(ordered, 0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class Metrics:
+    """
+    Counters and histograms for one run, each identified by a metric name and a set of dimensions,
+    e.g. Latency with api=notion and endpoint='POST pages'. Safe to record into from any thread.
+
+    Every external call is recorded by the RetryPolicy it goes through (Calls, Errors and Latency per
+    attempt, plus Retries and GaveUp), response sizes by transport hooks (Bytes), the caches record
+    CacheHits and CacheMisses, and `timer` measures a stretch of work such as a login or a batch of writes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far and restart the run clock."""
+        with self._lock:
+            self.counters = defaultdict(float)
+            self.histograms = defaultdict(list)
+            self.started = time.perf_counter()
+
+    @staticmethod
+    def _key(name: str, dimensions: dict) -> tuple:
+        return name, tuple(sorted((key, str(value)) for key, value in dimensions.items()))
+
+    def increment(self, name: str, value: float = 1, **dimensions):
+        with self._lock:
+            self.counters[self._key(name, dimensions)] += value
+
+    def observe(self, name: str, value: float, **dimensions):
+        """Add a value to the name's histogram."""
+        with self._lock:
+            self.histograms[self._key(name, dimensions)].append(value)
+
+    @contextmanager
+    def timer(self, operation: str, **dimensions):
+        """Record how long the block takes, in milliseconds, as the operation's Duration."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("Duration", (time.perf_counter() - started) * 1000, operation=operation, **dimensions)
+
+    def record_call(self, api: str, endpoint: str, seconds: float, error: bool = False):
+        """Record one attempt at an external call."""
+        with self._lock:
+            key = (("api", api), ("endpoint", endpoint))
+            self.counters[("Calls", key)] += 1
+            if error:
+                self.counters[("Errors", key)] += 1
+            self.histograms[("Latency", key)].append(seconds * 1000)
+
+    def export(self) -> tuple:
+        """Everything recorded as plain (counters, histograms) dicts, e.g. to hand back from a worker process."""
+        with self._lock:
+            return dict(self.counters), {key: list(values) for key, values in self.histograms.items()}
+
+    def merge(self, exported: tuple):
+        """Add metrics exported from another Metrics, so a worker process's calls are reported with the run."""
+        counters, histograms = exported
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] += value
+            for key, values in histograms.items():
+                self.histograms[key].extend(values)
+
+    def groups(self) -> dict:
+        """Everything recorded, grouped by dimensions: {dimensions: {name: count or list of values}}."""
+        with self._lock:
+            groups = defaultdict(dict)
+            for (name, dimensions), value in self.counters.items():
+                groups[dimensions][name] = value
+            for (name, dimensions), values in self.histograms.items():
+                groups[dimensions][name] = list(values)
+        return dict(groups)
+
+    def summary(self, **properties) -> dict:
+        """The run as a JSON-serialisable dict, with histograms reduced to count, sum and percentiles."""
+        metrics = []
+        for dimensions, values in sorted(self.groups().items()):
+            entry = {"dimensions": dict(dimensions)}
+            for name, value in sorted(values.items()):
+                entry[name] = summarise_values(value) if isinstance(value, list) else value
+            metrics.append(entry)
+        return {
+            **properties,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "metrics": metrics,
+        }
+
+    def to_emf(self, namespace: str = NAMESPACE, dimensions: dict = None, **properties) -> list:
+        """
+        The run as CloudWatch Embedded Metric Format documents, one per set of dimensions (more where a
+        histogram holds over 100 values). The dimensions given, such as the Lambda mode, are added to
+        every metric, and properties are included as searchable fields that aren't metrics.
+        """
+        dimensions = {key: str(value) for key, value in (dimensions or {}).items()}
+        timestamp = int(time.time() * 1000)
+        documents = []
+
+        groups = self.groups()
+        groups.setdefault((), {})["Duration"] = [(time.perf_counter() - self.started) * 1000]
+        for group, values in sorted(groups.items()):
+            all_dimensions = {**dimensions, **dict(group)}
+            chunks = [{}]
+            for name, value in sorted(values.items()):
+                if not isinstance(value, list):
+                    chunks[0][name] = value
+                    continue
+                for i in range(0, len(value), EMF_MAX_VALUES):
+                    if i // EMF_MAX_VALUES >= len(chunks):
+                        chunks.append({})
+                    chunks[i // EMF_MAX_VALUES][name] = [round(v, 3) for v in value[i:i + EMF_MAX_VALUES]]
+
+            for chunk in chunks:
+                documents.append({
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [{
+                            "Namespace": namespace,
+                            "Dimensions": [list(all_dimensions)],
+                            "Metrics": [{"Name": name, "Unit": UNITS.get(name, "Count")} for name in chunk],
+                        }],
+                    },
+                    **properties,
+                    **all_dimensions,
+                    **chunk,
+                })
+        return documents
+
+    def format_text(self) -> str:
+        lines = [f"Run metrics after {(time.perf_counter() - self.started):.2f}s:"]
+        for dimensions, values in sorted(self.groups().items()):
+            label = " ".join(value for _, value in dimensions) or "run"
+            parts = []
+            for name, value in sorted(values.items()):
+                if isinstance(value, list):
+                    stats = summarise_values(value)
+                    unit = "ms" if UNITS.get(name) == "Milliseconds" else ""
+                    parts.append(f"{name} n={stats['count']} p50={stats['p50']:.1f}{unit} p90={stats['p90']:.1f}{unit} max={stats['max']:.1f}{unit}")
+                else:
+                    parts.append(f"{name}={value:g}")
+            lines.append(f"  {label}: {', '.join(parts)}")
+        return "\n".join(lines)
+
+    def recorded(self) -> bool:
+        """Whether anything has been recorded since the last reset."""
+        with self._lock:
+            return bool(self.counters or self.histograms)
+
+    def emit(self, format: str = None, dimensions: dict = None, stream=None, **properties):
+        """
+        Report the run in the given format, or METRICS_FORMAT: 'text' logs a readable summary, 'json'
+        prints the summary as one line, 'emf' prints Embedded Metric Format documents, which CloudWatch
+        turns into metrics when they appear in a Lambda's output, and 'off' reports nothing. JSON and
+        EMF are printed to stream, standard output by default.
+        """
+        stream = stream or sys.stdout
+        format = (format or default_format()).lower()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown metrics format '{format}', expected one of {', '.join(FORMATS)}")
+
+        if format == "text":
+            logger.info(self.format_text())
+        elif format == "json":
+            # Printed rather than logged, so the line is plain JSON that log tooling can parse
+            print(json.dumps(self.summary(**(dimensions or {}), **properties), default=str), file=stream, flush=True)
+        elif format == "emf":
+            for document in self.to_emf(dimensions=dimensions, **properties):
+                print(json.dumps(document, default=str), file=stream, flush=True)
+
+
+metrics = Metrics()
+
+
+def requests_response_hook(api: str, base_url: str) -> Callable:
+    """
+    A requests response hook recording the size of every response as Bytes, with the endpoint named
+    like the retry policies name it: the method and the path relative to base_url.
+    """
+    def hook(response, *args, **kwargs):
+        url = response.request.url.split("?")[0]
+        path = url[len(base_url):] if url.startswith(base_url) else urlsplit(url).path
+        metrics.increment("Bytes", len(response.content), api=api, endpoint=f"{response.request.method} {path.lstrip('/')}")
+    return hook
+
+
+def default_format() -> str:
+    """METRICS_FORMAT, defaulting to EMF on Lambda and a logged summary elsewhere."""
+    return os.environ.get("METRICS_FORMAT") or ("emf" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "text")
+
+
+class CProfileProfiler:
+    """Deterministic profile of the run, logged as the top functions and optionally saved for snakeviz or pstats."""
+
+    def __init__(self, output: str = None, limit: int = 25):
+        import cProfile
+
+        self.profile = cProfile.Profile()
+        self.output = output
+        self.limit = limit
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        import io
+        import pstats
+
+        self.profile.disable()
+        if self.output:
+            self.profile.dump_stats(self.output)
+            logger.info("Profile saved to %s", self.output)
+        report = io.StringIO()
+        pstats.Stats(self.profile, stream=report).sort_stats("cumulative").print_stats(self.limit)
+        logger.info("Profile of the run:\n%s", report.getvalue())
+
+
+class PyinstrumentProfiler:
+    """Sampling profile of the run with pyinstrument, which has to be installed separately."""
+
+    def __init__(self, output: str = None, limit: int = None):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("The pyinstrument profiler needs `pip install pyinstrument`.")
+        self.profiler = Profiler()
+        self.output = output
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+        if self.output:
+            with open(self.output, "w") as file:
+                file.write(self.profiler.output_html())
+            logger.info("Profile saved to %s", self.output)
+        logger.info("Profile of the run:\n%s", self.profiler.output_text())
+
+
+# Profiler factories by name, called with the output path. Anything with start() and stop() will do.
+PROFILERS = {
+    "cprofile": CProfileProfiler,
+    "pyinstrument": PyinstrumentProfiler,
+}
+
+
+def register_profiler(name: str, factory: Callable):
+    """Make a profiler available to PROFILE and --profile under the name."""
+    PROFILERS[name] = factory
+
+
+@contextmanager
+def profiled(name: Optional[str] = None, output: Optional[str] = None):
+    """Run the block under the named profiler, or PROFILE and PROFILE_OUTPUT if not given. Does nothing if neither is set."""
+    name = name or os.environ.get("PROFILE")
+    if not name or name.lower() in ("off", "none"):
+        yield
+        return
+    if name not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{name}', expected one of {', '.join(PROFILERS)}")
+
+    profiler = PROFILERS[name](output or os.environ.get("PROFILE_OUTPUT") or None)
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
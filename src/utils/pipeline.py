@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from typing import Iterable, Iterator
+
+from src.utils.metrics import metrics
+
+_DONE = object()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size items from the iterable, consuming it lazily."""
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(iterable: Iterable, maxsize: int = 2, name: str = "prefetch", wait: bool = True) -> Iterator:
+    """
+    Consume the iterable on a background thread, staying at most maxsize items ahead of the caller, so
+    producing the next item (e.g. fetching and transforming a page of records) overlaps with whatever
+    the caller does with the current one (e.g. writing it to Notion). Memory is bounded by the buffer
+    rather than by the length of the iterable.
+
+    An exception raised by the iterable is re-raised to the caller. If the caller stops early the
+    producer is stopped too, after the item it is working on. The caller waits for that unless wait is
+    False, when the producer, a daemon thread, finishes the item in the background and drops it.
+
+    Time the caller spends waiting for the producer is recorded as the PipelineWait metric, so a run
+    shows whether the producer or the consumer is the bottleneck.
+    """
+    buffer = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+        else:
+            put((_DONE, None))
+
+    producer = threading.Thread(target=produce, name=name, daemon=True)
+    producer.start()
+    try:
+        while True:
+            started = time.perf_counter()
+            item, error = buffer.get()
+            metrics.observe("PipelineWait", (time.perf_counter() - started) * 1000, stage=name)
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        if wait:
+            producer.join()
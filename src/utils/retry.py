@@ -0,0 +1,244 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, NamedTuple, Optional
+
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger()
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RetryDecision(NamedTuple):
+    """
+    How to retry a failed call. retry_after is the server's requested wait, if it gave one.
+    maybe_applied is True when the request may have reached the server, so retrying a
+    non-idempotent call such as a create could apply it twice.
+    """
+    retry_after: Optional[float] = None
+    maybe_applied: bool = True
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify_status(status: int, headers) -> Optional[RetryDecision]:
+    if status not in RETRYABLE_STATUSES:
+        return None
+    # A 429 is rejected before any work is done, whereas a 5xx may have been partly applied
+    return RetryDecision(parse_retry_after(headers.get("Retry-After")), maybe_applied=status != 429)
+
+
+def classify_requests_error(error: Exception) -> Optional[RetryDecision]:
+    """Retry decision for an exception raised by requests, or None if it shouldn't be retried."""
+    import requests
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return classify_status(error.response.status_code, error.response.headers)
+    if isinstance(error, requests.ConnectTimeout):
+        return RetryDecision(maybe_applied=False)
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return RetryDecision()
+    return None
+
+
+def classify_requests_response(response) -> Optional[RetryDecision]:
+    """Retry decision for a requests response that was returned rather than raised."""
+    return classify_status(response.status_code, response.headers)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for calls to an external API.
+
+    The classify callables decide whether an exception, or a returned result, is worth retrying.
+    A Retry-After from the server takes precedence over the computed backoff. Each endpoint has
+    its own budget of retries per run, restored by `reset`, so a persistently failing endpoint
+    stops being retried instead of dragging the whole run out. Calls marked as not idempotent are
+    only retried when the failure shows the request was never applied.
+    """
+
+    instances = []
+
+    def __init__(
+        self,
+        name: str,
+        classify: Callable[[Exception], Optional[RetryDecision]],
+        classify_result: Callable[[object], Optional[RetryDecision]] = None,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        budget: int = 50,
+        budgets: dict = None,
+    ):
+        self.name = name
+        self.classify = classify
+        self.classify_result = classify_result
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.budgets = budgets or {}
+        self.calls = Counter()
+        self.retries = Counter()
+        self.backoff_seconds = Counter()
+        self.gave_up = Counter()
+        self._lock = threading.Lock()
+        RetryPolicy.instances.append(self)
+
+    def reset(self):
+        """Forget the calls and retries counted so far, restoring every endpoint's budget."""
+        with self._lock:
+            self.calls.clear()
+            self.retries.clear()
+            self.backoff_seconds.clear()
+            self.gave_up.clear()
+
+    def copy(self) -> "RetryPolicy":
+        """A policy with the same settings but its own counts and budgets, e.g. for one account's client."""
+        return RetryPolicy(
+            self.name, self.classify, self.classify_result, self.max_attempts, self.base_delay, self.max_delay,
+            self.budget, dict(self.budgets),
+        )
+
+    def _next_delay(self, endpoint: str, attempt: int, decision: Optional[RetryDecision], idempotent: bool) -> Optional[float]:
+        """Return how long to wait before retrying, or None if the call should not be retried."""
+        if decision is None:
+            return None
+        if not idempotent and decision.maybe_applied:
+            return None
+
+        with self._lock:
+            if attempt + 1 >= self.max_attempts or self.retries[endpoint] >= self.budgets.get(endpoint, self.budget):
+                self.gave_up[endpoint] += 1
+                metrics.increment("GaveUp", api=self.name, endpoint=endpoint)
+                return None
+
+            if decision.retry_after is not None:
+                delay = decision.retry_after + random.uniform(0, self.base_delay)
+            else:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+            self.retries[endpoint] += 1
+            self.backoff_seconds[endpoint] += delay
+        metrics.increment("Retries", api=self.name, endpoint=endpoint)
+
+        logger.warning("%s %s failed on attempt %d, retrying in %.2fs", self.name, endpoint, attempt + 1, delay)
+        return delay
+
+    def _throttle(self, throttle: Optional[Callable]):
+        """Wait for the client-side rate limiter, if any, recording the wait apart from the call's latency."""
+        if throttle is None:
+            return
+        started = time.perf_counter()
+        throttle()
+        metrics.observe("RateLimitWait", (time.perf_counter() - started) * 1000, api=self.name)
+
+    async def _throttle_async(self, throttle: Optional[Callable]):
+        if throttle is None:
+            return
+        started = time.perf_counter()
+        await throttle()
+        metrics.observe("RateLimitWait", (time.perf_counter() - started) * 1000, api=self.name)
+
+    def call(self, fn, *args, endpoint: str = "default", idempotent: bool = True, throttle: Callable = None, **kwargs):
+        """Call fn, retrying failures according to the policy. throttle, if given, is called before every attempt."""
+        attempt = 0
+        while True:
+            with self._lock:
+                self.calls[endpoint] += 1
+            self._throttle(throttle)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                metrics.record_call(self.name, endpoint, time.perf_counter() - started, error=True)
+                delay = self._next_delay(endpoint, attempt, self.classify(e), idempotent)
+                if delay is None:
+                    raise
+            else:
+                decision = self.classify_result(result) if self.classify_result else None
+                metrics.record_call(self.name, endpoint, time.perf_counter() - started, error=decision is not None)
+                delay = self._next_delay(endpoint, attempt, decision, idempotent)
+                if delay is None:
+                    return result
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn, *args, endpoint: str = "default", idempotent: bool = True, throttle: Callable = None, **kwargs):
+        """Await fn, retrying failures according to the policy. throttle, if given, is awaited before every attempt."""
+        # Imported here so the synchronous paths, e.g. a LingQ-only cold start, don't load asyncio
+        import asyncio
+
+        attempt = 0
+        while True:
+            with self._lock:
+                self.calls[endpoint] += 1
+            await self._throttle_async(throttle)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                metrics.record_call(self.name, endpoint, time.perf_counter() - started, error=True)
+                delay = self._next_delay(endpoint, attempt, self.classify(e), idempotent)
+                if delay is None:
+                    raise
+            else:
+                decision = self.classify_result(result) if self.classify_result else None
+                metrics.record_call(self.name, endpoint, time.perf_counter() - started, error=decision is not None)
+                delay = self._next_delay(endpoint, attempt, decision, idempotent)
+                if delay is None:
+                    return result
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {
+                    "calls": self.calls[endpoint],
+                    "retries": self.retries[endpoint],
+                    "backoff_seconds": round(self.backoff_seconds[endpoint], 3),
+                    "gave_up": self.gave_up[endpoint],
+                }
+                for endpoint in self.calls
+            }
+
+    def summary(self) -> str:
+        with self._lock:
+            return (
+                f"{self.name}: {sum(self.calls.values())} calls, {sum(self.retries.values())} retries, "
+                f"{sum(self.backoff_seconds.values()):.2f}s backing off"
+            )
+
+
+def reset_retries():
+    """Reset every policy, so each run starts with full budgets and reports only its own retries."""
+    for policy in RetryPolicy.instances:
+        policy.reset()
+
+
+def retry_summary() -> str:
+    """Summarise retries across every policy that has been used."""
+    return "; ".join(policy.summary() for policy in RetryPolicy.instances if policy.calls)
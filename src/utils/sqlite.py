@@ -0,0 +1,21 @@
+import os
+import sqlite3
+from pathlib import Path
+
+# The local stores hold health data (Whoop responses, Notion properties), so their files are only
+# readable by their owner
+PRIVATE_FILE_MODE = 0o600
+PRIVATE_DIR_MODE = 0o700
+
+
+def connect_private(path) -> sqlite3.Connection:
+    """
+    Open the SQLite database at path, shareable between threads, creating it and its directory if
+    needed. The file is created before SQLite does, which would use the umask, and an existing file's
+    mode is narrowed to PRIVATE_FILE_MODE.
+    """
+    path = Path(path)
+    path.parent.mkdir(mode=PRIVATE_DIR_MODE, parents=True, exist_ok=True)
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT, PRIVATE_FILE_MODE))
+    os.chmod(path, PRIVATE_FILE_MODE)
+    return sqlite3.connect(path, check_same_thread=False)